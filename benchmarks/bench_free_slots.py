@@ -0,0 +1,84 @@
+"""Compare the FreeSlotIndex lookups with the old per-absence mask filters.
+
+Usage: python benchmarks/bench_free_slots.py [n_teachers] [n_absent]
+"""
+import sys
+import time
+
+import pandas as pd
+
+from synthetic import synthetic_timetable, synthetic_absences
+from constants import FREE_CLASS_LABELS, DOMAIN_PRIORITY
+from slot_index import FreeSlotIndex
+from utils import extract_class_level
+
+
+def mask_candidates(day_df, period, domains, absent):
+    """Candidate search as `generate_arrangement` did it before the index."""
+    free_teachers = day_df[
+        (day_df["Period"] == period) &
+        (~day_df["Teacher"].isin(absent)) &
+        (day_df["TPOD"] < 7) &
+        (day_df["Class"].isna() | day_df["Class"].isin(FREE_CLASS_LABELS))
+    ]
+    candidates = pd.DataFrame()
+    for domain in domains:
+        candidates = free_teachers[free_teachers["Domain"] == domain]
+        if not candidates.empty:
+            break
+    if candidates.empty:
+        relaxed_free = day_df[
+            (day_df["Period"] == period) &
+            (~day_df["Teacher"].isin(absent)) &
+            (day_df["Class"].isna() | day_df["Class"].isin(FREE_CLASS_LABELS))
+        ]
+        for domain in domains:
+            candidates = relaxed_free[relaxed_free["Domain"] == domain]
+            if not candidates.empty:
+                break
+    return list(candidates["Teacher"].unique()) if not candidates.empty else []
+
+
+def absent_slots(day_df, absent):
+    """Yield (period, domains) for every class the absent teachers would teach."""
+    rows = day_df[day_df["Teacher"].isin(absent) & day_df["Class"].notna()]
+    for period, class_val in zip(rows["Period"], rows["Class"]):
+        level = extract_class_level(class_val)
+        if level is None:
+            continue
+        target_domain = "Primary" if level <= 5 else "Secondary" if level <= 10 else "Senior Secondary"
+        yield period, DOMAIN_PRIORITY[target_domain]
+
+
+def run(n_teachers=1000, n_absent=30, day="Wednesday"):
+    timetable_df = synthetic_timetable(n_teachers)
+    absent = synthetic_absences(timetable_df, n_absent)
+    day_df = timetable_df[timetable_df["Day"].str.lower() == day.lower()]
+    slots = list(absent_slots(day_df, absent))
+
+    start = time.perf_counter()
+    mask_results = [mask_candidates(day_df, p, domains, absent.keys()) for p, domains in slots]
+    mask_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = FreeSlotIndex.build(timetable_df, day)
+    build_time = time.perf_counter() - start
+    start = time.perf_counter()
+    index_results = [index.candidates(p, domains, exclude=absent) for p, domains in slots]
+    lookup_time = time.perf_counter() - start
+
+    assert mask_results == index_results, "index candidates differ from mask path"
+    return {
+        "teachers": n_teachers,
+        "absent": n_absent,
+        "lookups": len(slots),
+        "mask_s": round(mask_time, 4),
+        "index_build_s": round(build_time, 4),
+        "index_lookup_s": round(lookup_time, 4),
+        "speedup": round(mask_time / max(build_time + lookup_time, 1e-9), 1),
+    }
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    print(run(*args))
@@ -0,0 +1,65 @@
+"""Absence changes after the morning run: full regeneration vs. update_arrangement.
+
+For each kind of change, counts the arrangement cells that differ from the
+arrangement already sent out, and times both paths.
+Usage: python benchmarks/bench_incremental.py [n_teachers] [n_absent] [n_trials]
+"""
+import random
+import sys
+import time
+
+from synthetic import synthetic_timetable, synthetic_absences
+from timetable_model import TimetableModel
+from arranger import generate_arrangement, update_arrangement, arrangement_changes
+
+DAY = "Wednesday"
+PERIODS = list(range(1, 9))
+HALF_DAY_SWAP = {"Full": "1st half", "1st half": "Full", "2nd half": "Full"}
+
+
+def change_absences(absent, teachers, kind, rng):
+    changed = dict(absent)
+    if kind == "added":
+        changed[rng.choice([t for t in teachers if t not in absent])] = "Full"
+    elif kind == "removed":
+        changed.pop(rng.choice(list(absent)))
+    else:
+        teacher = rng.choice(list(absent))
+        changed[teacher] = HALF_DAY_SWAP[absent[teacher]]
+    return changed
+
+
+def run(n_teachers=500, n_absent=30, n_trials=20):
+    timetable_df = synthetic_timetable(n_teachers)
+    model = TimetableModel.from_frame(timetable_df)
+    teachers = model.teachers.tolist()
+    results = {}
+    for kind in ("added", "removed", "half_day"):
+        totals = {"regenerate": [0, 0.0], "update": [0, 0.0]}
+        for trial in range(n_trials):
+            rng = random.Random(trial)
+            absent = synthetic_absences(timetable_df, n_absent, seed=trial)
+            current, suggestions = generate_arrangement(absent, {}, PERIODS, DAY, timetable_df, model=model)
+            changed = change_absences(absent, teachers, kind, rng)
+
+            start = time.perf_counter()
+            regenerated, _ = generate_arrangement(changed, {}, PERIODS, DAY, timetable_df, model=model)
+            totals["regenerate"][1] += time.perf_counter() - start
+            totals["regenerate"][0] += len(arrangement_changes(current, regenerated))
+
+            start = time.perf_counter()
+            _, _, changes = update_arrangement(current, changed, {}, PERIODS, DAY, timetable_df, suggestions, model=model)
+            totals["update"][1] += time.perf_counter() - start
+            totals["update"][0] += len(changes)
+        results[kind] = {
+            label: {"changed_cells": cells / n_trials, "seconds": round(seconds / n_trials, 4)}
+            for label, (cells, seconds) in totals.items()
+        }
+    return results
+
+
+if __name__ == "__main__":
+    n_teachers = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    n_absent = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    n_trials = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    print(run(n_teachers, n_absent, n_trials))
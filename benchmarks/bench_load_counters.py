@@ -0,0 +1,85 @@
+"""Week/month substitution counts: maintained counters vs. rescanning the monthly log,
+and how the counters even out a week of day-by-day generations.
+
+Usage: python benchmarks/bench_load_counters.py [n_teachers] [n_absent]
+"""
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from synthetic import synthetic_timetable, synthetic_absences
+from fake_sheets import install_fake_backend
+from arranger import collect_slots, solve_slots, build_arrangement_table
+from slot_index import FreeSlotIndex
+from gsheet import get_or_create_worksheet, load_df_from_gsheet
+from load_counters import count_substitutions, record_day_loads, load_history
+from persistence import append_to_monthly_log
+
+SPREADSHEET_ID = "bench"
+PERIODS = list(range(1, 9))
+
+
+def generate_day(timetable_df, day_date, absent, history=None):
+    day = day_date.strftime("%A")
+    day_df = timetable_df[timetable_df["Day"] == day]
+    slots = collect_slots(absent, day_df[day_df["Teacher"].isin(absent.keys())], PERIODS)
+    substitutes, suggestions = solve_slots("greedy", slots, FreeSlotIndex.build(day_df, day), absent, history=history)
+    return build_arrangement_table(slots, substitutes, suggestions, PERIODS, {})[0]
+
+
+def rescan_month(month_name):
+    """What a history lookup costs without counters: parse the whole month log."""
+    month_df = load_df_from_gsheet(get_or_create_worksheet(SPREADSHEET_ID, f"{month_name}Log"))
+    totals = {}
+    for _, group in month_df.groupby("Date"):
+        for teacher, n in count_substitutions(group).items():
+            totals[teacher] = totals.get(teacher, 0) + n
+    return totals
+
+
+def run(n_teachers=300, n_absent=20, first_day=date(2026, 10, 1), n_days=24):
+    timetable_df = synthetic_timetable(n_teachers, fill_ratio=0.8)
+    school_days = [first_day + timedelta(days=i) for i in range(n_days + n_days // 6 + 1)]
+    school_days = [d for d in school_days if d.strftime("%A") != "Sunday"][:n_days]
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, use_history in (("no_history", False), ("with_history", True)):
+            _, store, flusher = install_fake_backend(Path(tmp) / f"{label}.sqlite3")
+            random.seed(0)
+            week_loads = {}
+            for i, day_date in enumerate(school_days):
+                absent = synthetic_absences(timetable_df, n_absent, seed=i)
+                history = load_history(SPREADSHEET_ID, day_date, store) if use_history else None
+                arrangement_df = generate_day(timetable_df, day_date, absent, history)
+                append_to_monthly_log(arrangement_df, SPREADSHEET_ID, date=day_date)
+                record_day_loads(SPREADSHEET_ID, day_date, arrangement_df, store)
+                flusher.flush_once()
+                for teacher, n in count_substitutions(arrangement_df).items():
+                    key = (teacher, day_date.isocalendar()[1])
+                    week_loads[key] = week_loads.get(key, 0) + n
+            results[label] = {
+                "max_week_load": max(week_loads.values()),
+                "week_load_stdev": round(statistics.pstdev(week_loads.values()), 3),
+            }
+
+        start = time.perf_counter()
+        rescanned = rescan_month(first_day.strftime("%B"))
+        rescan_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        history = load_history(SPREADSHEET_ID, school_days[-1] + timedelta(days=1), store)
+        counter_seconds = time.perf_counter() - start
+
+        assert {t: m for t, (_, m) in history.items() if m} == rescanned, "counters disagree with the log"
+        results["lookup_seconds"] = {"rescan_month_log": round(rescan_seconds, 4), "counters": round(counter_seconds, 4)}
+    return results
+
+
+if __name__ == "__main__":
+    n_teachers = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    n_absent = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    print(run(n_teachers, n_absent))
@@ -0,0 +1,72 @@
+"""Startup reads and offline writes through the local SQLite tier.
+
+Runs against the in-process fake client with a simulated request latency.
+Usage: python benchmarks/bench_local_store.py [latency_seconds]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bench_persistence import SPREADSHEET_ID, sample_arrangement, persist_click
+from fake_sheets import install_fake_backend
+from gsheet import get_or_create_worksheet, read_worksheet_values
+from persistence import load_state_from_sheet, load_weekly_log
+
+
+def startup_reads():
+    """The reads app.py makes before drawing the Home page."""
+    state_ws = get_or_create_worksheet(SPREADSHEET_ID, "PersistentState")
+    load_state_from_sheet(state_ws)
+    load_weekly_log(SPREADSHEET_ID)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return round(time.perf_counter() - start, 4)
+
+
+def run(latency=0.05):
+    with tempfile.TemporaryDirectory() as tmp:
+        client, store, flusher = install_fake_backend(Path(tmp) / "store.sqlite3", latency)
+        persist_click(sample_arrangement())
+        flusher.flush_once()
+
+        # A fresh mirror (new container) vs. a warm one (any later rerun)
+        store.forget()
+        client.calls.clear()
+        cold_s = timed(startup_reads)
+        cold_calls = client.total_calls()
+        client.calls.clear()
+        warm_s = timed(startup_reads)
+        warm_calls = client.total_calls()
+
+        # Connection drops: the click still completes and reads stay local
+        client.offline = True
+        offline_click_s = timed(lambda: persist_click(sample_arrangement(12)))
+        startup_reads()
+        flusher.flush_once()
+        queued_while_offline, last_error = store.pending_status()
+
+        client.offline = False
+        flusher.flush_once()
+        queued_after_reconnect, _ = store.pending_status()
+        state_title = "PersistentState"
+        remote = client.spreadsheets[SPREADSHEET_ID].worksheets[state_title]._read(None)
+        assert remote == read_worksheet_values(get_or_create_worksheet(SPREADSHEET_ID, state_title))
+
+        return {
+            "latency_s": latency,
+            "startup_cold_mirror": {"seconds": cold_s, "calls": cold_calls},
+            "startup_warm_mirror": {"seconds": warm_s, "calls": warm_calls},
+            "offline_click_s": offline_click_s,
+            "queued_while_offline": queued_while_offline,
+            "offline_error": last_error,
+            "queued_after_reconnect": queued_after_reconnect,
+        }
+
+
+if __name__ == "__main__":
+    args = [float(a) for a in sys.argv[1:2]]
+    print(run(*args))
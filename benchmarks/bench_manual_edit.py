@@ -0,0 +1,91 @@
+"""Manual Edit work per rerun: filtering the flat suggestions table per period
+and writing cells one .loc at a time, vs. SuggestionIndex lookups and one
+apply_cell_edits update.
+
+Usage: python benchmarks/bench_manual_edit.py [n_teachers] [n_absent] [n_entries]
+"""
+import random
+import sys
+import time
+
+from synthetic import synthetic_timetable, synthetic_absences
+from timetable_model import TimetableModel
+from arranger import generate_arrangement, period_cells, cell_substitute, apply_cell_edits
+
+DAY = "Wednesday"
+PERIODS = list(range(1, 9))
+
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return round(best, 5)
+
+
+def edit_entries(suggestions, n_entries, seed=0):
+    """(teacher, [periods]) entries over slots that have a class, like an edit session would pick."""
+    rng = random.Random(seed)
+    slots = list(suggestions.entries)
+    teachers = sorted({teacher for teacher, _ in slots})
+    return [(teacher, suggestions.periods(teacher)[:3]) for teacher in rng.choices(teachers, k=n_entries)]
+
+
+def before(arrangement_df, suggestions_df, entries):
+    """The per-period filtering and per-cell writes Manual Edit used to do."""
+    edited = arrangement_df.copy()
+    for teacher, periods in entries:
+        teacher_df = edited[edited["Absent Teacher"] == teacher]
+        for period in periods:
+            suggestion = suggestions_df[
+                (suggestions_df["Absent Teacher"] == teacher) & (suggestions_df["Period"] == period)
+            ]
+            class_val = suggestion["Class"].values[0] if not suggestion.empty else "N/A"
+            names = suggestion["Suggested Teachers"].values[0].split(", ") if not suggestion.empty else []
+            current = teacher_df.iloc[0][f"Period {period}"]
+            choice = names[-1] if names else ""
+            if current.split(" (")[0].strip() != choice:
+                edited.loc[edited["Absent Teacher"] == teacher, f"Period {period}"] = f"{choice} ({class_val})"
+    return edited
+
+
+def after(arrangement_df, suggestions, entries):
+    cells = period_cells(arrangement_df)
+    edits = {}
+    for teacher, periods in entries:
+        for period in periods:
+            class_val = suggestions.class_of(teacher, period)
+            names = suggestions.candidates(teacher, period)
+            choice = names[-1] if names else ""
+            if cell_substitute(cells.get((teacher, period), ""), class_val) != choice:
+                edits[(teacher, f"Period {period}")] = f"{choice} ({class_val})"
+    return apply_cell_edits(arrangement_df, edits)
+
+
+def run(n_teachers=500, n_absent=40, n_entries=40):
+    timetable_df = synthetic_timetable(n_teachers)
+    absent = synthetic_absences(timetable_df, n_absent)
+    arrangement_df, suggestions = generate_arrangement(
+        absent, {}, PERIODS, DAY, timetable_df, model=TimetableModel.from_frame(timetable_df)
+    )
+    suggestions_df = suggestions.to_frame()
+    entries = edit_entries(suggestions, n_entries)
+    return {
+        "slots": len(suggestions),
+        "cells_edited": sum(len(periods) for _, periods in entries),
+        "candidates_per_slot": {
+            "saved_table": round(float(suggestions_df["Suggested Teachers"].str.count(", ").add(1).mean()), 1),
+            "index": round(sum(len(ranked) for _, ranked in suggestions.entries.values()) / max(len(suggestions), 1), 1),
+        },
+        "before": timed(lambda: before(arrangement_df, suggestions_df, entries)),
+        "after": timed(lambda: after(arrangement_df, suggestions, entries)),
+    }
+
+
+if __name__ == "__main__":
+    n_teachers = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    n_absent = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    n_entries = int(sys.argv[3]) if len(sys.argv) > 3 else 40
+    print(run(n_teachers, n_absent, n_entries))
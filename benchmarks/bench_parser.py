@@ -0,0 +1,48 @@
+"""Check the vectorized parser against the iterrows parser and time both.
+
+Usage: python benchmarks/bench_parser.py [n_teachers]
+"""
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from synthetic import synthetic_timetable, teacher_wise_sheet
+from parser import parse_teacher_wise
+
+DEFAULT_WORKBOOK = Path(__file__).resolve().parent.parent / "assets" / "KV TT.xlsx"
+
+
+def check_parity(raw_df):
+    """Raise if the two parsing modes disagree on `raw_df`."""
+    pd.testing.assert_frame_equal(
+        parse_teacher_wise(raw_df, vectorized=False),
+        parse_teacher_wise(raw_df, vectorized=True),
+    )
+
+
+def time_modes(raw_df):
+    timings = {}
+    for name, vectorized in (("iterrows_s", False), ("vectorized_s", True)):
+        start = time.perf_counter()
+        parse_teacher_wise(raw_df, vectorized=vectorized)
+        timings[name] = round(time.perf_counter() - start, 4)
+    timings["speedup"] = round(timings["iterrows_s"] / max(timings["vectorized_s"], 1e-9), 1)
+    return timings
+
+
+def run(n_teachers=1000):
+    default_raw = pd.read_excel(DEFAULT_WORKBOOK, sheet_name="TEACHER  WISE", header=None)
+    synthetic_raw = teacher_wise_sheet(synthetic_timetable(n_teachers))
+    check_parity(default_raw)
+    check_parity(synthetic_raw)
+    return {
+        "default_workbook": {"rows": len(default_raw), **time_modes(default_raw)},
+        "synthetic": {"teachers": n_teachers, "rows": len(synthetic_raw), **time_modes(synthetic_raw)},
+    }
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:2]]
+    print(run(*args))
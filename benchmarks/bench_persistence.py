@@ -0,0 +1,129 @@
+"""Count Sheets API calls for the persistence of one Generate Arrangement click,
+and the cells moved by monthly-log appends and PersistentState edits.
+
+Runs against the in-process fake client, so no credentials are needed.
+Calls are counted once the local outbox has been drained to the fake.
+Usage: python benchmarks/bench_persistence.py
+"""
+import datetime as dt
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+import synthetic  # noqa: F401  (puts src/ on sys.path)
+from fake_sheets import install_fake_backend
+import persistence
+from gsheet import SheetWriteBatch, get_or_create_worksheet, read_worksheet_values
+from persistence import save_state_to_sheet, load_state_from_sheet, persist_weekly_log, append_to_monthly_log
+
+SPREADSHEET_ID = "bench"
+
+
+def sample_arrangement(n_absent=10):
+    rows = []
+    for i in range(n_absent):
+        row = {"Absent Teacher": f"Teacher {i:03d} (TGT)", "Reason": "Leave"}
+        row.update({f"Period {p}": f"Teacher {100 + i + p:03d} (VI A)" for p in range(1, 9)})
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def persist_click(output_df, batch=None):
+    """The Sheets writes app.py performs after one Generate Arrangement click."""
+    today = datetime.today().strftime("%A, %d %B %Y")
+    state_ws = get_or_create_worksheet(SPREADSHEET_ID, "PersistentState")
+    suggestions_df = pd.DataFrame(columns=["Absent Teacher", "Period", "Class", "Suggested Teachers"])
+    save_state_to_sheet(today, "Full Day", list(output_df["Absent Teacher"]), {}, output_df, state_ws,
+                        suggestions_df=suggestions_df, batch=batch)
+    weekly_df = output_df.assign(Date=today, Day=datetime.today().strftime("%A"))
+    persist_weekly_log(weekly_df, SPREADSHEET_ID, batch=batch)
+    append_to_monthly_log(output_df, SPREADSHEET_ID, batch=batch)
+    if batch is not None:
+        batch.flush()
+
+
+def count_calls(batched, store_path):
+    client, _, flusher = install_fake_backend(store_path)
+    output_df = sample_arrangement()
+
+    # Warm the worksheet handles so only per-click requests are counted
+    for name in ("PersistentState", "WeeklyLog", f"{datetime.today():%B}Log"):
+        get_or_create_worksheet(SPREADSHEET_ID, name)
+    read_worksheet_values(get_or_create_worksheet(SPREADSHEET_ID, "PersistentState"))
+    get_or_create_worksheet(SPREADSHEET_ID, persistence.LOG_INDEX_SHEET, hidden=True)
+    persistence.load_log_index(SPREADSHEET_ID)
+    client.calls.clear()
+
+    persist_click(output_df, SheetWriteBatch(SPREADSHEET_ID) if batched else None)
+    flusher.flush_once()
+    return dict(client.calls), client.total_calls()
+
+
+def monthly_append_traffic(incremental, store_path, days_logged=25, n_absent=10):
+    """Cells moved by one monthly-log append late in a month."""
+    client, _, flusher = install_fake_backend(store_path)
+    real_datetime = persistence.datetime
+
+    class LogDate(dt.datetime):
+        current = dt.datetime(2026, 10, 1)
+
+        @classmethod
+        def today(cls):
+            return cls.current
+
+    persistence.datetime = LogDate
+    try:
+        for day in range(1, days_logged + 2):
+            if day == days_logged + 1:
+                client.calls.clear()
+                client.traffic.clear()
+            LogDate.current = dt.datetime(2026, 10, day)
+            persistence.append_to_monthly_log(sample_arrangement(n_absent), SPREADSHEET_ID, incremental=incremental)
+            flusher.flush_once()
+    finally:
+        persistence.datetime = real_datetime
+    return {"calls": client.total_calls(), "cells_written": client.traffic["written"], "cells_read": client.traffic["read"]}
+
+
+def state_edit_traffic(diff, store_path, n_absent=10):
+    """Cells written when one substitute is changed in an already saved arrangement."""
+    client, store, flusher = install_fake_backend(store_path)
+    ws = get_or_create_worksheet(SPREADSHEET_ID, "PersistentState")
+    output_df = sample_arrangement(n_absent)
+    absent = list(output_df["Absent Teacher"])
+    save_state_to_sheet("Monday, 05 October 2026", "Full Day", absent, {}, output_df, ws, diff=diff)
+    flusher.flush_once()
+
+    client.calls.clear()
+    client.traffic.clear()
+    edited = output_df.copy()
+    edited.loc[3, "Period 4"] = "Teacher 999 (VI A)"
+    save_state_to_sheet("Monday, 05 October 2026", "Full Day", absent, {}, edited, ws, diff=diff)
+    flusher.flush_once()
+    traffic = {"calls": client.total_calls(), "cells_written": client.traffic["written"]}
+
+    # Round trip straight from the fake sheet, bypassing the local mirror
+    store.forget()
+    restored = load_state_from_sheet(ws)[5]
+    assert restored.equals(edited.astype(restored.dtypes)), "restored arrangement differs"
+    return traffic
+
+
+def run():
+    with tempfile.TemporaryDirectory() as tmp:
+        per_function, per_function_total = count_calls(False, Path(tmp) / "per_function.sqlite3")
+        shared, shared_total = count_calls(True, Path(tmp) / "shared.sqlite3")
+        return {
+            "per_function_batches": {"calls": per_function, "total": per_function_total},
+            "shared_batch": {"calls": shared, "total": shared_total},
+            "monthly_append_full_rewrite": monthly_append_traffic(False, Path(tmp) / "full.sqlite3"),
+            "monthly_append_incremental": monthly_append_traffic(True, Path(tmp) / "incremental.sqlite3"),
+            "state_edit_full_rewrite": state_edit_traffic(False, Path(tmp) / "state_full.sqlite3"),
+            "state_edit_diff": state_edit_traffic(True, Path(tmp) / "state_diff.sqlite3"),
+        }
+
+
+if __name__ == "__main__":
+    print(run())
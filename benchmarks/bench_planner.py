@@ -0,0 +1,61 @@
+"""Plan a whole week at once: serial vs process-pool preparation, load spread,
+and the Sheets calls needed to save the plan. The pool is timed on its first
+call (workers start and receive the model) and on a second, reusing it.
+
+Usage: python benchmarks/bench_planner.py [n_teachers] [n_absent] [processes]
+"""
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from synthetic import synthetic_timetable, synthetic_absences
+from fake_sheets import install_fake_backend
+from planner import plan_days
+from timetable_model import TimetableModel
+from persistence import persist_plan_logs, load_log_index
+
+
+def week_absences(timetable_df, n_absent, monday=date(2026, 10, 5)):
+    """Different absences on each day Monday-Saturday."""
+    return {
+        monday + timedelta(days=i): (synthetic_absences(timetable_df, n_absent, seed=i), {})
+        for i in range(6)
+    }
+
+
+def run(n_teachers=1000, n_absent=30, processes=2):
+    timetable_df = synthetic_timetable(n_teachers)
+    day_absences = week_absences(timetable_df, n_absent)
+    periods = list(range(1, 9))
+    results = {}
+
+    model = TimetableModel.from_frame(timetable_df)
+    for label, workers in (("serial", 1), (f"pool_{processes}_first", processes), (f"pool_{processes}_reused", processes)):
+        start = time.perf_counter()
+        plans, loads = plan_days(day_absences, timetable_df, periods, processes=workers, model=model)
+        results[label] = {"seconds": round(time.perf_counter() - start, 3)}
+
+    # Load spread over the week: shared counts vs. a fresh count per day
+    separate = {}
+    for day_plan in (plan_days({d: a}, timetable_df, periods, processes=1)[1] for d, a in day_absences.items()):
+        for teacher, n in day_plan.items():
+            separate[teacher] = separate.get(teacher, 0) + n
+    results["max_week_load"] = {"shared": max(loads.values()), "per_day": max(separate.values())}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        client, _, flusher = install_fake_backend(Path(tmp) / "planner.sqlite3")
+        load_log_index("bench")
+        client.calls.clear()
+        persist_plan_logs(None, [(plan["date"], plan["arrangement"]) for plan in plans], "bench")
+        flusher.flush_once()
+        results["save_calls"] = dict(client.calls)
+    return results
+
+
+if __name__ == "__main__":
+    n_teachers = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    n_absent = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+    print(run(n_teachers, n_absent, processes))
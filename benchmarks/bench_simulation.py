@@ -0,0 +1,43 @@
+"""What-if simulation throughput: sampled absence scenarios solved against one
+shared TimetableModel, in-process and across a process pool (first call,
+which starts the workers, and a second one reusing them).
+
+Usage: python benchmarks/bench_simulation.py [n_teachers] [n_scenarios] [k_absent] [processes]
+"""
+import sys
+import time
+
+from synthetic import synthetic_timetable
+from timetable_model import TimetableModel
+from simulation import absence_pool, make_scenarios, simulate, scenario_coverage
+
+DAY = "Wednesday"
+PERIODS = list(range(1, 9))
+
+
+def run(n_teachers=1000, n_scenarios=5000, k_absent=5, processes=2):
+    timetable_df = synthetic_timetable(n_teachers)
+    start = time.perf_counter()
+    model = TimetableModel.from_frame(timetable_df)
+    results = {"model_build": round(time.perf_counter() - start, 4)}
+    scenarios = make_scenarios(absence_pool(model), k_absent, "sample", n_scenarios, seed=1)
+
+    runs = (("in_process", 1), (f"pool_{processes}_first", processes), (f"pool_{processes}_reused", processes))
+    for label, workers in runs:
+        start = time.perf_counter()
+        counts = simulate(model, DAY, scenarios, PERIODS, processes=workers, seed=1)
+        seconds = time.perf_counter() - start
+        results[label] = {
+            "seconds": round(seconds, 3),
+            "scenarios_per_second": round(len(scenarios) / seconds),
+            "mean_coverage": round(float(scenario_coverage(counts).mean()), 4),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    n_teachers = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    n_scenarios = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    k_absent = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    processes = int(sys.argv[4]) if len(sys.argv) > 4 else 2
+    print(run(n_teachers, n_scenarios, k_absent, processes))
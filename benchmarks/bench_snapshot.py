@@ -0,0 +1,55 @@
+"""Compare an xlsx parse with loading the columnar snapshot of the same timetable.
+
+Usage: python benchmarks/bench_snapshot.py [n_teachers]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from synthetic import synthetic_timetable, write_teacher_wise_workbook
+from parser import parse_timetable
+from snapshot import save_snapshot, load_snapshot
+
+
+def directory_size(path):
+    return sum(f.stat().st_size for f in Path(path).iterdir())
+
+
+def run(n_teachers=1000):
+    with tempfile.TemporaryDirectory() as tmp:
+        workbook = write_teacher_wise_workbook(Path(tmp) / "timetable.xlsx", synthetic_timetable(n_teachers))
+
+        start = time.perf_counter()
+        parsed_df = parse_timetable(workbook)
+        parse_time = time.perf_counter() - start
+
+        snapshot = Path(tmp) / "timetable.xlsx.snapshot"
+        save_snapshot(parsed_df, snapshot, source="bench")
+
+        start = time.perf_counter()
+        loaded_df = load_snapshot(snapshot, source="bench")
+        load_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        categorical_df = load_snapshot(snapshot, source="bench", categorical=True)
+        categorical_time = time.perf_counter() - start
+
+        pd.testing.assert_frame_equal(parsed_df, loaded_df)
+        return {
+            "teachers": n_teachers,
+            "rows": len(parsed_df),
+            "xlsx_parse_s": round(parse_time, 4),
+            "snapshot_load_s": round(load_time, 4),
+            "snapshot_categorical_load_s": round(categorical_time, 4),
+            "snapshot_bytes": directory_size(snapshot),
+            "frame_bytes": int(parsed_df.memory_usage(deep=True).sum()),
+            "categorical_frame_bytes": int(categorical_df.memory_usage(deep=True).sum()),
+        }
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:2]]
+    print(run(*args))
@@ -0,0 +1,60 @@
+"""Streamlit cold start: module import cost and the Sheets calls made before the
+first page is drawn, with an empty and with a warm local mirror.
+
+Each Sheets request sleeps `latency` seconds on the fake client.
+Usage: python benchmarks/bench_startup.py [latency]
+"""
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import synthetic  # noqa: F401  (puts src/ on sys.path)
+from fake_sheets import install_fake_backend
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+IMPORT_PROBE = """
+import sys, time
+sys.path.insert(0, {src!r})
+start = time.perf_counter()
+import gsheet, persistence, arranger, planner, load_counters, parse_cache
+elapsed = time.perf_counter() - start
+print(elapsed, [m for m in ("gspread", "google.oauth2", "openpyxl") if m in sys.modules])
+"""
+
+
+def import_cost():
+    """Import the app's modules in a fresh interpreter; returns (seconds, heavy modules loaded)."""
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE.format(src=str(SRC))], capture_output=True, text=True, check=True
+    ).stdout.split(" ", 1)
+    return round(float(out[0]), 3), out[1].strip()
+
+
+def first_run(store_path, latency):
+    """Run app.py once in AppTest and report the Sheets calls it made and how long it took."""
+    from streamlit.testing.v1 import AppTest
+
+    client, _, _ = install_fake_backend(store_path, latency=latency)
+    at = AppTest.from_file(str(SRC / "app.py"), default_timeout=120)
+    start = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - start
+    assert not at.exception, at.exception
+    return {"seconds": round(elapsed, 3), "sheets_calls": client.total_calls()}
+
+
+def run(latency=0.2):
+    with tempfile.TemporaryDirectory() as tmp:
+        store_path = Path(tmp) / "startup.sqlite3"
+        return {
+            "imports": import_cost(),
+            "empty_mirror": first_run(store_path, latency),
+            # Same local store, new process-wide client: a container restart
+            "warm_mirror": first_run(store_path, latency),
+        }
+
+
+if __name__ == "__main__":
+    print(run(float(sys.argv[1]) if len(sys.argv) > 1 else 0.2))
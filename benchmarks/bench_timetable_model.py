@@ -0,0 +1,56 @@
+"""TimetableModel vs. the long-form frame: building the model, building a day's
+free-slot index, collecting slots and generating a full arrangement.
+
+Usage: python benchmarks/bench_timetable_model.py [n_teachers] [n_absent]
+"""
+import random
+import sys
+import time
+
+from synthetic import synthetic_timetable, synthetic_absences
+from timetable_model import TimetableModel
+from slot_index import FreeSlotIndex
+from arranger import collect_slots, generate_arrangement
+
+DAY = "Wednesday"
+PERIODS = list(range(1, 9))
+
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        # The greedy solver shuffles ties; keep both paths on the same draws
+        random.seed(0)
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return round(best, 5)
+
+
+def run(n_teachers=1000, n_absent=60):
+    timetable_df = synthetic_timetable(n_teachers)
+    model = TimetableModel.from_frame(timetable_df)
+    absent = synthetic_absences(timetable_df, n_absent)
+    day_df = timetable_df[timetable_df["Day"] == DAY]
+    absent_df = day_df[day_df["Teacher"].isin(absent)]
+
+    return {
+        "rows": len(timetable_df),
+        "occupancy_bytes": model.occupancy.nbytes,
+        "model_build": timed(lambda: TimetableModel.from_frame(timetable_df)),
+        "free_slot_index": {"frame": timed(lambda: FreeSlotIndex.build(timetable_df, DAY)),
+                            "model": timed(lambda: FreeSlotIndex.from_model(model, DAY))},
+        "collect_slots": {"frame": timed(lambda: collect_slots(absent, absent_df, PERIODS)),
+                          "model": timed(lambda: model.collect_slots(absent, DAY, PERIODS))},
+        "free_mask": timed(lambda: model.free_mask(DAY, 3, "TGT", under_limit=True)),
+        "generate_greedy": {
+            "frame": timed(lambda: generate_arrangement(absent, {}, PERIODS, DAY, timetable_df)),
+            "model": timed(lambda: generate_arrangement(absent, {}, PERIODS, DAY, timetable_df, model=model)),
+        },
+    }
+
+
+if __name__ == "__main__":
+    n_teachers = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    n_absent = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    print(run(n_teachers, n_absent))
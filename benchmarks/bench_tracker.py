@@ -0,0 +1,71 @@
+"""Month Wise tracker on a cold local mirror: reading the whole month log vs. the
+LogIndex plus the row blocks of the days actually opened.
+
+The fake client sleeps `latency` seconds per request whatever its size, so
+compare cells_read as well as seconds.
+Usage: python benchmarks/bench_tracker.py [n_teachers] [n_absent] [latency]
+"""
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from synthetic import synthetic_timetable, synthetic_absences
+from fake_sheets import install_fake_backend
+from planner import plan_days
+from persistence import persist_plan_logs, load_month_log, month_log_dates, load_month_log_days, reset_log_index
+
+SPREADSHEET_ID = "bench"
+MONTH = date(2026, 10, 1)
+
+
+def write_month(timetable_df, n_absent):
+    days = [MONTH + timedelta(days=i) for i in range(31)]
+    day_absences = {d: (synthetic_absences(timetable_df, n_absent, seed=d.day), {}) for d in days if d.weekday() != 6}
+    plans, _ = plan_days(day_absences, timetable_df, list(range(1, 9)), processes=1)
+    persist_plan_logs(None, [(plan["date"], plan["arrangement"]) for plan in plans], SPREADSHEET_ID)
+
+
+def run(n_teachers=500, n_absent=40, latency=0.2):
+    timetable_df = synthetic_timetable(n_teachers)
+    month_name = f"{MONTH:%B}"
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        client, store, flusher = install_fake_backend(Path(tmp) / "tracker.sqlite3")
+        write_month(timetable_df, n_absent)
+        flusher.flush_once()
+        results["log_rows"] = sum(len(df) for df in load_month_log_days(
+            SPREADSHEET_ID, month_name, month_log_dates(SPREADSHEET_ID, month_name)).values())
+
+        # Before: the first paint read the whole log. Now it reads the LogIndex,
+        # and each opened day costs a ranged read of its rows.
+        cases = {
+            "whole_month": lambda: load_month_log(SPREADSHEET_ID, month_name),
+            "first_paint": lambda: month_log_dates(SPREADSHEET_ID, month_name),
+            "first_paint_and_two_days": lambda: load_month_log_days(
+                SPREADSHEET_ID, month_name, month_log_dates(SPREADSHEET_ID, month_name)[:2]
+            ),
+        }
+        client.latency = latency
+        for label, read in cases.items():
+            # Same process and client, empty local mirror
+            store.forget()
+            reset_log_index(SPREADSHEET_ID)
+            client.calls.clear()
+            client.traffic.clear()
+            start = time.perf_counter()
+            read()
+            results[label] = {
+                "seconds": round(time.perf_counter() - start, 3),
+                "calls": client.total_calls(),
+                "cells_read": client.traffic["read"],
+            }
+    return results
+
+
+if __name__ == "__main__":
+    n_teachers = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    n_absent = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    latency = float(sys.argv[3]) if len(sys.argv) > 3 else 0.2
+    print(run(n_teachers, n_absent, latency))
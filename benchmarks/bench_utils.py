@@ -0,0 +1,58 @@
+"""Classification and log-date helpers: per-row calls vs. the Series versions, and slot
+collection for a day with many absences.
+
+Usage: python benchmarks/bench_utils.py [n_teachers] [n_absent]
+"""
+import sys
+import time
+
+import pandas as pd
+
+from synthetic import synthetic_timetable, synthetic_absences
+from utils import (
+    get_teacher_domain, teacher_domains, extract_class_level, class_levels, parse_log_date, log_dates,
+    is_same_week, in_week,
+)
+from arranger import collect_slots
+
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return round(best, 5)
+
+
+def run(n_teachers=1000, n_absent=60):
+    timetable_df = synthetic_timetable(n_teachers)
+    teachers, classes = timetable_df["Teacher"], timetable_df["Class"]
+    dates = pd.Series(pd.date_range("2026-01-01", periods=len(timetable_df) // 10, freq="h").strftime("%A, %d %B %Y"))
+    day_df = timetable_df[timetable_df["Day"] == "Wednesday"]
+    absent = synthetic_absences(timetable_df, n_absent)
+    absent_df = day_df[day_df["Teacher"].isin(absent)]
+
+    # The scalar helpers are memoized; clear them so every repeat pays the per-row cost
+    def per_row(fn, values):
+        fn.cache_clear()
+        return [fn(v) for v in values]
+
+    return {
+        "rows": len(timetable_df),
+        "teacher_domain": {"per_row": timed(lambda: per_row(get_teacher_domain, teachers)),
+                           "series": timed(lambda: teacher_domains(teachers))},
+        "class_level": {"per_row": timed(lambda: per_row(extract_class_level, classes)),
+                        "series": timed(lambda: class_levels(classes))},
+        "log_date": {"per_row": timed(lambda: per_row(parse_log_date, dates)),
+                     "series": timed(lambda: log_dates(dates))},
+        "same_week": {"per_row": timed(lambda: parse_log_date.cache_clear() or [is_same_week(d) for d in dates]),
+                      "series": timed(lambda: in_week(dates))},
+        "collect_slots": timed(lambda: collect_slots(absent, absent_df, list(range(1, 9)))),
+    }
+
+
+if __name__ == "__main__":
+    n_teachers = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    n_absent = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    print(run(n_teachers, n_absent))
@@ -0,0 +1,205 @@
+"""In-process stand-in for a gspread client that counts API calls."""
+import re
+import time
+from collections import Counter
+
+import gspread
+from gspread.utils import a1_to_rowcol
+
+
+class FakeClient:
+    """Set `offline = True` to make every request raise ConnectionError, and
+    `latency` to a number of seconds to sleep per request.
+    """
+
+    def __init__(self, latency=0.0):
+        self.spreadsheets = {}
+        self.calls = CallCounter(self)
+        self.traffic = Counter()
+        self.offline = False
+        self.latency = latency
+
+    def open_by_key(self, key):
+        self.calls["open_by_key"] += 1
+        if key not in self.spreadsheets:
+            self.spreadsheets[key] = FakeSpreadsheet(key, self.calls, self.traffic)
+        return self.spreadsheets[key]
+
+    def total_calls(self):
+        return sum(self.calls.values())
+
+
+class CallCounter(Counter):
+    """Counts requests; raises on every request while the client is offline."""
+
+    def __init__(self, client):
+        super().__init__()
+        self.client = client
+
+    def __missing__(self, key):
+        return 0
+
+    def __setitem__(self, key, value):
+        if value > self[key]:
+            if self.client.offline:
+                raise ConnectionError("Sheets is unreachable")
+            time.sleep(self.client.latency)
+        super().__setitem__(key, value)
+
+
+class FakeSpreadsheet:
+    def __init__(self, key, calls, traffic):
+        self.id = key
+        self.calls = calls
+        self.traffic = traffic
+        self.worksheets = {}
+
+    def worksheet(self, title):
+        self.calls["worksheet"] += 1
+        if title not in self.worksheets:
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return self.worksheets[title]
+
+    def add_worksheet(self, title, rows=1000, cols=20, index=None):
+        self.calls["add_worksheet"] += 1
+        self.worksheets[title] = FakeWorksheet(title, self)
+        return self.worksheets[title]
+
+    def values_batch_clear(self, params=None, body=None):
+        self.calls["values_batch_clear"] += 1
+        for sheet_range in body["ranges"]:
+            title, cell_range = _split_range(sheet_range)
+            self.worksheets[title]._clear(cell_range)
+
+    def values_batch_update(self, body=None):
+        self.calls["values_batch_update"] += 1
+        for item in body["data"]:
+            title, cell_range = _split_range(item["range"])
+            self.worksheets[title]._write(cell_range, item["values"])
+
+    def values_get(self, range, params=None):
+        self.calls["values_get"] += 1
+        title, cell_range = _split_range(range)
+        return {"range": range, "values": self.worksheets[title]._read(cell_range)}
+
+    def values_batch_get(self, ranges, params=None):
+        self.calls["values_batch_get"] += 1
+        value_ranges = []
+        for sheet_range in ranges:
+            title, cell_range = _split_range(sheet_range)
+            value_ranges.append({"range": sheet_range, "values": self.worksheets[title]._read(cell_range)})
+        return {"valueRanges": value_ranges}
+
+
+class FakeWorksheet:
+    def __init__(self, title, spreadsheet):
+        self.title = title
+        self.spreadsheet = spreadsheet
+        self.row_count = 1000
+        self.col_count = 26
+        self.cells = {}
+
+    # gspread-style calls, each counted as one request
+    def get_all_values(self, *args, **kwargs):
+        self.spreadsheet.calls["get_all_values"] += 1
+        return self._read(None)
+
+    def get(self, range_name=None, *args, **kwargs):
+        self.spreadsheet.calls["get"] += 1
+        return self._read(range_name)
+
+    def clear(self):
+        self.spreadsheet.calls["clear"] += 1
+        self.cells = {}
+
+    def update(self, values, range_name=None, *args, **kwargs):
+        self.spreadsheet.calls["update"] += 1
+        if isinstance(values, str):
+            values, range_name = range_name, values
+        self._write(range_name or "A1", values)
+
+    def hide(self):
+        self.spreadsheet.calls["hide"] += 1
+
+    def acell(self, label, *args, **kwargs):
+        self.spreadsheet.calls["acell"] += 1
+        row, col = a1_to_rowcol(label)
+        return type("Cell", (), {"value": self.cells.get((row, col))})()
+
+    # Storage helpers (not counted as requests; cell traffic is tallied)
+    def _write(self, cell_range, values):
+        row, col = a1_to_rowcol(cell_range.split(":")[0]) if cell_range else (1, 1)
+        for r, row_values in enumerate(values):
+            self.spreadsheet.traffic["written"] += len(row_values)
+            for c, value in enumerate(row_values):
+                if value in ("", None):
+                    self.cells.pop((row + r, col + c), None)
+                else:
+                    self.cells[(row + r, col + c)] = str(value)
+
+    def _clear(self, cell_range):
+        if not cell_range:
+            self.cells = {}
+            return
+        (r0, c0), (r1, c1) = _bounds(cell_range)
+        self.cells = {k: v for k, v in self.cells.items() if not (r0 <= k[0] <= r1 and c0 <= k[1] <= c1)}
+
+    def _read(self, cell_range):
+        if not self.cells:
+            return []
+        max_row = max(r for r, _ in self.cells)
+        max_col = max(c for _, c in self.cells)
+        (r0, c0), (r1, c1) = _bounds(cell_range) if cell_range else ((1, 1), (max_row, max_col))
+        r1, c1 = min(r1, max_row), min(c1, max_col)
+        rows = [[self.cells.get((r, c), "") for c in range(c0, c1 + 1)] for r in range(r0, r1 + 1)]
+        while rows and not any(rows[-1]):
+            rows.pop()
+        self.spreadsheet.traffic["read"] += sum(len(row) for row in rows)
+        return rows
+
+
+def _split_range(sheet_range):
+    match = re.match(r"^'((?:[^']|'')*)'(?:!(.*))?$", sheet_range) or re.match(r"^([^!]*)(?:!(.*))?$", sheet_range)
+    return match.group(1).replace("''", "'"), match.group(2)
+
+
+def _bounds(cell_range):
+    """Return ((row, col), (row, col)) for an A1 range like 'A3:H10' or '3:10'."""
+    start, _, end = cell_range.partition(":")
+    end = end or start
+    return _corner(start, 1), _corner(end, 10 ** 6)
+
+
+def _corner(label, default):
+    match = re.match(r"^([A-Z]*)(\d*)$", label)
+    letters, digits = match.groups()
+    col = default
+    if letters:
+        col = 0
+        for ch in letters:
+            col = col * 26 + ord(ch) - 64
+    return (int(digits) if digits else default, col)
+
+
+def install_fake_backend(store_path, latency=0.0):
+    """Point gsheet at a new FakeClient and a LocalStore at `store_path`.
+
+    The outbox thread is not started; call `flusher.flush_once()` to push
+    queued writes to the fake client. Returns (client, store, flusher).
+    """
+    import gsheet
+    import load_counters
+    import persistence
+    from local_store import LocalStore, OutboxFlusher
+
+    client = FakeClient(latency)
+    store = LocalStore(store_path)
+    flusher = OutboxFlusher(store, gsheet.send_writes, is_client_error=gsheet.is_client_error)
+    gsheet.get_gsheet_client = lambda: client
+    gsheet.get_local_store = lambda: store
+    load_counters.get_local_store = lambda: store
+    gsheet.get_outbox_flusher = lambda: flusher
+    gsheet.get_spreadsheet.clear()
+    gsheet.get_or_create_worksheet.clear()
+    persistence._log_index_cache.clear()
+    return client, store, flusher
@@ -0,0 +1,125 @@
+"""Benchmark suite: the hot paths of one Generate click on a synthetic school,
+written as JSON so runs on different commits can be compared.
+
+Cases: parse_timetable on a TEACHER WISE workbook, generate_arrangement with
+each solver (it does no persistence), the conflict checker, the load counter
+and the Excel export (written, and served from the export cache). Each case reports the min and median of `--repeat` runs.
+
+Usage: python benchmarks/run.py [--teachers N] [--absent N] [--fill RATIO]
+       [--mix PGT=0.3,...] [--repeat N] [-o results.json] [--compare old.json]
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from synthetic import (
+    synthetic_timetable, synthetic_absences, write_teacher_wise_workbook, parse_domain_mix, DEFAULT_DOMAIN_MIX,
+)
+from parser import parse_timetable
+from arranger import generate_arrangement, assignment_records, SOLVERS
+from analytics import find_conflicts, substitute_loads
+from export import arrangement_workbook, write_workbook
+
+DAY = "Wednesday"
+PERIODS = list(range(1, 9))
+
+
+def measure(fn, repeat):
+    """Call `fn` `repeat` times; returns the timing summary and the last result."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return {"min": round(min(times), 5), "median": round(statistics.median(times), 5), "runs": repeat}, result
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(n_teachers=1000, n_absent=30, fill_ratio=0.7, domain_mix=None, repeat=5):
+    timetable_df = synthetic_timetable(n_teachers, fill_ratio=fill_ratio, domain_mix=domain_mix)
+    absent = synthetic_absences(timetable_df, n_absent)
+    cases = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workbook = write_teacher_wise_workbook(Path(tmp) / "timetable.xlsx", timetable_df)
+        cases["parse_timetable"], _ = measure(lambda: parse_timetable(str(workbook)), repeat)
+
+    arrangement_df = None
+    for solver in SOLVERS:
+        def generate():
+            random.seed(0)
+            return generate_arrangement(absent, {}, PERIODS, DAY, timetable_df, solver=solver)[0]
+        cases[f"generate_{solver}"], result = measure(generate, repeat)
+        arrangement_df = result if arrangement_df is None else arrangement_df
+
+    cases["assignment_records"], assignments = measure(lambda: assignment_records(arrangement_df), repeat)
+    cases["conflicts"], _ = measure(lambda: find_conflicts(assignments, timetable_df, DAY), repeat)
+    cases["loads"], _ = measure(lambda: substitute_loads(assignments), repeat)
+    title = f"Arrangement for {DAY}"
+    cases["excel_export"], _ = measure(lambda: write_workbook([("Arrangement", title, arrangement_df)]), repeat)
+    arrangement_workbook(arrangement_df, title)
+    cases["excel_export_cached"], _ = measure(lambda: arrangement_workbook(arrangement_df, title), repeat)
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "params": {
+            "teachers": n_teachers, "absent": n_absent, "fill_ratio": fill_ratio,
+            "domain_mix": domain_mix or DEFAULT_DOMAIN_MIX, "repeat": repeat,
+            "arrangement_rows": len(arrangement_df),
+        },
+        "cases": cases,
+    }
+
+
+def compare(old, new):
+    """Print the median change per case between two result documents."""
+    print(f"{'case':<20} {old.get('commit') or 'old':>10} {new.get('commit') or 'new':>10}   change")
+    for case, timing in new["cases"].items():
+        before = old.get("cases", {}).get(case, {}).get("median")
+        after = timing["median"]
+        change = f"{(after - before) / before:+.1%}" if before else "n/a"
+        print(f"{case:<20} {before if before is not None else '-':>10} {after:>10}   {change}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--teachers", type=int, default=1000)
+    ap.add_argument("--absent", type=int, default=30)
+    ap.add_argument("--fill", type=float, default=0.7)
+    ap.add_argument("--mix", type=parse_domain_mix, help="domain weights, e.g. PGT=0.3,TGT=0.5,PRT=0.2")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("-o", "--output", help="write the results here instead of stdout")
+    ap.add_argument("--compare", help="earlier results JSON to compare against")
+    args = ap.parse_args(argv)
+
+    results = run(args.teachers, args.absent, args.fill, args.mix, args.repeat)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text()), results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
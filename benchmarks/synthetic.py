@@ -0,0 +1,120 @@
+"""Synthetic timetables for the benchmarks.
+
+Usage: python benchmarks/synthetic.py -o timetable.xlsx [--teachers N] [--days N]
+       [--fill RATIO] [--mix PGT=0.3,TGT=0.35,...] [--seed N]
+"""
+import argparse
+import random
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from utils import get_teacher_domain
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+DEFAULT_DOMAIN_MIX = {"PGT": 0.3, "TGT": 0.35, "PRT": 0.2, "Misc": 0.14, "Principal": 0.01}
+DOMAIN_TITLES = {
+    "PGT": ["PGT PHY.", "PGT CHEMISTRY", "PGT MATHS", "PGT ENGLISH"],
+    "TGT": ["TGT MATHS", "TGT SCIENCE", "TGT HINDI", "TGT S.ST"],
+    "PRT": ["PRT"],
+    "Misc": ["PH&E", "MUSIC", "COMPUTER INSTRUCTOR", "LIBR."],
+    "Principal": ["PRINCIPAL"],
+}
+DOMAIN_CLASSES = {
+    "PGT": ["XI A", "XI B", "XII A", "XII B"],
+    "TGT": ["VI A", "VI B", "VII A", "VIII A", "IX A", "X A"],
+    "PRT": ["I A", "II A", "III A", "IV A", "V A"],
+    "Misc": ["VI A", "VIII B", "CCA", "LIB"],
+    "Principal": ["XII A"],
+}
+
+
+def synthetic_teachers(n_teachers, domain_mix=None, seed=0):
+    """Return `n_teachers` names whose titles follow `domain_mix`."""
+    rng = random.Random(seed)
+    mix = domain_mix or DEFAULT_DOMAIN_MIX
+    domains = rng.choices(list(mix), weights=list(mix.values()), k=n_teachers)
+    return [f"Teacher {i:04d} ({rng.choice(DOMAIN_TITLES[d])})" for i, d in enumerate(domains)]
+
+
+def synthetic_timetable(n_teachers=1000, n_days=6, fill_ratio=0.7, domain_mix=None, seed=0):
+    """Build a parsed (long-form) timetable like `parse_timetable` returns."""
+    rng = random.Random(seed)
+    rows = []
+    for teacher in synthetic_teachers(n_teachers, domain_mix, seed):
+        domain = get_teacher_domain(teacher)
+        classes = DOMAIN_CLASSES.get(domain, DOMAIN_CLASSES["TGT"])
+        tpod = rng.choice([None, 5, 6, 7])
+        for day in DAYS[:n_days]:
+            for period in range(1, 9):
+                class_val = rng.choice(classes) if rng.random() < fill_ratio else None
+                rows.append({
+                    "Teacher": teacher,
+                    "Day": day,
+                    "Period": period,
+                    "Class": class_val,
+                    "TPOD": tpod,
+                    "Domain": domain,
+                })
+    return pd.DataFrame(rows)
+
+
+def synthetic_absences(timetable_df, n_absent=30, seed=0):
+    """Pick `n_absent` teachers with a mix of full and half-day absences."""
+    rng = random.Random(seed)
+    teachers = rng.sample(list(timetable_df["Teacher"].unique()), n_absent)
+    return {t: rng.choice(["Full", "Full", "1st half", "2nd half"]) for t in teachers}
+
+
+def teacher_wise_sheet(timetable_df):
+    """Lay a parsed timetable back out in the `TEACHER  WISE` sheet format."""
+    rows = []
+    for teacher, teacher_df in timetable_df.groupby("Teacher", sort=False):
+        rows.append([teacher] + [None] * 9)
+        rows.append([None] + list(range(1, 9)) + ["TPOD"])
+        for day, day_df in teacher_df.groupby("Day", sort=False):
+            classes = day_df.sort_values("Period")["Class"].tolist()
+            tpod = day_df["TPOD"].iloc[0]
+            rows.append([day.upper()] + classes + [tpod])
+        rows.append([None] * 8 + ["TOTAL", None])
+        rows.append([None] * 10)
+    return pd.DataFrame(rows)
+
+
+def write_teacher_wise_workbook(path, timetable_df):
+    """Write a synthetic timetable as an xlsx workbook `parse_timetable` can read."""
+    teacher_wise_sheet(timetable_df).to_excel(path, sheet_name="TEACHER  WISE", header=False, index=False)
+    return path
+
+
+def parse_domain_mix(text):
+    """Parse "PGT=0.3,TGT=0.5,PRT=0.2" into a domain -> weight mapping."""
+    mix = {}
+    for part in text.split(","):
+        domain, _, weight = part.partition("=")
+        if domain.strip() not in DOMAIN_TITLES:
+            raise SystemExit(f"error: unknown domain {domain.strip()!r}; use {', '.join(DOMAIN_TITLES)}")
+        mix[domain.strip()] = float(weight)
+    return mix
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Write a synthetic TEACHER  WISE workbook.")
+    ap.add_argument("-o", "--output", required=True, help="workbook path (.xlsx)")
+    ap.add_argument("--teachers", type=int, default=1000)
+    ap.add_argument("--days", type=int, default=6, choices=range(1, 7))
+    ap.add_argument("--fill", type=float, default=0.7, help="share of periods with a class")
+    ap.add_argument("--mix", type=parse_domain_mix, help="domain weights, e.g. PGT=0.3,TGT=0.5,PRT=0.2")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    timetable_df = synthetic_timetable(args.teachers, args.days, args.fill, args.mix, args.seed)
+    write_teacher_wise_workbook(args.output, timetable_df)
+    print(f"{args.teachers} teacher(s), {args.days} day(s) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
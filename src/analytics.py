@@ -0,0 +1,51 @@
+import pandas as pd
+from constants import FREE_CLASS_LABELS
+from perf import instrumented
+
+CONFLICT_COLUMNS = ["Conflict Period", "Teacher", "Conflicting With", "Also Assigned To", "Type"]
+
+
+@instrumented("conflict_check", rows=len)
+def find_conflicts(assignments, timetable_df=None, day=None):
+    """Return one row per clash in `assignments` (see arranger.assignment_records).
+
+    A "Double booking" is a substitute given two classes in one period; the
+    first assignment is reported as the one it conflicts with. With the
+    timetable and day, an "Own class" row is added wherever the substitute has
+    a timetabled class of their own in that period.
+    """
+    keys = ["Substitute Teacher", "Period"]
+    first = assignments.groupby(keys, sort=False)["Absent Teacher"].transform("first")
+    repeated = assignments.duplicated(keys, keep="first")
+    double = pd.DataFrame({
+        "Conflict Period": "Period " + assignments["Period"].astype(str),
+        "Teacher": assignments["Substitute Teacher"],
+        "Conflicting With": first,
+        "Also Assigned To": assignments["Absent Teacher"],
+        "Type": "Double booking",
+    })[repeated]
+    if timetable_df is None or day is None:
+        return double.reset_index(drop=True)
+
+    day_df = timetable_df[timetable_df["Day"].str.lower() == day.lower()]
+    day_df = day_df[day_df["Teacher"].isin(assignments["Substitute Teacher"].unique())]
+    classes = day_df["Class"].astype("string").str.strip()
+    busy = day_df.loc[classes.notna() & ~classes.isin(FREE_CLASS_LABELS), ["Teacher", "Period", "Class"]]
+    own = assignments.merge(
+        busy.rename(columns={"Teacher": "Substitute Teacher", "Class": "Own Class"}), on=keys
+    )
+    own_class = pd.DataFrame({
+        "Conflict Period": "Period " + own["Period"].astype(str),
+        "Teacher": own["Substitute Teacher"],
+        "Conflicting With": "Own class " + own["Own Class"].astype(str),
+        "Also Assigned To": own["Absent Teacher"],
+        "Type": "Own class",
+    })
+    return pd.concat([double, own_class], ignore_index=True)
+
+
+@instrumented("load_count", rows=len)
+def substitute_loads(assignments):
+    """Return periods covered per substitute as a Teacher / Assigned Periods frame, busiest first."""
+    counts = assignments["Substitute Teacher"].value_counts()
+    return pd.DataFrame({"Teacher": counts.index, "Assigned Periods": counts.to_numpy()})
@@ -1,70 +1,64 @@
+import time
+APP_START = time.perf_counter()
 from pathlib import Path
 import pandas as pd
-from datetime import datetime
-from io import BytesIO
+from datetime import datetime, timedelta
 import streamlit as st
-from openpyxl import Workbook
-from openpyxl.styles import Alignment, Font
-from parser import parse_timetable
-from arranger import generate_arrangement
-from gsheet import get_or_create_worksheet, load_df_from_gsheet
-from persistence import persist_weekly_log, save_state_to_sheet, load_state_from_sheet, load_weekly_log, append_to_monthly_log
+from parse_cache import get_timetable, get_timetable_model, TIMETABLE_CACHE
+from arranger import generate_arrangement, update_arrangement, assignment_records, period_cells, cell_substitute, apply_cell_edits, SOLVERS
+from suggestion_index import SuggestionIndex
+from gsheet import worksheet_ref, SheetWriteBatch, get_local_store, sync_status, sync_failures, retry_failed_writes, discard_failed_writes
+from persistence import persist_arrangement_logs, persist_plan_logs, save_state_to_sheet, load_state_from_sheet, load_weekly_log
+from persistence import month_log_dates, load_month_log, load_month_log_days, closed_month_log_titles, reset_log_index
+from planner import expand_leave, plan_days
+from simulation import SCENARIO_MODES, absence_pool, scenario_count, make_scenarios, simulate, coverage_summary, scenario_coverage, worst_scenarios
+from load_counters import load_history
+from background import get_persistence_executor
 from constants import SPREADSHEET_ID
-from utils import is_same_week, get_current_week_dates, get_last_week_dates
+from utils import in_week, log_dates, get_current_week_dates, get_last_week_dates
+from analytics import find_conflicts, substitute_loads
+from export import arrangement_workbook, log_workbook
+from startup import PROCESS_START, record_stage, timed, startup_report
+import perf
+
+# openpyxl, gspread and google-auth are imported where they are first needed
+record_stage("app_imports", time.perf_counter() - APP_START)
+
+# Per-stage timings of this rerun; "Profile next action" in the sidebar captures one run with cProfile.
+# Runs are numbered per session: the click on that button reruns the script itself, so the
+# capture starts with the run after it.
+perf.reset_run()
+RUN_START = time.perf_counter()
+RUN_NUMBER = st.session_state["__run_number"] = st.session_state.get("__run_number", 0) + 1
+profiler = None
+if RUN_NUMBER > st.session_state.get("profile_armed_at", RUN_NUMBER) + 1:
+    del st.session_state["profile_armed_at"]
+    profiler = perf.start_profile()
+
+def current_week_log(weekly_arrangements):
+    """This session's logged days of the current week as one WeeklyLog frame, or None if there are none."""
+    if not weekly_arrangements:
+        return None
+    log_df = pd.concat([log["arrangement"].assign(Date=log["date"], Day=log["day"]) for log in weekly_arrangements])
+    log_df = log_df[in_week(log_df["Date"])]
+    return log_df if not log_df.empty else None
+
+def finish_run():
+    """Record this rerun's time and stop its profile capture; also called before st.stop() and st.rerun()."""
+    global profiler
+    perf.record("rerun", time.perf_counter() - RUN_START)
+    if profiler is not None:
+        st.session_state["profile_report"] = perf.stop_profile(profiler)
+        profiler = None
+
+MONTH_PAGE_SIZE = 7
+SIMULATION_LIMIT = 20000
+SOLVER_LABELS = {"greedy": "Greedy (fastest)", "matching": "Optimal matching (covers most classes)"}
+SCENARIO_LABELS = {"exhaustive": "Every combination", "sample": "Random sample"}
 
 # Initialize Streamlit app
 st.set_page_config(page_title="Teacher Arrangement System", layout="wide")
 
-# Load state from Google Sheets
-PersistentStateWorksheet = get_or_create_worksheet(SPREADSHEET_ID, "PersistentState")
-date_str, day_mode, absent_teachers, reasons_dict, custom_periods, final_timetable_df, suggestions_df = load_state_from_sheet(PersistentStateWorksheet)
-
-# Session state initialization
-if "show_suggestions_panel" not in st.session_state:
-    st.session_state.show_suggestions_panel = False
-
-if "uploaded_file" not in st.session_state:
-    st.session_state.uploaded_file = None
-
-if "weekly_arrangements" not in st.session_state:
-    weekly_log_df = load_weekly_log(SPREADSHEET_ID)
-
-    if not weekly_log_df.empty:
-        grouped = weekly_log_df.groupby(["Date", "Day"])
-        st.session_state.weekly_arrangements = []
-        for (date, day), group_df in grouped:
-            group_df = group_df.drop(columns=["Date", "Day"])
-            st.session_state.weekly_arrangements.append({
-                "date": date,
-                "day": day,
-                "arrangement": group_df.reset_index(drop=True)
-            })
-    else:
-        st.session_state.weekly_arrangements = []
-
-if "generated_arrangement" not in st.session_state:
-    result = load_state_from_sheet(PersistentStateWorksheet)
-    if result:
-        date_str, day_mode, absent_teachers, reasons_dict, custom_periods, timetable_df, suggestions_df = result
-        today_str = datetime.today().strftime("%A, %d %B %Y")
-        if date_str == today_str:
-            st.session_state["generated_arrangement"] = timetable_df
-            st.session_state["suggestions_df"] = suggestions_df.copy()
-            st.session_state["__meta__date"] = date_str
-            st.session_state["__meta__day_mode"] = day_mode
-            st.session_state["__meta__absent_teachers"] = absent_teachers
-            st.session_state["__meta__reasons"] = reasons_dict
-            st.session_state["__meta__custom_periods"] = custom_periods
-            st.toast("✅ Previous session data restored.")
-        else:
-            PersistentStateWorksheet.clear()
-            # st.toast("⚠️ Outdated state found. Cleared stale data.")
-    else:
-        st.toast("⚠️ No session data found.")
-
-if "__meta__custom_periods" not in st.session_state:
-    st.session_state["__meta__custom_periods"] = []
-
 # UI: Header
 today = datetime.today().strftime("%A, %d %B %Y")
 day = datetime.today().strftime("%A")
@@ -83,10 +77,109 @@ st.markdown(f"""
 
 # Sidebar Navigation
 st.sidebar.title("Navigation")
-page = st.sidebar.radio("Go to", ["🏠 Home", "📊 Arrangement Tracker"])
+page = st.sidebar.radio("Go to", ["🏠 Home", "🗓️ Batch Planner", "🧪 What-if Simulation", "📊 Arrangement Tracker"])
+
+# Background persistence status (polls while jobs are still running)
+persistence_executor = get_persistence_executor()
+
+def show_persistence_status():
+    icons = {"queued": "⏳", "running": "🔄", "done": "✅", "failed": "❌"}
+    for job in list(persistence_executor.status().values())[-5:]:
+        st.caption(f"{icons[job['state']]} {job['label']}: {job['state']}")
+        if job["error"]:
+            st.caption(f"Error: {job['error']}")
+
+with st.sidebar:
+    st.fragment(show_persistence_status, run_every="2s" if persistence_executor.busy() else None)()
+
+# Google Sheets sync status (reads come from the local mirror, writes are queued)
+pending_writes, sync_error = sync_status()
+if pending_writes:
+    st.sidebar.warning(f"⏳ {pending_writes} change(s) waiting to sync to Google Sheets.")
+    if sync_error:
+        st.sidebar.caption(f"Last sync error: {sync_error}")
+failed_writes = sync_failures()
+if failed_writes:
+    failed_titles = sorted({title for _, _, titles, _, _ in failed_writes for title in titles})
+    st.sidebar.error(f"❌ {len(failed_writes)} change(s) could not be saved to Google Sheets ({', '.join(failed_titles)}).")
+    st.sidebar.caption(f"Error: {failed_writes[-1][4]}")
+    retry_col, discard_col = st.sidebar.columns(2)
+    if retry_col.button("Retry", key="retry_failed_writes"):
+        retry_failed_writes()
+        finish_run()
+        st.rerun()
+    if discard_col.button("Discard", key="discard_failed_writes"):
+        discard_failed_writes()
+        reset_log_index(SPREADSHEET_ID)
+        st.session_state.clear()
+        finish_run()
+        st.rerun()
+if st.sidebar.button("🔄 Reload from Google Sheets"):
+    # Logs of closed months never change, so their local copies are kept
+    get_local_store().forget(SPREADSHEET_ID, keep_titles=closed_month_log_titles())
+    reset_log_index(SPREADSHEET_ID)
+    st.session_state.clear()
+    finish_run()
+    st.rerun()
 
-# File upload (only shown on Home page)
-if page == "🏠 Home":
+# Session state initialization
+if "show_suggestions_panel" not in st.session_state:
+    st.session_state.show_suggestions_panel = False
+
+if "uploaded_file" not in st.session_state:
+    st.session_state.uploaded_file = None
+
+# Load saved state (the Tracker page reads its own logs; simulations use none). The worksheet
+# handle is lazy: with a warm local mirror no connection to Google Sheets is made here.
+PersistentStateWorksheet = worksheet_ref(SPREADSHEET_ID, "PersistentState")
+if page in ("🏠 Home", "🗓️ Batch Planner"):
+    with st.spinner("Loading saved arrangements..."), timed("state_load"):
+        if "weekly_arrangements" not in st.session_state:
+            weekly_log_df = load_weekly_log(SPREADSHEET_ID)
+
+            if not weekly_log_df.empty:
+                grouped = weekly_log_df.groupby(["Date", "Day"])
+                st.session_state.weekly_arrangements = []
+                for (log_date, log_day), group_df in grouped:
+                    group_df = group_df.drop(columns=["Date", "Day"])
+                    st.session_state.weekly_arrangements.append({
+                        "date": log_date,
+                        "day": log_day,
+                        "arrangement": group_df.reset_index(drop=True)
+                    })
+            else:
+                st.session_state.weekly_arrangements = []
+
+        if "generated_arrangement" not in st.session_state:
+            result = load_state_from_sheet(PersistentStateWorksheet)
+            if result:
+                date_str, day_mode, absent_teachers, reasons_dict, custom_periods, timetable_df, suggestions_df, absence_types = result
+                today_str = datetime.today().strftime("%A, %d %B %Y")
+                if date_str == today_str:
+                    st.session_state["generated_arrangement"] = timetable_df
+                    st.session_state["suggestions"] = SuggestionIndex.from_frame(suggestions_df)
+                    st.session_state["__meta__date"] = date_str
+                    st.session_state["__meta__day_mode"] = day_mode
+                    st.session_state["__meta__absent_teachers"] = absent_teachers
+                    st.session_state["__meta__reasons"] = reasons_dict
+                    # The absences the restored arrangement was made for (none for older saves)
+                    if absence_types:
+                        st.session_state["__meta__absence_types"] = absence_types
+                    st.session_state["__meta__custom_periods"] = custom_periods
+                    st.toast("✅ Previous session data restored.")
+                else:
+                    stale_state = SheetWriteBatch(SPREADSHEET_ID)
+                    stale_state.clear(PersistentStateWorksheet)
+                    stale_state.flush()
+                    # st.toast("⚠️ Outdated state found. Cleared stale data.")
+            else:
+                st.toast("⚠️ No session data found.")
+
+if "__meta__custom_periods" not in st.session_state:
+    st.session_state["__meta__custom_periods"] = []
+
+# File upload (not shown on the Tracker page)
+if page != "📊 Arrangement Tracker":
     st.sidebar.title("Teacher Arrangement Generator")
     file_input = st.sidebar.file_uploader("Upload Timetable", type=["xlsx"])
 
@@ -103,6 +196,7 @@ if page == "🏠 Home":
             st.sidebar.info("ℹ️ Using default file: 'KV TT.xlsx'")
         else:
             st.sidebar.error("❌ No file uploaded and default file not found.")
+            finish_run()
             st.stop()
 
 if page == "🏠 Home":
@@ -136,8 +230,18 @@ if page == "🏠 Home":
         # Save selected day mode
         st.session_state["__meta__day_mode"] = day_mode
 
-        # Load timetable data
-        timetable_df = parse_timetable(file_input)
+        solver = st.radio(
+            "Assignment method",
+            options=SOLVERS,
+            format_func=SOLVER_LABELS.get,
+            horizontal=True,
+            key="solver"
+        )
+
+        # Load timetable data (cached across reruns until the file changes)
+        timetable_df = get_timetable(file_input)
+        cache_stats = TIMETABLE_CACHE.stats()
+        st.sidebar.caption(f"🗃️ Parse cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses")
         teacher_list = timetable_df["Teacher"].unique().tolist()
 
         # Absence inputs
@@ -150,11 +254,14 @@ if page == "🏠 Home":
         # Load previously selected types and reasons if available
         prev_absent_teachers = st.session_state.get("__meta__absent_teachers", [])
         prev_reasons = st.session_state.get("__meta__reasons", {})
+        prev_absence_types = st.session_state.get("__meta__absence_types", {})
 
         for t in absent_teachers:
             col1, col2 = st.columns([1, 2])
             default_absence_type = "Full"
-            if t in prev_absent_teachers:
+            if t in prev_absence_types:
+                default_absence_type = prev_absence_types[t]
+            elif t in prev_absent_teachers:
                 saved_type = prev_reasons.get(t, "")
                 if saved_type in ["1st half", "2nd half", "Full"]:
                     default_absence_type = saved_type
@@ -180,18 +287,55 @@ if page == "🏠 Home":
             st.subheader(f"📋 {today} Arrangements")
             st.dataframe(st.session_state["generated_arrangement"], width="stretch")
 
-        if st.button("🚀 Generate Arrangement"):
-            output_df, suggestions_df = generate_arrangement(
-                absent_dict, absence_reason_dict, selected_periods, selected_day,
-                day_mode, PersistentStateWorksheet, timetable_df
+        generate_clicked = st.button("🚀 Generate Arrangement")
+        # Absences changed after the arrangement went out: re-solve only what they affect
+        update_clicked = "generated_arrangement" in st.session_state and st.button(
+            "♻️ Update Arrangement",
+            help="Apply the absence changes to the arrangement above, keeping the substitutes already assigned."
+        )
+        if generate_clicked or update_clicked:
+            changes_df = None
+            if update_clicked:
+                output_df, suggestions, changes_df = update_arrangement(
+                    st.session_state["generated_arrangement"], absent_dict, absence_reason_dict, selected_periods,
+                    selected_day, timetable_df, st.session_state.get("suggestions"),
+                    solver=solver, history=load_history(SPREADSHEET_ID), model=get_timetable_model(file_input),
+                    previous_absent_dict=st.session_state.get("__meta__absence_types")
+                )
+            else:
+                output_df, suggestions = generate_arrangement(
+                    absent_dict, absence_reason_dict, selected_periods, selected_day, timetable_df,
+                    solver=solver, history=load_history(SPREADSHEET_ID), model=get_timetable_model(file_input)
+                )
+
+            st.session_state["__meta__absence_types"] = dict(absent_dict)
+
+            # Sheets writes run in the background; the table renders right away
+            persistence_executor.submit(
+                "PersistentState", save_state_to_sheet,
+                label="Session state",
+                date_str=today,
+                day_mode=day_mode,
+                absent_teachers=list(absent_dict.keys()),
+                reasons_dict=absence_reason_dict,
+                timetable_df=output_df,
+                worksheet=PersistentStateWorksheet,
+                custom_periods=st.session_state.get("__meta__custom_periods", []),
+                suggestions_df=suggestions.to_frame(),
+                absence_types=absent_dict
             )
-            st.success("✅ Arrangement Generated")
+            if changes_df is None:
+                st.success("✅ Arrangement Generated")
+            else:
+                st.success(f"✅ Arrangement Updated: {len(changes_df)} period(s) changed")
+                if not changes_df.empty:
+                    st.dataframe(changes_df, width="stretch", hide_index=True)
             st.subheader("📋 Arrangements")
             st.dataframe(output_df, width="stretch")
 
             # Update session state
             st.session_state["generated_arrangement"] = output_df
-            st.session_state["suggestions_df"] = suggestions_df
+            st.session_state["suggestions"] = suggestions
 
             # Update weekly arrangements in session
             today_str = datetime.today().strftime("%A, %d %B %Y")
@@ -215,69 +359,26 @@ if page == "🏠 Home":
                 })
 
             # Persist WeeklyLog
-            weekly_log_df = pd.concat([
-                log["arrangement"].assign(Date=log["date"], Day=log["day"])
-                for log in st.session_state.weekly_arrangements
-                if is_same_week(log["date"])
-            ])
-            try:
-                persist_weekly_log(weekly_log_df, SPREADSHEET_ID)
-                append_to_monthly_log(output_df, SPREADSHEET_ID)
-                st.success("✅ Weekly and Monthly arrangement updated.")
-            except Exception as e:
-                st.error(f"❌ Failed to update WeeklyLog or MonthLog: {e}")
+            weekly_log_df = current_week_log(st.session_state.weekly_arrangements)
+            persistence_executor.submit(
+                "ArrangementLogs", persist_arrangement_logs, weekly_log_df, output_df, SPREADSHEET_ID,
+                label="Weekly and Monthly log"
+            )
+            st.info("💾 Saving Weekly and Monthly arrangement in the background.")
 
             # Download Excel
-            output = BytesIO()
-            wb = Workbook()
-            ws = wb.active
-            ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=output_df.shape[1])
-            ws.cell(row=1, column=1).value = f"Arrangement for {today_str}"
-            ws.cell(row=1, column=1).alignment = Alignment(horizontal='center')
-            ws.cell(row=1, column=1).font = Font(bold=True, size=14)
-
-            for c_idx, col_name in enumerate(output_df.columns, start=1):
-                ws.cell(row=2, column=c_idx).value = col_name
-                ws.cell(row=2, column=c_idx).font = Font(bold=True)
-
-            for r_idx, row in enumerate(output_df.itertuples(index=False), start=3):
-                for c_idx, value in enumerate(row, start=1):
-                    ws.cell(row=r_idx, column=c_idx).value = value
-
-            wb.save(output)
             st.download_button(
                 label="📥 Download Excel",
-                data=output.getvalue(),
+                data=arrangement_workbook(output_df, f"Arrangement for {today_str}"),
                 file_name=f"arrangement_{today_str.replace(',', '').replace(' ', '_')}.xlsx"
             )
             
             # === CONFLICT CHECKER ===
             st.markdown("### ⚠️ Conflict Report")
-            assigned_periods = {}
-            conflict_rows = []
-
-            # Explicitly get period columns only
-            period_cols = [col for col in output_df.columns if col.startswith("Period")]
-
-            for _, row in output_df.iterrows():
-                teacher = row["Absent Teacher"]
-                for idx, col in enumerate(period_cols, start=1):
-                    assigned = row[col]
-                    if pd.notna(assigned) and assigned.strip():
-                        sub_teacher = assigned.split(" (")[0].strip()
-                        key = (sub_teacher, idx)
-                        if key in assigned_periods:
-                            conflict_rows.append({
-                                "Conflict Period": f"Period {idx}",
-                                "Teacher": sub_teacher,
-                                "Conflicting With": assigned_periods[key],
-                                "Also Assigned To": teacher
-                            })
-                        else:
-                            assigned_periods[key] = teacher
-
-            if conflict_rows:
-                conflict_df = pd.DataFrame(conflict_rows)
+            assignments = assignment_records(output_df)
+            conflict_df = find_conflicts(assignments, timetable_df, selected_day)
+
+            if not conflict_df.empty:
                 st.error("🚨 Time-slot conflicts detected!")
                 st.dataframe(conflict_df, width="stretch")
             else:
@@ -285,28 +386,15 @@ if page == "🏠 Home":
 
             # === ARRANGEMENT LOAD VISUALIZATION ===
             st.markdown("### 📊 Arrangement Load per Substitute Teacher")
-            load_counter = {}
-
-            period_cols = [col for col in output_df.columns if col.startswith("Period")]
-            for _, row in output_df.iterrows():
-                for col in period_cols:
-                    assigned = row[col]
-                    if pd.notna(assigned) and assigned.strip():
-                        sub_teacher = assigned.split(" (")[0].strip()
-                        load_counter[sub_teacher] = load_counter.get(sub_teacher, 0) + 1
-
-            if load_counter:
-                load_df = pd.DataFrame({
-                    "Teacher": list(load_counter.keys()),
-                    "Assigned Periods": list(load_counter.values())
-                }).sort_values(by="Assigned Periods", ascending=False)
+            load_df = substitute_loads(assignments)
 
+            if not load_df.empty:
                 st.bar_chart(load_df.set_index("Teacher"))
             else:
                 st.info("No assignments to visualize.")
 
         # === MANUAL EDITING INTERFACE TRIGGER ===
-        if "generated_arrangement" in st.session_state and "suggestions_df" in st.session_state:
+        if "generated_arrangement" in st.session_state and "suggestions" in st.session_state:
             st.markdown("---")
             st.markdown("### 🧑‍🏫 Manual Edit Timetable")
 
@@ -320,10 +408,17 @@ if page == "🏠 Home":
                     "edits": {}
                 })
 
+            # Lookups for every entry below, built once per rerun
             original_df = st.session_state["generated_arrangement"]
-            suggestions_df = st.session_state["suggestions_df"]
-            editable_df = original_df.copy()
-            period_columns = [col for col in editable_df.columns if col.startswith("Period")]
+            suggestions = st.session_state["suggestions"]
+            cells = period_cells(original_df)
+            period_columns = [col for col in original_df.columns if col.startswith("Period")]
+            absent_list = original_df["Absent Teacher"].unique().tolist()
+            filled = original_df.set_index("Absent Teacher")[period_columns].notna()
+            teacher_periods = {
+                teacher: [int(col.split(" ")[1]) for col, has_value in row.items() if has_value]
+                for teacher, row in zip(filled.index, filled.to_dict("records"))
+            }
 
             for idx, entry in enumerate(st.session_state.edit_queue):
                 st.markdown(f"---\n#### 📝 Edit Entry #{idx + 1}")
@@ -332,10 +427,10 @@ if page == "🏠 Home":
                 with col3:
                     if st.button(f"🗑️", key=f"delete_entry_{idx}"):
                         st.session_state.edit_queue.pop(idx)
+                        finish_run()
                         st.rerun()
 
                 with col1:
-                    absent_list = editable_df["Absent Teacher"].unique().tolist()
                     selected_teacher = st.selectbox(
                         f"👤 Absent Teacher (Entry #{idx + 1})",
                         [""] + absent_list,
@@ -346,36 +441,21 @@ if page == "🏠 Home":
 
                 if selected_teacher:
                     with col2:
-                        teacher_df = editable_df[editable_df["Absent Teacher"] == selected_teacher]
-                        
-                        if teacher_df.empty:
-                            st.warning(f"No timetable rows found for {selected_teacher}.")
-                            continue
-                        
-                        teacher_periods = [int(col.split(" ")[1]) for col in period_columns if not teacher_df[col].isnull().all()]
                         selected_periods = st.multiselect(
                             f"🕘 Periods for {selected_teacher}",
-                            options=sorted(teacher_periods),
+                            options=sorted(teacher_periods.get(selected_teacher, [])),
                             default=entry["periods"],
                             key=f"periods_{idx}"
                         )
                         entry["periods"] = selected_periods
 
                     for period_num in selected_periods:
-                        period_col = f"Period {period_num}"
-                        current_value = teacher_df.iloc[0][period_col]
-                        current_teacher = current_value.split(" (")[0].strip() if current_value else ""
-
-                        if suggestions_df is not None and not suggestions_df.empty:
-                            suggestion = suggestions_df[
-                                (suggestions_df["Absent Teacher"] == selected_teacher) &
-                                (suggestions_df["Period"] == period_num)
-                            ]
-                        else:
-                            suggestion = pd.DataFrame(columns=["Absent Teacher", "Period", "Class", "Suggested Teachers"])
-                        class_val = suggestion["Class"].values[0] if not suggestion.empty else "N/A"
-                        suggested_teachers = suggestion["Suggested Teachers"].values[0].split(", ") if not suggestion.empty else []
-                        options = [""] + suggested_teachers
+                        class_val = suggestions.class_of(selected_teacher, period_num)
+                        current_teacher = cell_substitute(cells.get((selected_teacher, period_num), ""), class_val)
+                        ranked = suggestions.candidates(selected_teacher, period_num)
+                        # Keep the current substitute selectable even if the solver did not rank them
+                        options = [""] + ([current_teacher] if current_teacher and current_teacher not in ranked else []) + ranked
+                        class_val = "N/A" if class_val is None else class_val
 
                         substitute = st.selectbox(
                             f"➡️ Substitute for Period {period_num} (Class: {class_val})",
@@ -386,18 +466,19 @@ if page == "🏠 Home":
                         entry["edits"][period_num] = f"{substitute} ({class_val})" if substitute else ""
 
             if st.session_state.edit_queue and st.button("🧾 Review Changes"):
-                    for entry in st.session_state.edit_queue:
-                        teacher = entry["teacher"]
-                        if not teacher: continue
-                        for period in entry["periods"]:
-                            period_col = f"Period {period}"
-                            new_val = entry["edits"].get(period, "")
-                            editable_df.loc[editable_df["Absent Teacher"] == teacher, period_col] = new_val
-                    
+                    edits = {
+                        (entry["teacher"], f"Period {period}"): entry["edits"].get(period, "")
+                        for entry in st.session_state.edit_queue if entry["teacher"]
+                        for period in entry["periods"]
+                    }
+                    editable_df = apply_cell_edits(original_df, edits)
+
                     st.session_state["final_arrangement"] = editable_df
                     st.session_state["generated_arrangement"] = editable_df
                     # st.success("📋 Reviewing Changes.")
-                    save_state_to_sheet(
+                    persistence_executor.submit(
+                        "PersistentState", save_state_to_sheet,
+                        label="Session state",
                         date_str=today,
                         day_mode=day_mode,
                         absent_teachers=list(absent_dict.keys()),
@@ -405,7 +486,8 @@ if page == "🏠 Home":
                         timetable_df=editable_df,
                         worksheet=PersistentStateWorksheet,
                         custom_periods=st.session_state.get("__meta__custom_periods", []),
-                        suggestions_df=st.session_state.get("suggestions_df", pd.DataFrame(columns=["Absent Teacher", "Period", "Class", "Suggested Teachers"]))
+                        suggestions_df=st.session_state["suggestions"].to_frame(),
+                        absence_types=st.session_state.get("__meta__absence_types", absent_dict)
                     )
 
                     st.markdown("### 🗂️ Updated Arrangement Timetable")
@@ -415,46 +497,19 @@ if page == "🏠 Home":
                     st.dataframe(pivot_df, width="stretch")
 
                     st.markdown("### ⚠️ Conflict Report")
-                    assigned_periods = {}
-                    conflict_rows = []
-                    for _, row in editable_df.iterrows():
-                        teacher = row["Absent Teacher"]
-                        for idx, col in enumerate(period_columns, start=1):
-                            assigned = row[col]
-                            if pd.notna(assigned) and assigned.strip():
-                                sub_teacher = assigned.split(" (")[0].strip()
-                                key = (sub_teacher, idx)
-                                if key in assigned_periods:
-                                    conflict_rows.append({
-                                        "Conflict Period": f"Period {idx}",
-                                        "Teacher": sub_teacher,
-                                        "Conflicting With": assigned_periods[key],
-                                        "Also Assigned To": teacher
-                                    })
-                                else:
-                                    assigned_periods[key] = teacher
-
-                    if conflict_rows:
-                        conflict_df = pd.DataFrame(conflict_rows)
+                    assignments = assignment_records(editable_df)
+                    conflict_df = find_conflicts(assignments, timetable_df, selected_day)
+
+                    if not conflict_df.empty:
                         st.error("🚨 Time-slot conflicts detected!")
                         st.dataframe(conflict_df, width="stretch")
                     else:
                         st.success("✅ No time-slot conflicts detected.")
 
                     st.markdown("### 📊 Arrangement Load per Substitute Teacher")
-                    load_counter = {}
-                    for _, row in editable_df.iterrows():
-                        for col in period_columns:
-                            assigned = row[col]
-                            if pd.notna(assigned) and assigned.strip():
-                                sub_teacher = assigned.split(" (")[0].strip()
-                                load_counter[sub_teacher] = load_counter.get(sub_teacher, 0) + 1
-
-                    if load_counter:
-                        load_df = pd.DataFrame({
-                            "Teacher": list(load_counter.keys()),
-                            "Assigned Periods": list(load_counter.values())
-                        }).sort_values(by="Assigned Periods", ascending=False)
+                    load_df = substitute_loads(assignments)
+
+                    if not load_df.empty:
                         st.bar_chart(load_df.set_index("Teacher"))
                     else:
                         st.info("No assignments to visualize.")
@@ -484,63 +539,35 @@ if page == "🏠 Home":
                         "arrangement": final_df
                     })
 
-                weekly_log_df = pd.concat([
-                    log["arrangement"].assign(Date=log["date"], Day=log["day"])
-                    for log in st.session_state.weekly_arrangements
-                    if is_same_week(log["date"])
-                ])
-
-                try:
-                    final_df = final_df.fillna("")  # Replace NaN with empty string
-                    for col in final_df.select_dtypes(include=["float", "int"]).columns:
-                        final_df[col] = final_df[col].replace([float("inf"), float("-inf")], 0)
-
-                    persist_weekly_log(final_df, SPREADSHEET_ID)
-                    append_to_monthly_log(final_df, SPREADSHEET_ID)
-
-                    save_state_to_sheet(
-                        date_str=today_str,
-                        day_mode=day_str,
-                        absent_teachers=st.session_state.get("absent_teachers", []),
-                        reasons_dict=st.session_state.get("reasons_dict", {}),
-                        timetable_df=final_df,
-                        worksheet=PersistentStateWorksheet,
-                        custom_periods=st.session_state.get("__meta__custom_periods", []),
-                        suggestions_df=st.session_state.get(
-                            "suggestions_df", 
-                            pd.DataFrame(columns=["Absent Teacher", "Period", "Class", "Suggested Teachers"])
-                        )
-                    )
+                weekly_log_df = current_week_log(st.session_state.weekly_arrangements)
 
-                    st.success("✅ Timetable successfully commited.")
-                except Exception as e:
-                    st.error(f"❌ Failed to update Google Sheet: {e}")
+                final_df = final_df.fillna("")  # Replace NaN with empty string
+                for col in final_df.select_dtypes(include=["float", "int"]).columns:
+                    final_df[col] = final_df[col].replace([float("inf"), float("-inf")], 0)
 
-                # Prepare Excel for download
-                output = BytesIO()
-                wb = Workbook()
-                ws = wb.active
-                ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=final_df.shape[1])
-                ws.cell(row=1, column=1).value = f"Arrangement for {today_str}"
-                ws.cell(row=1, column=1).alignment = Alignment(horizontal='center')
-                ws.cell(row=1, column=1).font = Font(bold=True, size=14)
-
-                # Write headers
-                for c_idx, col_name in enumerate(final_df.columns, start=1):
-                    ws.cell(row=2, column=c_idx).value = col_name
-                    ws.cell(row=2, column=c_idx).font = Font(bold=True)
-
-                # Write data
-                for r_idx, row in enumerate(final_df.itertuples(index=False), start=3):
-                    for c_idx, value in enumerate(row, start=1):
-                        ws.cell(row=r_idx, column=c_idx).value = value
-
-                wb.save(output)
-                output.seek(0)
+                persistence_executor.submit(
+                    "ArrangementLogs", persist_arrangement_logs, weekly_log_df, final_df, SPREADSHEET_ID,
+                    label="Weekly and Monthly log"
+                )
+                persistence_executor.submit(
+                    "PersistentState", save_state_to_sheet,
+                    label="Session state",
+                    date_str=today_str,
+                    day_mode=day_mode,
+                    absent_teachers=list(absent_dict.keys()),
+                    reasons_dict=absence_reason_dict,
+                    timetable_df=final_df,
+                    worksheet=PersistentStateWorksheet,
+                    custom_periods=st.session_state.get("__meta__custom_periods", []),
+                    suggestions_df=st.session_state.get("suggestions", SuggestionIndex()).to_frame(),
+                    absence_types=st.session_state.get("__meta__absence_types", absent_dict)
+                )
+                st.info("💾 Committing timetable changes in the background.")
 
+                # Prepare Excel for download
                 st.download_button(
                     label="📥 Download Excel",
-                    data=output.getvalue(),
+                    data=arrangement_workbook(final_df, f"Arrangement for {today_str}"),
                     file_name=f"arrangement_{today_str.replace(',', '').replace(' ', '_')}.xlsx"
                 )
                 st.markdown("---")
@@ -556,14 +583,17 @@ elif page == "📊 Arrangement Tracker":
             st.info("No arrangements generated this week.")
         else:
             week_dates = get_current_week_dates()
-            for date in week_dates:
-                day_group = weekly_log_df[weekly_log_df["Date"] == date]
-                if not day_group.empty:
-                    day_name = day_group["Day"].iloc[0]
-                    st.markdown(f"### 📌 {date}")
-                    display_df = day_group.drop(columns=["Date", "Day"]).reset_index(drop=True)
-                    st.dataframe(display_df, width="stretch")
-                    st.markdown("---")
+            week_df = weekly_log_df[in_week(weekly_log_df["Date"])]
+            if not week_df.empty:
+                st.download_button(
+                    "📥 Download week (Excel)", log_workbook(week_df),
+                    file_name=f"arrangements_week_of_{week_dates[0].split(', ')[1].replace(' ', '_')}.xlsx"
+                )
+            for _, day_group in week_df.groupby(log_dates(week_df["Date"]), sort=True):
+                st.markdown(f"### 📌 {day_group['Date'].iloc[0].strip()}")
+                display_df = day_group.drop(columns=["Date", "Day"]).reset_index(drop=True)
+                st.dataframe(display_df, width="stretch")
+                st.markdown("---")
 
     elif view_option == "Last Week":
         weekly_log_df = load_weekly_log(SPREADSHEET_ID)
@@ -571,14 +601,17 @@ elif page == "📊 Arrangement Tracker":
             st.info("No arrangements found for last week.")
         else:
             last_week_dates = get_last_week_dates()
-            for date in last_week_dates:
-                day_group = weekly_log_df[weekly_log_df["Date"].str.strip() == date]
-                if not day_group.empty:
-                    day_name = day_group["Day"].iloc[0]
-                    st.markdown(f"### 📌 {date}")
-                    display_df = day_group.drop(columns=["Date", "Day"]).reset_index(drop=True)
-                    st.dataframe(display_df, width="stretch")
-                    st.markdown("---")
+            week_df = weekly_log_df[in_week(weekly_log_df["Date"], weeks_ago=1)]
+            if not week_df.empty:
+                st.download_button(
+                    "📥 Download week (Excel)", log_workbook(week_df),
+                    file_name=f"arrangements_week_of_{last_week_dates[0].split(', ')[1].replace(' ', '_')}.xlsx"
+                )
+            for _, day_group in week_df.groupby(log_dates(week_df["Date"]), sort=True):
+                st.markdown(f"### 📌 {day_group['Date'].iloc[0].strip()}")
+                display_df = day_group.drop(columns=["Date", "Day"]).reset_index(drop=True)
+                st.dataframe(display_df, width="stretch")
+                st.markdown("---")
 
     elif view_option == "Month Wise":
         month_options = [
@@ -586,15 +619,219 @@ elif page == "📊 Arrangement Tracker":
             "July", "August", "September", "October", "November", "December"
         ]
         selected_month = st.selectbox("📅 Select month", month_options, index=datetime.today().month - 1)
-        ws = get_or_create_worksheet(sheet_id=SPREADSHEET_ID, worksheet_name=f"{selected_month}Log")
-        month_df = load_df_from_gsheet(ws)
+        month_dates = month_log_dates(SPREADSHEET_ID, selected_month)
 
-        if month_df.empty:
+        if not month_dates:
             st.info(f"No arrangements found for **{selected_month}**.")
         else:
-            for date, group in month_df.groupby("Date"):
-                day_name = group["Day"].iloc[0] if "Day" in group.columns else ""
-                st.markdown(f"### 📌 {date}")
-                display_df = group.drop(columns=["Date", "Day"], errors="ignore").reset_index(drop=True)
-                st.dataframe(display_df, width="stretch")
-                st.markdown("---")
\ No newline at end of file
+            # The whole month is only read if the Excel file is actually downloaded
+            st.download_button(
+                f"📥 Download {selected_month} (Excel)",
+                lambda: log_workbook(load_month_log(SPREADSHEET_ID, selected_month)),
+                file_name=f"arrangements_{selected_month}.xlsx"
+            )
+
+            # One page of days at a time; a day's rows are read when its expander is opened
+            page_count = -(-len(month_dates) // MONTH_PAGE_SIZE)
+            page_num = 1
+            if page_count > 1:
+                page_num = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1)
+            page_dates = month_dates[(page_num - 1) * MONTH_PAGE_SIZE:page_num * MONTH_PAGE_SIZE]
+            day_expanders = {
+                date: st.expander(f"📌 {date}", key=f"month_log_{selected_month}_{date}", on_change="rerun")
+                for date in page_dates
+            }
+            opened = [date for date, expander in day_expanders.items() if expander.open]
+            for date, display_df in load_month_log_days(SPREADSHEET_ID, selected_month, opened).items():
+                day_expanders[date].dataframe(display_df, width="stretch")
+
+elif page == "🗓️ Batch Planner":
+    st.subheader("🗓️ Plan Arrangements for Several Days")
+    st.caption("Enter planned leave (exam duty, training, ...) once; every school day in the range is solved "
+               "together so substitutions are spread evenly over the whole period.")
+
+    timetable_df = get_timetable(file_input)
+    teacher_list = timetable_df["Teacher"].unique().tolist()
+
+    range_start = datetime.today().date()
+    date_range = st.date_input("Date range", value=(range_start, range_start + timedelta(days=6)))
+    if len(date_range) != 2:
+        st.info("Select both a start and an end date.")
+        finish_run()
+        st.stop()
+    start_date, end_date = date_range
+
+    leave_df = st.data_editor(
+        pd.DataFrame({
+            "Teacher": pd.Series(dtype="object"),
+            "From": pd.Series(dtype="datetime64[ns]"),
+            "To": pd.Series(dtype="datetime64[ns]"),
+            "Absence Type": pd.Series(dtype="object"),
+            "Reason": pd.Series(dtype="object"),
+        }),
+        num_rows="dynamic",
+        column_config={
+            "Teacher": st.column_config.SelectboxColumn("Teacher", options=teacher_list, required=True),
+            "From": st.column_config.DateColumn("From", required=True),
+            "To": st.column_config.DateColumn("To"),
+            "Absence Type": st.column_config.SelectboxColumn(
+                "Absence Type", options=["Full", "1st half", "2nd half"], default="Full"
+            ),
+            "Reason": st.column_config.TextColumn("Reason"),
+        },
+        width="stretch",
+        key="planner_leave"
+    )
+    plan_solver = st.radio(
+        "Assignment method",
+        options=SOLVERS,
+        format_func=SOLVER_LABELS.get,
+        horizontal=True,
+        key="planner_solver"
+    )
+
+    if st.button("🗓️ Plan Arrangements"):
+        day_absences = expand_leave(leave_df.to_dict("records"), start_date, end_date)
+        if not day_absences:
+            st.warning("⚠️ No school days with leave in the selected range.")
+        else:
+            plans, arrangement_count = plan_days(
+                day_absences, timetable_df, list(range(1, 9)), solver=plan_solver,
+                history=load_history(SPREADSHEET_ID, min(day_absences)), model=get_timetable_model(file_input)
+            )
+            st.session_state["batch_plans"] = plans
+            st.session_state["batch_plan_loads"] = arrangement_count
+
+            # Merge the planned days into this week's log and save everything in one batch
+            for plan in plans:
+                date_str = plan["date"].strftime("%A, %d %B %Y")
+                st.session_state.weekly_arrangements = [
+                    log for log in st.session_state.weekly_arrangements if log["date"] != date_str
+                ]
+                st.session_state.weekly_arrangements.append({
+                    "date": date_str,
+                    "day": plan["day"],
+                    "arrangement": plan["arrangement"]
+                })
+            weekly_log_df = current_week_log(st.session_state.weekly_arrangements)
+            # Keyed by the planned days: a queued plan is only replaced by one covering the same days
+            plan_dates = tuple(plan["date"].isoformat() for plan in plans)
+            persistence_executor.submit(
+                ("PlanLogs",) + plan_dates, persist_plan_logs, weekly_log_df,
+                [(plan["date"], plan["arrangement"]) for plan in plans], SPREADSHEET_ID,
+                label=f"Planned days log ({plans[0]['date']:%d %b}–{plans[-1]['date']:%d %b})"
+            )
+            st.success(f"✅ Planned {len(plans)} day(s). Saving to the logs in the background.")
+
+    if st.session_state.get("batch_plans"):
+        loads = st.session_state.get("batch_plan_loads", {})
+        if loads:
+            st.markdown("### ⚖️ Substitutions per Teacher")
+            load_df = pd.DataFrame(sorted(loads.items(), key=lambda x: -x[1]), columns=["Teacher", "Substitutions"])
+            st.dataframe(load_df, width="stretch")
+        for plan in st.session_state["batch_plans"]:
+            st.markdown(f"### 📌 {plan['date'].strftime('%A, %d %B %Y')}")
+            st.dataframe(plan["arrangement"], width="stretch")
+
+elif page == "🧪 What-if Simulation":
+    st.subheader("🧪 What-if Simulation")
+    st.caption("Try many absence scenarios against the timetable to see which periods are likely to go "
+               "uncovered. Nothing is generated for today and nothing is saved.")
+
+    model = get_timetable_model(file_input)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        sim_day = st.selectbox("Day", model.day_names, key="sim_day")
+        sim_domains = st.multiselect(
+            "Absent teachers from (all if empty)", model.domain_names,
+            default=["PGT"] if "PGT" in model.domain_names else [], key="sim_domains"
+        )
+    with col2:
+        sim_k = st.number_input("Teachers absent per scenario", min_value=1, max_value=50, value=3, key="sim_k")
+        sim_absence_type = st.selectbox("Absence type", ["Full", "1st half", "2nd half"], key="sim_absence_type")
+    with col3:
+        sim_mode = st.radio("Scenarios", SCENARIO_MODES, format_func=SCENARIO_LABELS.get, key="sim_mode")
+        sim_samples = st.number_input(
+            "Samples", min_value=100, max_value=100000, value=2000, step=100,
+            disabled=sim_mode == "exhaustive", key="sim_samples"
+        )
+    sim_solver = st.radio(
+        "Assignment method",
+        options=SOLVERS,
+        format_func=SOLVER_LABELS.get,
+        horizontal=True,
+        key="sim_solver"
+    )
+
+    pool = absence_pool(model, sim_domains)
+    total = scenario_count(len(pool), min(sim_k, len(pool)), sim_mode, sim_samples)
+    st.caption(f"{len(pool)} teachers to draw from, {total:,} scenario(s).")
+    if sim_mode == "exhaustive" and total > SIMULATION_LIMIT:
+        st.warning(f"⚠️ Only the first {SIMULATION_LIMIT:,} combinations will be run; "
+                   "a random sample gives a more representative picture.")
+
+    if st.button("🧪 Run Simulation", disabled=not pool):
+        scenarios = make_scenarios(pool, sim_k, sim_mode, sim_samples, limit=SIMULATION_LIMIT)
+        with st.spinner(f"Solving {len(scenarios):,} scenarios..."):
+            sim_start = time.perf_counter()
+            counts = simulate(model, sim_day, scenarios, list(range(1, model.n_periods + 1)), sim_absence_type, sim_solver)
+        st.session_state["simulation"] = {
+            "label": f"{sim_k} absent on {sim_day}, {SOLVER_LABELS[sim_solver]}",
+            "seconds": time.perf_counter() - sim_start,
+            "summary": coverage_summary(model, counts),
+            "coverage": scenario_coverage(counts),
+            "worst": worst_scenarios(scenarios, counts),
+        }
+
+    result = st.session_state.get("simulation")
+    if result:
+        coverage = result["coverage"]
+        st.markdown(f"### 📈 {result['label']}")
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Scenarios", f"{len(coverage):,}", help=f"Solved in {result['seconds']:.1f}s")
+        col2.metric("Average coverage", f"{coverage.mean():.1%}")
+        col3.metric("Fully covered", f"{(coverage == 1).mean():.0%}")
+
+        summary = result["summary"]
+        if summary.empty:
+            st.info("ℹ️ The absent teachers have no classes to cover in these scenarios.")
+        else:
+            st.markdown("#### Chance of at least one uncovered class")
+            st.dataframe(
+                summary.pivot(index="Domain", columns="Period", values="P(Any Uncovered)")
+                .rename(columns=lambda p: f"Period {p}").style.format("{:.0%}", na_rep=""),
+                width="stretch"
+            )
+            st.markdown("#### Scenarios by share of classes covered")
+            st.bar_chart((coverage * 100).round().astype(int).value_counts().sort_index().rename_axis("Coverage %"))
+            with st.expander("Per domain and period"):
+                st.dataframe(summary, width="stretch", hide_index=True)
+            st.markdown("#### Worst scenarios")
+            st.dataframe(result["worst"], width="stretch", hide_index=True)
+
+# Start-up timing of this server process (first run only; reruns reuse the imports and connections)
+record_stage("first_run_total", time.perf_counter() - PROCESS_START)
+with st.sidebar.expander("⏱️ Startup timing"):
+    for stage, seconds in startup_report().items():
+        st.caption(f"{stage}: {seconds:.2f}s")
+
+finish_run()
+
+with st.sidebar.expander("⚡ Performance"):
+    run_report = perf.report("run")
+    if run_report:
+        st.dataframe(pd.DataFrame.from_dict(run_report, orient="index"), width="stretch")
+    st.download_button(
+        "📥 Timings (JSON)", perf.report_json(page=page, recorded_at=datetime.now().isoformat(timespec="seconds")),
+        file_name="performance.json", mime="application/json"
+    )
+    if "profile_armed_at" in st.session_state:
+        st.caption("🔬 Your next action will be profiled.")
+    else:
+        st.button(
+            "🔬 Profile next action",
+            on_click=lambda: st.session_state.update(profile_armed_at=st.session_state["__run_number"])
+        )
+    if st.session_state.get("profile_report"):
+        st.download_button("📥 Profile (text)", st.session_state["profile_report"], file_name="profile.txt")
+        st.code(st.session_state["profile_report"][:4000])
@@ -1,102 +1,104 @@
 import pandas as pd
 import random
-import streamlit as st
-from datetime import datetime
-from utils import extract_class_level
-from persistence import persist_weekly_log, load_weekly_log, save_state_to_sheet
-from constants import SPREADSHEET_ID
-
-def generate_arrangement(absent_dict, absence_reason_dict, selected_periods, day, day_mode, PersistentStateWorksheet, timetable_df):
-    today = datetime.today().strftime("%A, %d %B %Y")
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    arrangements = []
-    suggested_arrangements = []
-    arrangement_count = {}
+from operator import itemgetter
+from utils import class_levels
+from constants import FREE_CLASS_LABELS, DOMAIN_PRIORITY
+from slot_index import FreeSlotIndex
+from suggestion_index import SuggestionIndex
+from matching import assign_by_matching
+from perf import stage, instrumented
+
+SOLVERS = ["greedy", "matching"]
+
+@instrumented("collect_slots", rows=len)
+def collect_slots(absent_dict, absent_df, selected_periods):
+    """List the classes to cover as (absent teacher, period, class, domain priority) tuples."""
+    schedule = absent_df[absent_df["Teacher"].isin(absent_dict.keys()) & absent_df["Period"].isin(selected_periods)].reset_index(drop=True)
+    absence_type = schedule["Teacher"].map(absent_dict)
+    period = schedule["Period"]
+    in_absence = (
+        ((absence_type == "1st half") & period.between(1, 4))
+        | ((absence_type == "2nd half") & period.between(5, 8))
+        | ~absence_type.isin(["1st half", "2nd half"])
+    )
+    classes = schedule["Class"].astype("string")
+    levels = class_levels(schedule["Class"])
+    keep = in_absence & classes.notna() & ~classes.str.strip().isin(FREE_CLASS_LABELS) & levels.notna()
+
+    # Slots follow the order of absent_dict, then timetable order within a teacher
+    teacher_order = schedule["Teacher"].map({t: i for i, t in enumerate(absent_dict)})
+    order = teacher_order[keep].sort_values(kind="stable").index
+    levels = levels[order]
+    domains = pd.Series("Senior Secondary", index=order).mask(levels <= 10, "Secondary").mask(levels <= 5, "Primary")
+    return [
+        (teacher, period, target_class, DOMAIN_PRIORITY[domain])
+        for teacher, period, target_class, domain in zip(
+            schedule.loc[order, "Teacher"].tolist(), schedule.loc[order, "Period"].tolist(),
+            schedule.loc[order, "Class"].tolist(), domains.tolist()
+        )
+    ]
+
+def assign_greedy(slots, slot_index, exclude=(), arrangement_count=None, history=None, rng=None):
+    """Give each slot, in order, the least used free teacher not yet booked in that period.
+
+    Ties on today's count are broken by `history`, {teacher: (week, month)}
+    substitutions so far, then at random (from `rng`, a random.Random, if
+    given). Each slot's suggestions are every candidate as
+    (teacher, (today, week, month)), in the order tried.
+    """
+    shuffle = (rng or random).shuffle
+    if arrangement_count is None:
+        arrangement_count = {}
+    if history is None:
+        history = {}
     arrangement_tracker = {}
-    day_df = timetable_df[timetable_df["Day"].str.lower() == day.lower()]
+    substitutes = []
+    suggestions = []
+    for _, period, _, domains in slots:
+        substitute = None
+        suggested_teachers = []
+        candidates = slot_index.candidates(period, domains, exclude=exclude)
 
-    for absent_teacher, absence_type in absent_dict.items():
-        if absence_type == "1st half":
-            teacher_schedule = day_df[(day_df["Teacher"] == absent_teacher) & (day_df["Period"].isin(range(1, 5)))]
-        elif absence_type == "2nd half":
-            teacher_schedule = day_df[(day_df["Teacher"] == absent_teacher) & (day_df["Period"].isin(range(5, 9)))]
-        else:
-            teacher_schedule = day_df[(day_df["Teacher"] == absent_teacher)]
-
-        teacher_schedule = teacher_schedule[teacher_schedule["Period"].isin(selected_periods)]
-
-        for _, row in teacher_schedule.iterrows():
-            target_class = row["Class"]
-            if pd.isna(target_class) or str(target_class).strip() in ["", "CCA", "LIB", "LIBRARY", "P.E.", "SPORTS"]:
-                continue
-
-            period = row["Period"]
-            level = extract_class_level(target_class)
-            if level is None:
-                continue
-            
-            target_domain = "Primary" if level <= 5 else "Secondary" if level <= 10 else "Senior Secondary"
-
-            free_teachers = day_df[
-                (day_df["Period"] == period) &
-                (~day_df["Teacher"].isin(absent_dict.keys())) &
-                (day_df["TPOD"] < 7) &
-                (day_df["Class"].isna() | day_df["Class"].isin(["", "CCA", "LIB", "LIBRARY", "P.E.", "SPORTS"]))
-            ].copy()
-
-            substitute = None
-            suggested_teachers = []
-            domain_priority = {
-                "Senior Secondary": ["PGT", "Principal", "Misc"],
-                "Secondary": ["TGT", "Misc", "PGT", "Principal"],
-                "Primary": ["PRT", "Misc", "Principal"]
-            }
-            
-            candidates = pd.DataFrame()
-            for domain in domain_priority[target_domain]:
-                candidates = free_teachers[free_teachers["Domain"] == domain]
-                if not candidates.empty:
-                    break
-
-            if candidates.empty:
-                relaxed_free = day_df[
-                    (day_df["Period"] == period) &
-                    (~day_df["Teacher"].isin(absent_dict.keys())) &
-                    (day_df["Class"].isna() | day_df["Class"].isin(["", "CCA", "LIB", "LIBRARY", "P.E.", "SPORTS"]))
-                ]
-                for domain in domain_priority[target_domain]:
-                    candidates = relaxed_free[relaxed_free["Domain"] == domain]
-                    if not candidates.empty:
-                        break
-
-            if not candidates.empty:
-                teacher_list = list(candidates["Teacher"].unique())
-                random.shuffle(teacher_list)
-                teacher_list.sort(key=lambda t: arrangement_count.get(t, 0))
-
-                suggested_teachers = teacher_list.copy()
-
-                for t in teacher_list:
-                    if arrangement_tracker.get((t, period), False):
-                        continue
-                    substitute = t
-                    arrangement_tracker[(t, period)] = True
-                    arrangement_count[substitute] = arrangement_count.get(substitute, 0) + 1
-                    break
-
-            arrangements.append({
-                "Absent Teacher": absent_teacher,
-                "Period": period,
-                "Class": target_class,
-                "Substitute Teacher": substitute
-            })
-
-            suggested_arrangements.append({
-                "Absent Teacher": absent_teacher,
-                "Period": period,
-                "Class": target_class,
-                "Suggested Teachers": ", ".join(suggested_teachers[:5]) if suggested_teachers else ""
-            })
+        if candidates:
+            shuffle(candidates)
+            suggested_teachers = sorted(
+                ((t, (arrangement_count.get(t, 0),) + history.get(t, (0, 0))) for t in candidates), key=itemgetter(1)
+            )
+
+            for t, _ in suggested_teachers:
+                if arrangement_tracker.get((t, period), False):
+                    continue
+                substitute = t
+                arrangement_tracker[(t, period)] = True
+                arrangement_count[substitute] = arrangement_count.get(substitute, 0) + 1
+                break
+
+        substitutes.append(substitute)
+        suggestions.append(suggested_teachers)
+    return substitutes, suggestions
+
+@instrumented("solve", rows=lambda result: len(result[0]))
+def solve_slots(solver, slots, slot_index, exclude=(), arrangement_count=None, history=None, rng=None):
+    """Assign substitutes with the named solver. `arrangement_count` is updated in place."""
+    if solver == "matching":
+        return assign_by_matching(slots, slot_index, exclude, arrangement_count, history)
+    return assign_greedy(slots, slot_index, exclude, arrangement_count, history, rng)
+
+@instrumented("arrangement_table", rows=lambda result: len(result[0]))
+def build_arrangement_table(slots, substitutes, suggestions, selected_periods, absence_reason_dict):
+    """Pivot solved slots into the per-teacher arrangement table, and index their ranked suggestions."""
+    arrangements = []
+    for (absent_teacher, period, target_class, _), substitute in zip(slots, substitutes):
+        arrangements.append({
+            "Absent Teacher": absent_teacher,
+            "Period": period,
+            "Class": target_class,
+            "Substitute Teacher": substitute
+        })
+
+    if not arrangements:
+        columns = ["Absent Teacher", "Reason"] + [f"Period {p}" for p in selected_periods]
+        return pd.DataFrame(columns=columns), SuggestionIndex()
 
     df = pd.DataFrame(arrangements)
     df["Sub_with_Class"] = df.apply(
@@ -114,68 +116,173 @@ def generate_arrangement(absent_dict, absence_reason_dict, selected_periods, day
     output_df_reset = pivot_df.reset_index()
     output_df_reset.insert(1, "Reason", output_df_reset["Absent Teacher"].map(absence_reason_dict))
 
-    suggestions_df = pd.DataFrame(suggested_arrangements)
-
-    weekly_log_df = load_weekly_log(SPREADSHEET_ID)
-    if not weekly_log_df.empty:
-        all_logs = [{
-            "date": row["Date"],
-            "day": row["Day"],
-            "arrangement": row.drop(["Date", "Day"]).to_frame().T
-        } for _, row in weekly_log_df.iterrows()]
-    else:
-        all_logs = []
-
-    if "final_edited_arrangement" in st.session_state:
-        arrangement_df = st.session_state.final_edited_arrangement
-        source = "manual"
-    else:
-        arrangement_df = output_df_reset
-        source = "auto"
-    
-    # === Check if entry exists for today ===
-    updated = False
-    for i, entry in enumerate(all_logs):
-        if entry["date"] == today:
-            # Overwrite existing
-            all_logs[i] = {
-                "date": today,
-                "day": day,
-                "arrangement": arrangement_df,
-                "source": source,
-                "timestamp": timestamp
-            }
-            updated = True
-            break
-
-    if not updated:
-        all_logs.append({
-            "date": today,
-            "day": day,
-            "arrangement": arrangement_df,
-            "source": source,
-            "timestamp": timestamp
-        })
+    return output_df_reset, SuggestionIndex.from_slots(slots, suggestions)
+
+def assignment_records(arrangement_df):
+    """Unpivot an arrangement table into one row per covered period.
+
+    Returns Absent Teacher, Period (int), Class and Substitute Teacher columns,
+    splitting each "Substitute (Class)" cell at its last " (".
+    """
+    period_cols = [c for c in arrangement_df.columns if str(c).startswith("Period ")]
+    cells = arrangement_df.melt(id_vars="Absent Teacher", value_vars=period_cols, var_name="Period", value_name="Cell")
+    text = cells["Cell"].astype("string").str.strip().fillna("")
+    filled = (text != "") & (text != "nan")
+    cells, text = cells[filled], text[filled]
+    parts = text.str.extract(r"^(?P<sub>.*?)(?: \((?P<cls>[^()]*)\))?$")
+    return pd.DataFrame({
+        "Absent Teacher": cells["Absent Teacher"],
+        "Period": cells["Period"].str.slice(len("Period ")).astype(int),
+        "Class": parts["cls"],
+        "Substitute Teacher": parts["sub"].str.strip(),
+    }).reset_index(drop=True)
 
-    # === Deduplicate by (day, date) to avoid stale entries ===
-    seen = set()
-    dedup_logs = []
-    for log in all_logs:
-        key = (log["day"], log["date"])
-        if key not in seen:
-            dedup_logs.append(log)
-            seen.add(key)
-
-    st.session_state["generated_arrangement"] = output_df_reset
-    st.session_state["suggestions_df"] = suggestions_df
-    save_state_to_sheet(
-        date_str=today,
-        day_mode=day_mode,
-        absent_teachers=list(absent_dict.keys()),
-        reasons_dict=absence_reason_dict,
-        timetable_df=output_df_reset,
-        worksheet=PersistentStateWorksheet,
-        custom_periods = st.session_state.get("__meta__custom_periods", []),
-        suggestions_df=suggestions_df
+def period_cells(arrangement_df):
+    """Filled period cells of an arrangement table as {(absent teacher, period): text}."""
+    period_cols = [c for c in arrangement_df.columns if str(c).startswith("Period ")]
+    if "Absent Teacher" not in arrangement_df.columns or not period_cols:
+        return {}
+    periods = [int(str(c)[len("Period "):]) for c in period_cols]
+    cells = {}
+    for teacher, row in zip(arrangement_df["Absent Teacher"].tolist(), arrangement_df[period_cols].to_numpy(dtype=object)):
+        for period, value in zip(periods, row):
+            text = "" if pd.isna(value) else str(value).strip()
+            if text and text != "nan":
+                cells[(teacher, period)] = text
+    return cells
+
+def cell_substitute(cell, target_class=None):
+    """Substitute named in a "Substitute (Class)" cell; "" if blank or written for another class.
+
+    Without `target_class` the cell is split at its last " (".
+    """
+    if not cell:
+        return ""
+    if target_class is None:
+        return cell.rsplit(" (", 1)[0].strip()
+    suffix = f" ({target_class})"
+    return cell[:-len(suffix)].strip() if cell.endswith(suffix) else ""
+
+def apply_cell_edits(arrangement_df, edits):
+    """Return a copy of `arrangement_df` with {(absent teacher, period column): text} written in one update.
+
+    Edits for teachers or columns not in the table are ignored.
+    """
+    if not edits:
+        return arrangement_df.copy()
+    updates = pd.Series(list(edits.values()), index=pd.MultiIndex.from_tuples(list(edits)), dtype=object).unstack()
+    edited = arrangement_df.set_index("Absent Teacher")
+    edited.update(updates.reindex(columns=edited.columns.intersection(updates.columns)))
+    return edited.reset_index()[arrangement_df.columns]
+
+def arrangement_changes(old_df, new_df):
+    """List the period cells that differ between two arrangement tables.
+
+    Returns Absent Teacher, Period (int), Before and After columns, "" for a
+    blank cell or a teacher missing from that table.
+    """
+    before, after = period_cells(old_df), period_cells(new_df)
+    changes = [
+        (teacher, period, before.get((teacher, period), ""), after.get((teacher, period), ""))
+        for teacher, period in dict.fromkeys(list(before) + list(after))
+        if before.get((teacher, period), "") != after.get((teacher, period), "")
+    ]
+    return pd.DataFrame(changes, columns=["Absent Teacher", "Period", "Before", "After"])
+
+def _day_slots(absent_dict, selected_periods, day, timetable_df, slot_index=None, model=None):
+    """Return (slots, slot_index) for one day, from the TimetableModel if given, else from the frame."""
+    if model is not None:
+        if slot_index is None:
+            with stage("free_slot_index", rows=len(model.teachers)):
+                slot_index = FreeSlotIndex.from_model(model, day)
+        with stage("collect_slots") as timing:
+            slots = model.collect_slots(absent_dict, day, selected_periods)
+            timing.rows = len(slots)
+        return slots, slot_index
+
+    day_df = timetable_df[timetable_df["Day"].str.lower() == day.lower()]
+    absent_df = day_df[day_df["Teacher"].isin(absent_dict.keys())]
+    if slot_index is None:
+        with stage("free_slot_index", rows=len(day_df)):
+            slot_index = FreeSlotIndex.build(timetable_df, day)
+    return collect_slots(absent_dict, absent_df, selected_periods), slot_index
+
+@instrumented("generate_arrangement", rows=lambda result: len(result[0]))
+def generate_arrangement(absent_dict, absence_reason_dict, selected_periods, day, timetable_df, slot_index=None, solver="greedy", history=None, model=None):
+    """Compute one day's arrangement and suggestions. Pure: no Streamlit or Sheets access.
+
+    With a TimetableModel of `timetable_df` (`model`), slots and free teachers
+    are read from its occupancy array instead of filtering the frame.
+    Returns (arrangement_df, suggestions), suggestions being a SuggestionIndex;
+    saving them is up to the caller.
+    """
+    slots, slot_index = _day_slots(absent_dict, selected_periods, day, timetable_df, slot_index, model)
+    substitutes, suggestions = solve_slots(solver, slots, slot_index, absent_dict, history=history)
+    return build_arrangement_table(slots, substitutes, suggestions, selected_periods, absence_reason_dict)
+
+@instrumented("update_arrangement", rows=lambda result: len(result[2]))
+def update_arrangement(current_df, absent_dict, absence_reason_dict, selected_periods, day, timetable_df, current_suggestions=None, slot_index=None, solver="greedy", history=None, model=None, previous_absent_dict=None):
+    """Re-solve a day after its absences changed, keeping the substitutes already given where possible.
+
+    `current_df` is the arrangement as shown or restored from PersistentState
+    and `absent_dict` the absences as they are now, so added, removed and
+    half-day changes all follow from comparing the two. A class keeps its
+    substitute while it still needs cover and the substitute is not absent;
+    the other classes are solved one period at a time around those bookings.
+    `current_suggestions` (a SuggestionIndex) supplies the kept classes'
+    suggestions. `previous_absent_dict` is the {teacher: absence type}
+    `current_df` was made for; when given, a class left uncovered then stays
+    uncovered while its teacher's absence type and period are unchanged.
+    Returns (arrangement_df, suggestions, changes_df), changes_df being
+    `arrangement_changes(current_df, arrangement_df)`.
+    """
+    slots, slot_index = _day_slots(absent_dict, selected_periods, day, timetable_df, slot_index, model)
+    cells = period_cells(current_df)
+    if current_suggestions is None:
+        current_suggestions = SuggestionIndex()
+    previous_periods = {int(str(c)[len("Period "):]) for c in current_df.columns if str(c).startswith("Period ")}
+
+    substitutes = [None] * len(slots)
+    suggestions = [[] for _ in slots]
+    booked = {}
+    arrangement_count = {}
+    to_solve = {}
+    for i, (absent_teacher, period, target_class, _) in enumerate(slots):
+        cell = cells.get((absent_teacher, period), "")
+        substitute = cell_substitute(cell, target_class)
+        period_booked = booked.setdefault(period, set())
+        kept = current_suggestions.get(absent_teacher, period)
+        kept_suggestions = list(kept[1]) if kept and str(kept[0]) == str(target_class) else []
+        if substitute and substitute not in absent_dict and substitute not in period_booked:
+            substitutes[i] = substitute
+            period_booked.add(substitute)
+            arrangement_count[substitute] = arrangement_count.get(substitute, 0) + 1
+            suggestions[i] = kept_suggestions
+        elif (not cell and previous_absent_dict is not None and period in previous_periods
+              and previous_absent_dict.get(absent_teacher) == absent_dict[absent_teacher]):
+            # Solved for this same absence before and left uncovered; Generate retries it
+            suggestions[i] = kept_suggestions
+        else:
+            to_solve.setdefault(period, []).append(i)
+
+    for period in sorted(to_solve):
+        rows = to_solve[period]
+        exclude = set(absent_dict) | booked[period]
+        period_substitutes, period_suggestions = solve_slots(
+            solver, [slots[i] for i in rows], slot_index, exclude, arrangement_count, history
+        )
+        for i, substitute, suggested in zip(rows, period_substitutes, period_suggestions):
+            substitutes[i] = substitute
+            suggestions[i] = suggested
+
+    arrangement_df, suggestion_index = build_arrangement_table(
+        slots, substitutes, suggestions, selected_periods, absence_reason_dict
     )
-    return output_df_reset, suggestions_df
\ No newline at end of file
+    return arrangement_df, suggestion_index, arrangement_changes(current_df, arrangement_df)
+
+
+if __name__ == "__main__":
+    # Headless runs: python -m arranger TIMETABLE ABSENCES [-o OUTPUT]
+    import sys
+    from cli import main
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import multiprocessing
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+
+class PersistenceExecutor:
+    """Run persistence jobs on one worker thread, in submission order.
+
+    Jobs are keyed by the sheet(s) they write. Submitting a job whose key is
+    still queued replaces the queued one, so only the latest state of a
+    sheet is written. Job outcomes are kept per key for the UI to show.
+    """
+
+    def __init__(self):
+        self._queue = OrderedDict()
+        self._status = OrderedDict()
+        self._cond = threading.Condition()
+        self._worker = threading.Thread(target=self._run, daemon=True, name="persistence")
+        self._worker.start()
+
+    def submit(self, key, fn, *args, label=None, **kwargs):
+        """Queue `fn(*args, **kwargs)` under `key`, replacing a queued job with the same key."""
+        with self._cond:
+            coalesced = key in self._queue
+            self._queue[key] = (fn, args, kwargs)
+            self._status[key] = {
+                "label": label or key,
+                "state": "queued",
+                "error": None,
+                "coalesced": coalesced,
+                "updated_at": time.time(),
+            }
+            self._status.move_to_end(key)
+            self._cond.notify()
+
+    def status(self):
+        """Return a snapshot of {key: status dict} in submission order."""
+        with self._cond:
+            return {key: dict(s) for key, s in self._status.items()}
+
+    def busy(self):
+        with self._cond:
+            return any(s["state"] in ("queued", "running") for s in self._status.values())
+
+    def wait(self, timeout=None):
+        """Block until every queued job has finished. Returns False on timeout."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while any(s["state"] in ("queued", "running") for s in self._status.values()):
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                key, (fn, args, kwargs) = self._queue.popitem(last=False)
+                self._set_state(key, "running")
+
+            try:
+                fn(*args, **kwargs)
+            except Exception as e:
+                traceback.print_exc()
+                with self._cond:
+                    self._finish(key, "failed", error=str(e))
+            else:
+                with self._cond:
+                    self._finish(key, "done")
+
+    def _finish(self, key, state, error=None):
+        # A newer job for the same key was queued meanwhile; it decides the final state
+        if key in self._queue:
+            return
+        self._set_state(key, state, error)
+
+    def _set_state(self, key, state, error=None):
+        self._status[key].update(state=state, error=error, updated_at=time.time())
+        self._cond.notify_all()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_persistence_executor():
+    """Return the process-wide persistence executor, starting it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = PersistenceExecutor()
+    return _executor
+
+
+_process_pools = {}
+_process_pools_lock = threading.Lock()
+
+
+def get_process_pool(name, processes, initializer=None, initargs=()):
+    """Return the process pool kept under `name`, replacing it when `processes` or `initargs` change.
+
+    Workers are started by a forkserver (spawn where there is none), never
+    forked from the threaded Streamlit server. `initargs` are compared by
+    identity, so a cached TimetableModel reaches each worker once, not per call.
+    """
+    key = (processes, initializer, tuple(id(arg) for arg in initargs))
+    with _process_pools_lock:
+        pool, pool_key = _process_pools.get(name, (None, None))
+        if pool_key != key:
+            if pool is not None:
+                # Work already submitted by other sessions still finishes
+                pool.shutdown(wait=False)
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            pool = ProcessPoolExecutor(
+                max_workers=processes, mp_context=multiprocessing.get_context(method),
+                initializer=initializer, initargs=initargs
+            )
+            _process_pools[name] = (pool, key)
+        return pool
@@ -0,0 +1,151 @@
+"""Headless entry point: python -m arranger (from src/) or python src/cli.py.
+
+Reads a timetable workbook (or a parsed snapshot directory) and an absences
+CSV/JSON file, and writes the arrangement and suggestions as xlsx, CSV or
+JSON. Only local files are used; Streamlit and Google Sheets are never imported.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+
+ABSENCE_TYPES = ["Full", "1st half", "2nd half"]
+
+
+def load_timetable_input(path):
+    """Parse a timetable xlsx (through the snapshot cache) or open a snapshot directory."""
+    path = Path(path)
+    if path.is_dir():
+        from snapshot import open_snapshot
+        timetable_df = open_snapshot(path)
+        if timetable_df is None:
+            raise SystemExit(f"error: {path} is not a timetable snapshot")
+        return timetable_df
+    from parse_cache import get_timetable
+    return get_timetable(str(path))
+
+
+def read_absences(path):
+    """Read absences as a DataFrame with Teacher, Absence Type, Reason and optional Date columns.
+
+    CSV files need a Teacher column. JSON may be a list of such records or a
+    {teacher: absence type} mapping.
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".json":
+        data = json.loads(path.read_text())
+        if isinstance(data, dict):
+            data = [{"Teacher": t, "Absence Type": a} for t, a in data.items()]
+        absences = pd.DataFrame(data)
+    else:
+        absences = pd.read_csv(path, dtype=str, keep_default_na=False)
+    if "Teacher" not in absences.columns:
+        raise SystemExit(f"error: {path} has no 'Teacher' column")
+
+    absences = absences.reindex(columns=["Teacher", "Absence Type", "Reason", "Date"])
+    absences["Teacher"] = absences["Teacher"].astype(str).str.strip()
+    absences["Absence Type"] = absences["Absence Type"].fillna("").replace("", "Full")
+    absences["Reason"] = absences["Reason"].fillna("")
+    unknown = sorted(set(absences["Absence Type"]) - set(ABSENCE_TYPES))
+    if unknown:
+        raise SystemExit(f"error: unknown absence type(s) {unknown}; use one of {ABSENCE_TYPES}")
+    return absences[absences["Teacher"] != ""]
+
+
+def parse_periods(text):
+    """Parse "1-8", "1,2,5" or "1-4,7" into a sorted list of period numbers."""
+    periods = set()
+    for part in text.split(","):
+        first, _, last = part.strip().partition("-")
+        periods.update(range(int(first), int(last or first) + 1))
+    return sorted(periods)
+
+
+def arrange(timetable_df, absences, day, periods, solver):
+    """Solve one day, or every date in the Date column together. Returns (arrangement_df, suggestions_df)."""
+    dated = absences["Date"].fillna("").astype(str).str.strip() != ""
+    if not dated.any():
+        from arranger import generate_arrangement
+        absent_dict = dict(zip(absences["Teacher"], absences["Absence Type"]))
+        reasons = dict(zip(absences["Teacher"], absences["Reason"]))
+        arrangement_df, suggestions = generate_arrangement(absent_dict, reasons, periods, day, timetable_df, solver=solver)
+        return arrangement_df, suggestions.to_frame()
+
+    from planner import plan_days
+    day_absences = {}
+    dated_rows = absences[dated]
+    for teacher, absence_type, reason, date in zip(
+        dated_rows["Teacher"], dated_rows["Absence Type"], dated_rows["Reason"], dated_rows["Date"]
+    ):
+        absent_dict, reasons = day_absences.setdefault(pd.Timestamp(date).date(), ({}, {}))
+        absent_dict[teacher] = absence_type
+        reasons[teacher] = reason
+    plans, _ = plan_days(day_absences, timetable_df, periods, solver=solver)
+    arrangement_df = pd.concat(
+        [p["arrangement"].assign(Date=f"{p['date']:%A, %d %B %Y}", Day=p["day"]) for p in plans], ignore_index=True
+    )
+    suggestions_df = pd.concat(
+        [p["suggestions"].to_frame().assign(Date=f"{p['date']:%A, %d %B %Y}") for p in plans], ignore_index=True
+    )
+    return arrangement_df, suggestions_df
+
+
+def write_outputs(arrangement_df, suggestions_df, output):
+    """Write by extension: .xlsx (two sheets), .json (one document) or .csv (plus *_suggestions.csv)."""
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    suffix = output.suffix.lower()
+    if suffix == ".xlsx":
+        with pd.ExcelWriter(output) as writer:
+            arrangement_df.to_excel(writer, sheet_name="Arrangement", index=False)
+            suggestions_df.to_excel(writer, sheet_name="Suggestions", index=False)
+        return [output]
+    if suffix == ".json":
+        output.write_text(json.dumps({
+            "arrangement": json.loads(arrangement_df.to_json(orient="records")),
+            "suggestions": json.loads(suggestions_df.to_json(orient="records")),
+        }, indent=2, ensure_ascii=False))
+        return [output]
+    suggestions_path = output.with_name(f"{output.stem}_suggestions.csv")
+    arrangement_df.to_csv(output, index=False)
+    suggestions_df.to_csv(suggestions_path, index=False)
+    return [output, suggestions_path]
+
+
+def main(argv=None):
+    from arranger import SOLVERS
+
+    ap = argparse.ArgumentParser(prog="python -m arranger", description=__doc__.splitlines()[0])
+    ap.add_argument("timetable", help="timetable .xlsx, or a .snapshot directory")
+    ap.add_argument("absences", help="absences .csv or .json (Teacher, Absence Type, Reason, optional Date)")
+    ap.add_argument("-o", "--output", default="arrangement.xlsx", help="output .xlsx, .csv or .json")
+    ap.add_argument("--day", default=datetime.today().strftime("%A"), help="weekday for undated absences")
+    ap.add_argument("--periods", default="1-8", help='periods to cover, e.g. "1-4" or "1,3,5"')
+    ap.add_argument("--solver", choices=SOLVERS, default="greedy")
+    ap.add_argument("--seed", type=int, help="seed the greedy solver's tie shuffling for reproducible runs")
+    args = ap.parse_args(argv)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    start = time.perf_counter()
+    timetable_df = load_timetable_input(args.timetable)
+    absences = read_absences(args.absences)
+    unknown = sorted(set(absences["Teacher"]) - set(timetable_df["Teacher"]))
+    if unknown:
+        print(f"warning: not in the timetable: {', '.join(unknown)}", file=sys.stderr)
+
+    arrangement_df, suggestions_df = arrange(timetable_df, absences, args.day, parse_periods(args.periods), args.solver)
+    written = write_outputs(arrangement_df, suggestions_df, args.output)
+
+    filled = sum(arrangement_df[c].astype(str).str.strip().ne("").sum() for c in arrangement_df if str(c).startswith("Period"))
+    print(f"{len(arrangement_df)} row(s), {filled} period(s) covered in {time.perf_counter() - start:.2f}s -> "
+          + ", ".join(str(p) for p in written))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
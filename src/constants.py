@@ -1,2 +1,9 @@
 SPREADSHEET_ID = "1LzqI-onSUtj8ZDicjuadOBEn7C-eqMq0pPL_hkk0W_o"
-MISC_KEYWORDS = ["PH&E", "YOGA TEACHER", "SPORTS COACH", "ART", "DRAWING", "COMPUTER INSTRUCTOR", "LIBR.", "WET", "MUSIC"]
\ No newline at end of file
+MISC_KEYWORDS = ["PH&E", "YOGA TEACHER", "SPORTS COACH", "ART", "DRAWING", "COMPUTER INSTRUCTOR", "LIBR.", "WET", "MUSIC"]
+FREE_CLASS_LABELS = ["", "CCA", "LIB", "LIBRARY", "P.E.", "SPORTS"]
+MAX_TPOD = 7
+DOMAIN_PRIORITY = {
+    "Senior Secondary": ["PGT", "Principal", "Misc"],
+    "Secondary": ["TGT", "Misc", "PGT", "Principal"],
+    "Primary": ["PRT", "Misc", "Principal"]
+}
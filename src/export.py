@@ -0,0 +1,116 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from io import BytesIO
+import pandas as pd
+from perf import instrumented
+
+TITLE_STYLE = "Arrangement Title"
+HEADER_STYLE = "Arrangement Header"
+INVALID_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+
+class ExportCache:
+    """Bounded LRU of workbook bytes keyed by a hash of the exported content.
+
+    Reruns that show the same arrangement reuse the bytes instead of writing
+    the workbook again. Shared by all sessions, so access holds a lock.
+    """
+
+    def __init__(self, max_entries=8):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build_sheets):
+        """Return the bytes for `key`, calling `build_sheets()` and writing the workbook only on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+            self.misses += 1
+            data = write_workbook(build_sheets())
+            self._entries[key] = data
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return data
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+EXPORT_CACHE = ExportCache()
+
+
+def content_key(kind, df, title=None):
+    """sha256 over the export kind, title, columns and cell values of `df`."""
+    digest = hashlib.sha256(repr((kind, title, list(df.columns), len(df))).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def arrangement_workbook(arrangement_df, title):
+    """Return xlsx bytes with a merged title row, a bold header and the arrangement rows."""
+    return EXPORT_CACHE.get(
+        content_key("day", arrangement_df, title), lambda: [("Arrangement", title, arrangement_df)]
+    )
+
+
+def log_workbook(log_df):
+    """Return xlsx bytes with one sheet per Date of a WeeklyLog or {Month}Log frame, in log order."""
+    def build_sheets():
+        used = set()
+        return [
+            (sheet_name(str(date), used), f"Arrangement for {date}", group.drop(columns=["Date", "Day"], errors="ignore"))
+            for date, group in log_df.groupby("Date", sort=False)
+        ]
+    return EXPORT_CACHE.get(content_key("log", log_df), build_sheets)
+
+
+def sheet_name(text, used):
+    """Make `text` a valid, unused Excel sheet name (31 characters, no []:*?/\\)."""
+    base = INVALID_SHEET_CHARS.sub("", text).strip()[:31] or "Sheet"
+    name, n = base, 2
+    while name.lower() in used:
+        suffix = f" ({n})"
+        name, n = base[:31 - len(suffix)] + suffix, n + 1
+    used.add(name.lower())
+    return name
+
+
+@instrumented("excel_export")
+def write_workbook(sheets):
+    """Stream [(sheet name, title, df)] into an xlsx with openpyxl's write-only mode."""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Font, NamedStyle
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    wb.add_named_style(NamedStyle(TITLE_STYLE, font=Font(bold=True, size=14), alignment=Alignment(horizontal="center")))
+    wb.add_named_style(NamedStyle(HEADER_STYLE, font=Font(bold=True)))
+
+    def styled(ws, value, style):
+        cell = WriteOnlyCell(ws, value=value)
+        cell.style = style
+        return cell
+
+    for name, title, df in sheets:
+        ws = wb.create_sheet(name)
+        ws.append([styled(ws, title, TITLE_STYLE)])
+        if df.shape[1] > 1:
+            ws.merged_cells.add(f"A1:{get_column_letter(df.shape[1])}1")
+        ws.append([styled(ws, str(col), HEADER_STYLE) for col in df.columns])
+        values = df.astype(object).where(df.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            ws.append(row)
+
+    output = BytesIO()
+    wb.save(output)
+    return output.getvalue()
@@ -1,35 +1,335 @@
-import gspread
-from google.oauth2.service_account import Credentials
+import math
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
 import pandas as pd
+from pandas.io.parsers import TextParser
 import streamlit as st
+from local_store import LocalStore, OutboxFlusher
+from startup import timed
+from perf import stage, instrumented
+
+# gspread and google-auth are imported on first use: most reruns are served
+# from the local mirror and never talk to Sheets.
+
+# Seconds a mirrored worksheet is served before it is fetched again, so edits
+# made directly in Google Sheets show up without a manual reload
+MIRROR_MAX_AGE = 300
 
 @st.cache_resource
 def get_gsheet_client():
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds_dict = st.secrets["gcp_service_account"]
-    creds = Credentials.from_service_account_info(creds_dict, scopes=scope)
-    client = gspread.authorize(creds)
+    import gspread
+    from google.oauth2.service_account import Credentials
+
+    with timed("sheets_auth"):
+        scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+        creds_dict = st.secrets["gcp_service_account"]
+        creds = Credentials.from_service_account_info(creds_dict, scopes=scope)
+        client = gspread.authorize(creds)
     return client
 
 @st.cache_resource
-def get_or_create_worksheet(sheet_id, worksheet_name, rows=1000, cols=20):
-    client = get_gsheet_client()
-    sheet = client.open_by_key(sheet_id)
+def get_spreadsheet(sheet_id):
+    return get_gsheet_client().open_by_key(sheet_id)
+
+@st.cache_resource
+def get_or_create_worksheet(sheet_id, worksheet_name, rows=1000, cols=20, hidden=False):
+    from gspread.exceptions import WorksheetNotFound
+
+    sheet = get_spreadsheet(sheet_id)
     try:
         worksheet = sheet.worksheet(worksheet_name)
-    except gspread.exceptions.WorksheetNotFound:
+    except WorksheetNotFound:
         worksheet = sheet.add_worksheet(title=worksheet_name, rows=str(rows), cols=str(cols))
+        if hidden:
+            worksheet.hide()
     return worksheet
 
-def save_df_to_gsheet(df, worksheet):
-    worksheet.clear()
-    worksheet.update([df.columns.values.tolist()] + df.values.tolist())
+class WorksheetRef:
+    """Worksheet handle that connects to Sheets only when a remote call is made.
+
+    `title` and `spreadsheet.id` are available offline, which is all the
+    local mirror and write batches need. Any other attribute opens (or
+    creates) the real worksheet through `get_or_create_worksheet`.
+    """
+
+    def __init__(self, sheet_id, worksheet_name, **options):
+        self.title = worksheet_name
+        self.spreadsheet = SimpleNamespace(id=sheet_id)
+        self.options = options
+
+    def resolve(self):
+        return get_or_create_worksheet(self.spreadsheet.id, self.title, **self.options)
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+_worksheet_options = {}
+
+def worksheet_ref(sheet_id, worksheet_name, **options):
+    """Return a lazy handle for a worksheet; it is created on first remote use or write."""
+    _worksheet_options[(sheet_id, worksheet_name)] = options
+    return WorksheetRef(sheet_id, worksheet_name, **options)
+
+def df_to_values(df):
+    """Convert a DataFrame to header + rows of JSON-safe cell values ('' for missing)."""
+    rows = [df.columns.astype(str).tolist()]
+    for row in df.astype(object).itertuples(index=False):
+        rows.append(["" if _is_missing(v) else (v.item() if hasattr(v, "item") else v) for v in row])
+    return rows
+
+def _is_missing(value):
+    if value is None or value is pd.NA or value is pd.NaT:
+        return True
+    return isinstance(value, float) and (math.isnan(value) or math.isinf(value))
 
-@st.cache_data(ttl=60)
-def load_df_from_gsheet(_worksheet):
-    data = _worksheet.get_all_values()
+def save_df_to_gsheet(df, worksheet, batch=None, diff=False):
+    """Replace the worksheet contents with `df`; with `diff`, send only the cells that changed."""
+    values = df_to_values(df)
+    with write_batch(worksheet.spreadsheet.id, batch) as batch:
+        if not (diff and update_changed_cells(worksheet, values, batch)):
+            batch.replace(worksheet, values)
+
+# -----------------------------
+# Local mirror and write-through queue
+# -----------------------------
+@st.cache_resource
+def get_local_store():
+    return LocalStore()
+
+@st.cache_resource
+def get_outbox_flusher():
+    flusher = OutboxFlusher(get_local_store(), send_writes, is_client_error=is_client_error)
+    flusher.start()
+    return flusher
+
+@instrumented("sheets_read", rows=len)
+def read_worksheet_values(worksheet, max_age=MIRROR_MAX_AGE):
+    """Return all values of `worksheet`, fetching from Sheets only if the local copy is missing or stale.
+
+    A copy is stale once it was fetched more than `max_age` seconds ago;
+    pass None for sheets that no longer change.
+    """
+    store = get_local_store()
+    grid = store.get_grid(worksheet.spreadsheet.id, worksheet.title, max_age)
+    if grid is None:
+        fetched_at = time.time()
+        with timed("sheets_first_fetch"), stage("sheets_fetch") as timing:
+            values = worksheet.get_all_values()
+            timing.rows = len(values)
+        grid = store.refresh(worksheet.spreadsheet.id, worksheet.title, values, fetched_at)
+    return grid
+
+def mirrored_values(worksheet, max_age=MIRROR_MAX_AGE):
+    """Return the local copy of `worksheet` if fetched within `max_age` seconds, else None; never calls Sheets."""
+    return get_local_store().get_grid(worksheet.spreadsheet.id, worksheet.title, max_age)
+
+def read_worksheet_blocks(worksheet, blocks, max_age=MIRROR_MAX_AGE):
+    """Return {(first_row, last_row): rows} for 1-based row ranges of `worksheet`.
+
+    A mirrored worksheet is sliced locally. Otherwise the blocks not fetched
+    within `max_age` seconds are read in one values_batch_get call and kept
+    in the local store.
+    """
+    store = get_local_store()
+    spreadsheet_id, title = worksheet.spreadsheet.id, worksheet.title
+    grid = store.get_grid(spreadsheet_id, title, max_age)
+    if grid is not None:
+        return {(first, last): grid[first - 1:last] for first, last in blocks}
+
+    found = store.get_blocks(spreadsheet_id, title, blocks, max_age)
+    missing = [block for block in dict.fromkeys(blocks) if block not in found]
+    if missing:
+        with stage("sheets_fetch", rows=sum(last - first + 1 for first, last in missing)):
+            response = get_spreadsheet(spreadsheet_id).values_batch_get(
+                [f"{_quote_title(title)}!{first}:{last}" for first, last in missing]
+            )
+        fetched = {
+            block: [list(row) for row in value_range.get("values", [])]
+            for block, value_range in zip(missing, response["valueRanges"])
+        }
+        store.put_blocks(spreadsheet_id, title, fetched)
+        found.update(fetched)
+    return found
+
+def load_df_from_gsheet(worksheet, max_age=MIRROR_MAX_AGE):
+    data = read_worksheet_values(worksheet, max_age)
     if not data:
         return pd.DataFrame()
     headers = data[0]
     rows = data[1:]
-    return pd.DataFrame(rows, columns=headers)
\ No newline at end of file
+    return pd.DataFrame(rows, columns=headers)
+
+def load_parsed_df_from_gsheet(worksheet):
+    """Like gspread_dataframe.get_as_dataframe, but read through the local mirror."""
+    data = read_worksheet_values(worksheet)
+    if not data:
+        return pd.DataFrame()
+    return TextParser(data, header=0).read().dropna(how="all")
+
+def sync_status():
+    """Return (writes waiting for Sheets, last send error or None).
+
+    Writes left in the outbox by an earlier run start the outbox thread
+    here, rather than waiting for the next queued write.
+    """
+    pending, error = get_local_store().pending_status()
+    if pending:
+        get_outbox_flusher()
+    return pending, error
+
+def sync_failures():
+    """Return [(id, spreadsheet_id, worksheet titles, attempts, error)] of writes the outbox gave up on."""
+    return get_local_store().dead_entries()
+
+def retry_failed_writes():
+    """Queue the writes the outbox gave up on again, after the pending ones."""
+    retried = get_local_store().retry_dead()
+    if retried:
+        get_outbox_flusher().notify()
+    return retried
+
+def discard_failed_writes():
+    """Drop the writes the outbox gave up on; the sheets they touched are read from Sheets again."""
+    return get_local_store().discard_dead()
+
+# -----------------------------
+# Batched writes
+# -----------------------------
+class SheetWriteBatch:
+    """Collect the worksheet writes of one user action and send them together.
+
+    `sink(spreadsheet_id, clears, updates)` receives the queued writes on
+    flush: `send_writes` posts them straight to Sheets, `queue_writes`
+    applies them to the local mirror and leaves the upload to the outbox
+    thread. Clearing a worksheet drops updates already queued for it, so
+    repeated full rewrites of the same sheet collapse into the last one.
+    Callbacks given to `after_flush` run once the sink has taken the writes.
+    """
+
+    def __init__(self, spreadsheet_id, sink=None):
+        self.spreadsheet_id = spreadsheet_id
+        self.sink = sink or queue_writes
+        self.clears = []
+        self.updates = []
+        self.callbacks = []
+
+    def clear(self, worksheet):
+        title = worksheet.title
+        self.updates = [u for u in self.updates if u[0] != title]
+        if title not in self.clears:
+            self.clears.append(title)
+
+    def update(self, worksheet, values, row=1, col=1):
+        self.updates.append((worksheet.title, row, col, values))
+
+    def replace(self, worksheet, values):
+        self.clear(worksheet)
+        self.update(worksheet, values)
+
+    def touches(self, worksheet):
+        """True if writes to `worksheet` are queued in this batch."""
+        return worksheet.title in self.clears or any(u[0] == worksheet.title for u in self.updates)
+
+    def after_flush(self, callback):
+        self.callbacks.append(callback)
+
+    def flush(self):
+        """Hand queued writes to the sink, reset the batch and run the `after_flush` callbacks.
+
+        If the sink raises, the writes stay queued and no callback runs.
+        """
+        if self.clears or self.updates:
+            self.sink(self.spreadsheet_id, self.clears, self.updates)
+        callbacks = self.callbacks
+        self.clears = []
+        self.updates = []
+        self.callbacks = []
+        for callback in callbacks:
+            callback()
+
+def grid_diff(old_grid, new_grid):
+    """Return (row, col, [[values]]) runs of cells that turn `old_grid` into `new_grid`.
+
+    Rows and columns are 1-based. Cells only present in `old_grid` are
+    blanked. Values are compared as the strings Sheets would return.
+    """
+    runs = []
+    for r in range(max(len(old_grid), len(new_grid))):
+        old_row = [_cell_text(v) for v in old_grid[r]] if r < len(old_grid) else []
+        new_row = [_cell_text(v) for v in new_grid[r]] if r < len(new_grid) else []
+        width = max(len(old_row), len(new_row))
+        run_start = None
+        for c in range(width + 1):
+            changed = c < width and _cell_at(old_row, c) != _cell_at(new_row, c)
+            if changed and run_start is None:
+                run_start = c
+            elif not changed and run_start is not None:
+                runs.append((r + 1, run_start + 1, [[_cell_at(new_row, i) for i in range(run_start, c)]]))
+                run_start = None
+    return runs
+
+def update_changed_cells(worksheet, grid, batch, row=1):
+    """Queue the cells of `grid` (top-left at `row`, column A) that differ from the local mirror.
+
+    Returns False, queuing nothing, when the worksheet is not mirrored (or
+    the copy is stale) and the caller has to write it whole.
+    """
+    mirrored = mirrored_values(worksheet)
+    if mirrored is None:
+        return False
+    old_grid = mirrored[row - 1:row - 1 + len(grid)]
+    for r, c, values in grid_diff(old_grid, grid):
+        batch.update(worksheet, values, row=row + r - 1, col=c)
+    return True
+
+def _cell_at(row, c):
+    return row[c] if c < len(row) else ""
+
+def _cell_text(value):
+    return "" if value is None else str(value)
+
+def send_writes(spreadsheet_id, clears, updates):
+    """Send writes to Sheets as one values_batch_clear and one values_batch_update call."""
+    from gspread.utils import rowcol_to_a1
+
+    # Worksheets only referenced lazily so far must exist before writing to them
+    for title in dict.fromkeys(list(clears) + [u[0] for u in updates]):
+        get_or_create_worksheet(spreadsheet_id, title, **_worksheet_options.get((spreadsheet_id, title), {}))
+    spreadsheet = get_spreadsheet(spreadsheet_id)
+    with stage("sheets_write", rows=sum(len(u[3]) for u in updates)):
+        if clears:
+            spreadsheet.values_batch_clear(body={"ranges": [_quote_title(t) for t in clears]})
+        if updates:
+            spreadsheet.values_batch_update(body={
+                "valueInputOption": "RAW",
+                "data": [
+                    {"range": f"{_quote_title(title)}!{rowcol_to_a1(row, col)}", "values": values}
+                    for title, row, col, values in updates
+                ]
+            })
+
+@instrumented("sheets_queue")
+def queue_writes(spreadsheet_id, clears, updates):
+    """Apply writes to the local mirror and queue them for the outbox thread."""
+    get_local_store().write(spreadsheet_id, clears, updates)
+    get_outbox_flusher().notify()
+
+def is_client_error(error):
+    """True for a request Sheets rejected (4xx other than timeout/rate limit), which a retry will not fix."""
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    return status is not None and 400 <= status < 500 and status not in (408, 429)
+
+def _quote_title(title):
+    return "'" + title.replace("'", "''") + "'"
+
+@contextmanager
+def write_batch(sheet_id, batch=None):
+    """Yield `batch` if given, else a new batch that is flushed on exit."""
+    if batch is not None:
+        yield batch
+        return
+    batch = SheetWriteBatch(sheet_id)
+    yield batch
+    batch.flush()
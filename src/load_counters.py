@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+import pandas as pd
+from gsheet import get_local_store, worksheet_ref, load_df_from_gsheet
+from local_store import load_periods
+from arranger import assignment_records
+from utils import parse_log_date
+
+
+def count_substitutions(arrangement_df):
+    """Return {teacher: periods covered} from an arrangement table of "Teacher (Class)" cells."""
+    if arrangement_df.empty or "Absent Teacher" not in arrangement_df.columns:
+        return {}
+    return assignment_records(arrangement_df)["Substitute Teacher"].value_counts().to_dict()
+
+
+def record_day_loads(spreadsheet_id, date, arrangement_df, store=None):
+    """Store the substitutions of one committed day, replacing any earlier version of it."""
+    store = store or get_local_store()
+    store.put_day_loads(spreadsheet_id, _as_date(date), count_substitutions(arrangement_df))
+
+
+def load_history(spreadsheet_id, date=None, store=None):
+    """Return {teacher: (week-to-date, month-to-date)} substitutions before `date`.
+
+    Reads the maintained week and month totals (one row per teacher) and
+    takes out `date` and any later day already logged in that week or month
+    (e.g. by the Batch Planner), so regenerating a day does not count
+    against its own earlier result or against days still to come. A month
+    missing from the local store is seeded once from its {Month}Log sheet.
+    """
+    store = store or get_local_store()
+    date = _as_date(date or datetime.today())
+    week_key, month_key = load_periods(date)
+    week_start = date - timedelta(days=date.weekday())
+    for month_date in {week_start.replace(day=1), date.replace(day=1)}:
+        seed_month_loads(spreadsheet_id, month_date, store)
+
+    week_end = week_start + timedelta(days=6)
+    month_end = (date.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    week = store.get_load_totals(spreadsheet_id, week_key)
+    month = store.get_load_totals(spreadsheet_id, month_key)
+    week_rest = store.sum_day_loads(spreadsheet_id, date, week_end)
+    month_rest = store.sum_day_loads(spreadsheet_id, date, month_end)
+    history = {
+        teacher: (week.get(teacher, 0) - week_rest.get(teacher, 0), month.get(teacher, 0) - month_rest.get(teacher, 0))
+        for teacher in set(week) | set(month)
+    }
+    return {teacher: loads for teacher, loads in history.items() if any(loads)}
+
+
+def seed_month_loads(spreadsheet_id, month_date, store=None):
+    """Fill the counters of one month from its {Month}Log sheet, once per local store."""
+    store = store or get_local_store()
+    month = f"{month_date:%Y-%m}"
+    if store.is_month_seeded(spreadsheet_id, month):
+        return
+    ws = worksheet_ref(sheet_id=spreadsheet_id, worksheet_name=f"{month_date:%B}Log")
+    month_df = load_df_from_gsheet(ws)
+    if not month_df.empty and "Date" in month_df.columns:
+        for date_str, group in month_df.groupby("Date", sort=False):
+            date = parse_log_date(date_str)
+            if date is None:
+                continue
+            # The sheet only carries the month name; skip rows from other years
+            if f"{date:%Y-%m}" == month:
+                store.put_day_loads(spreadsheet_id, date, count_substitutions(group))
+    store.mark_month_seeded(spreadsheet_id, month)
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    return pd.Timestamp(value).date()
@@ -0,0 +1,434 @@
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parent.parent / ".cache" / "local_store.sqlite3"
+MAX_RETRY_DELAY = 60
+# Sends allowed per outbox entry before it is set aside as failed: a rejected
+# request (4xx) is retried once, a server or connection error for ~15 minutes
+MAX_CLIENT_ATTEMPTS = 2
+MAX_ATTEMPTS = 20
+# Sent outbox entries are kept this long so a fetch that overlapped the send
+# can replay them (see `LocalStore.refresh`)
+SENT_RETENTION = 600
+
+
+class LocalStore:
+    """SQLite mirror of worksheet values plus an outbox of pending Sheets writes.
+
+    Reads are served from the mirror once a worksheet has been fetched,
+    for as long as the caller accepts its age.
+    Writes are applied to the mirror immediately and queued in the outbox;
+    an `OutboxFlusher` thread sends them to Google Sheets in order. Entries
+    that keep failing are marked dead and skipped until retried or discarded.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sheets ("
+                "spreadsheet_id TEXT, title TEXT, grid TEXT, synced_at REAL, "
+                "PRIMARY KEY (spreadsheet_id, title))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS outbox ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, spreadsheet_id TEXT, clears TEXT, updates TEXT, "
+                "attempts INTEGER DEFAULT 0, last_error TEXT, created_at REAL, dead INTEGER DEFAULT 0)"
+            )
+            _add_missing_columns(conn, "outbox", {"dead": "INTEGER DEFAULT 0", "sent_at": "REAL"})
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sheet_blocks ("
+                "spreadsheet_id TEXT, title TEXT, first_row INTEGER, last_row INTEGER, rows TEXT, fetched_at REAL, "
+                "PRIMARY KEY (spreadsheet_id, title, first_row, last_row))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS day_loads ("
+                "spreadsheet_id TEXT, date TEXT, teacher TEXT, count INTEGER, "
+                "PRIMARY KEY (spreadsheet_id, date, teacher))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS load_totals ("
+                "spreadsheet_id TEXT, period TEXT, teacher TEXT, count INTEGER, "
+                "PRIMARY KEY (spreadsheet_id, period, teacher))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS load_seeded ("
+                "spreadsheet_id TEXT, month TEXT, seeded_at REAL, PRIMARY KEY (spreadsheet_id, month))"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    # -----------------------------
+    # Mirror
+    # -----------------------------
+    def get_grid(self, spreadsheet_id, title, max_age=None):
+        """Return the mirrored values of a worksheet, or None if never fetched.
+
+        With `max_age` (seconds), a copy fetched from Sheets longer ago than
+        that also returns None; local writes do not make a copy fresher.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT grid, synced_at FROM sheets WHERE spreadsheet_id = ? AND title = ?", (spreadsheet_id, title)
+            ).fetchone()
+        if row is None or (max_age is not None and row[1] < time.time() - max_age):
+            return None
+        return json.loads(row[0])
+
+    def put_grid(self, spreadsheet_id, title, grid, synced_at=None):
+        """Store the values of a worksheet; `synced_at` is when they were fetched, else the old time is kept."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO sheets (spreadsheet_id, title, grid, synced_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (spreadsheet_id, title) DO UPDATE SET grid = excluded.grid, "
+                "synced_at = COALESCE(?, sheets.synced_at)",
+                (spreadsheet_id, title, json.dumps(grid), synced_at or time.time(), synced_at)
+            )
+
+    def refresh(self, spreadsheet_id, title, remote_grid, fetched_at):
+        """Mirror values fetched from Sheets at `fetched_at`, replaying writes it may not include.
+
+        Those are the queued writes plus any sent since `fetched_at`: the
+        flusher can send and retire a write while the fetch is in flight.
+        """
+        with self._lock:
+            grid = trim_grid([list(r) for r in remote_grid])
+            for clears, updates in self._pending(spreadsheet_id, since=fetched_at):
+                if title in clears:
+                    grid = []
+                for u_title, row, col, values in updates:
+                    if u_title == title:
+                        grid = apply_update(grid, row, col, values)
+            self.put_grid(spreadsheet_id, title, grid, synced_at=fetched_at)
+        return grid
+
+    def forget_titles(self, spreadsheet_id, titles):
+        """Drop the mirrored copies of `titles` so the next reads go back to Sheets."""
+        with self._connect() as conn:
+            for table in ("sheets", "sheet_blocks"):
+                conn.executemany(
+                    f"DELETE FROM {table} WHERE spreadsheet_id = ? AND title = ?",
+                    [(spreadsheet_id, title) for title in titles]
+                )
+
+    def forget(self, spreadsheet_id=None, keep_titles=()):
+        """Drop mirrored worksheets and row blocks so the next reads go back to Sheets.
+
+        Worksheets named in `keep_titles` (e.g. logs of closed months) are kept.
+        """
+        keep = json.dumps(list(keep_titles))
+        with self._connect() as conn:
+            for table in ("sheets", "sheet_blocks"):
+                if spreadsheet_id is None:
+                    conn.execute(f"DELETE FROM {table} WHERE title NOT IN (SELECT value FROM json_each(?))", (keep,))
+                else:
+                    conn.execute(
+                        f"DELETE FROM {table} WHERE spreadsheet_id = ? AND title NOT IN (SELECT value FROM json_each(?))",
+                        (spreadsheet_id, keep)
+                    )
+
+    # -----------------------------
+    # Row blocks of worksheets that are not mirrored whole
+    # -----------------------------
+    def get_blocks(self, spreadsheet_id, title, blocks, max_age=None):
+        """Return {(first_row, last_row): rows} for the requested blocks fetched within `max_age` seconds."""
+        oldest = time.time() - max_age if max_age is not None else 0
+        with self._connect() as conn:
+            found = conn.execute(
+                "SELECT first_row, last_row, rows FROM sheet_blocks WHERE spreadsheet_id = ? AND title = ? "
+                "AND fetched_at >= ?",
+                (spreadsheet_id, title, oldest)
+            ).fetchall()
+        wanted = set(blocks)
+        return {(first, last): json.loads(rows) for first, last, rows in found if (first, last) in wanted}
+
+    def put_blocks(self, spreadsheet_id, title, blocks):
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO sheet_blocks (spreadsheet_id, title, first_row, last_row, rows, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(spreadsheet_id, title, first, last, json.dumps(rows), time.time()) for (first, last), rows in blocks.items()]
+            )
+
+    # -----------------------------
+    # Outbox
+    # -----------------------------
+    def write(self, spreadsheet_id, clears, updates):
+        """Apply a batch of writes to the mirror and queue it for Sheets."""
+        with self._lock:
+            self._apply(spreadsheet_id, clears, updates)
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT INTO outbox (spreadsheet_id, clears, updates, created_at) VALUES (?, ?, ?, ?)",
+                    (spreadsheet_id, json.dumps(clears), json.dumps(updates), time.time())
+                )
+
+    def _apply(self, spreadsheet_id, clears, updates):
+        touched = set(clears) | {u[0] for u in updates}
+        with self._connect() as conn:
+            conn.executemany(
+                "DELETE FROM sheet_blocks WHERE spreadsheet_id = ? AND title = ?",
+                [(spreadsheet_id, title) for title in touched]
+            )
+        for title in touched:
+            grid = self.get_grid(spreadsheet_id, title)
+            if grid is None and title not in clears:
+                # Never fetched: leave it to the next read to pull the real sheet
+                continue
+            if title in clears:
+                grid = []
+            for u_title, row, col, values in updates:
+                if u_title == title:
+                    grid = apply_update(grid, row, col, values)
+            self.put_grid(spreadsheet_id, title, grid)
+
+    def _pending(self, spreadsheet_id, since):
+        """Writes not yet sent, or sent at or after `since`, oldest first."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT clears, updates FROM outbox WHERE spreadsheet_id = ? AND NOT dead "
+                "AND (sent_at IS NULL OR sent_at >= ?) ORDER BY id",
+                (spreadsheet_id, since)
+            ).fetchall()
+        return [(json.loads(c), json.loads(u)) for c, u in rows]
+
+    def next_pending(self):
+        """Return the oldest queued write as (id, spreadsheet_id, clears, updates, attempts)."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, spreadsheet_id, clears, updates, attempts FROM outbox WHERE NOT dead AND sent_at IS NULL ORDER BY id LIMIT 1"
+            ).fetchone()
+        if row is None:
+            return None
+        entry_id, spreadsheet_id, clears, updates, attempts = row
+        return entry_id, spreadsheet_id, json.loads(clears), [tuple(u) for u in json.loads(updates)], attempts
+
+    def mark_sent(self, entry_id):
+        """Retire a sent entry; it is kept SENT_RETENTION seconds for `refresh` to replay."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("UPDATE outbox SET sent_at = ? WHERE id = ?", (now, entry_id))
+            conn.execute("DELETE FROM outbox WHERE sent_at < ?", (now - SENT_RETENTION,))
+
+    def mark_failed(self, entry_id, error):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE outbox SET attempts = attempts + 1, last_error = ? WHERE id = ?", (str(error), entry_id)
+            )
+
+    def mark_dead(self, entry_id, error):
+        """Set an entry aside after its last allowed attempt; later writes are sent without it."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE outbox SET attempts = attempts + 1, last_error = ?, dead = 1 WHERE id = ?", (str(error), entry_id)
+            )
+
+    def pending_status(self):
+        """Return (queued batches, last error or None), not counting dead entries."""
+        with self._connect() as conn:
+            count, = conn.execute("SELECT COUNT(*) FROM outbox WHERE NOT dead AND sent_at IS NULL").fetchone()
+            row = conn.execute(
+                "SELECT last_error FROM outbox WHERE NOT dead AND sent_at IS NULL AND last_error IS NOT NULL "
+                "ORDER BY id LIMIT 1"
+            ).fetchone()
+        return count, row[0] if row else None
+
+    def dead_entries(self):
+        """Return [(id, spreadsheet_id, worksheet titles, attempts, last error)] of dead entries, oldest first."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, spreadsheet_id, clears, updates, attempts, last_error FROM outbox WHERE dead ORDER BY id"
+            ).fetchall()
+        return [
+            (entry_id, spreadsheet_id, list(dict.fromkeys(json.loads(clears) + [u[0] for u in json.loads(updates)])),
+             attempts, last_error)
+            for entry_id, spreadsheet_id, clears, updates, attempts, last_error in rows
+        ]
+
+    def retry_dead(self):
+        """Queue dead entries again, after every pending write, and reapply them to the mirror.
+
+        They then overwrite any later write to the same cells, on Sheets and in
+        the mirror alike.
+        """
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, spreadsheet_id, clears, updates, created_at FROM outbox WHERE dead ORDER BY id"
+            ).fetchall()
+            conn.executemany("DELETE FROM outbox WHERE id = ?", [(row[0],) for row in rows])
+            conn.executemany(
+                "INSERT INTO outbox (spreadsheet_id, clears, updates, created_at) VALUES (?, ?, ?, ?)",
+                [row[1:] for row in rows]
+            )
+        with self._lock:
+            for _, spreadsheet_id, clears, updates, _ in rows:
+                self._apply(spreadsheet_id, json.loads(clears), json.loads(updates))
+        return len(rows)
+
+    def discard_dead(self):
+        """Drop dead entries and the mirrored sheets they touched, which no longer match Sheets."""
+        dead = self.dead_entries()
+        with self._lock:
+            with self._connect() as conn:
+                conn.executemany("DELETE FROM outbox WHERE id = ?", [(entry[0],) for entry in dead])
+            for _, spreadsheet_id, titles, _, _ in dead:
+                self.forget_titles(spreadsheet_id, titles)
+        return len(dead)
+
+    # -----------------------------
+    # Substitution counters
+    # -----------------------------
+    def put_day_loads(self, spreadsheet_id, date, counts):
+        """Replace the {teacher: substitutions} of `date` and adjust its week and month totals."""
+        day = date.isoformat()
+        with self._lock, self._connect() as conn:
+            old = dict(conn.execute(
+                "SELECT teacher, count FROM day_loads WHERE spreadsheet_id = ? AND date = ?", (spreadsheet_id, day)
+            ).fetchall())
+            conn.execute("DELETE FROM day_loads WHERE spreadsheet_id = ? AND date = ?", (spreadsheet_id, day))
+            conn.executemany(
+                "INSERT INTO day_loads (spreadsheet_id, date, teacher, count) VALUES (?, ?, ?, ?)",
+                [(spreadsheet_id, day, teacher, n) for teacher, n in counts.items() if n]
+            )
+            deltas = [(t, counts.get(t, 0) - old.get(t, 0)) for t in set(old) | set(counts)]
+            conn.executemany(
+                "INSERT INTO load_totals (spreadsheet_id, period, teacher, count) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (spreadsheet_id, period, teacher) DO UPDATE SET count = count + excluded.count",
+                [(spreadsheet_id, period, t, delta) for t, delta in deltas if delta for period in load_periods(date)]
+            )
+
+    def get_day_loads(self, spreadsheet_id, date):
+        with self._connect() as conn:
+            return dict(conn.execute(
+                "SELECT teacher, count FROM day_loads WHERE spreadsheet_id = ? AND date = ?",
+                (spreadsheet_id, date.isoformat())
+            ).fetchall())
+
+    def sum_day_loads(self, spreadsheet_id, first, last):
+        """Return {teacher: substitutions} summed over the days `first` to `last`, inclusive."""
+        with self._connect() as conn:
+            return dict(conn.execute(
+                "SELECT teacher, SUM(count) FROM day_loads WHERE spreadsheet_id = ? AND date BETWEEN ? AND ? "
+                "GROUP BY teacher",
+                (spreadsheet_id, first.isoformat(), last.isoformat())
+            ).fetchall())
+
+    def get_load_totals(self, spreadsheet_id, period):
+        """Return {teacher: substitutions} for a key from `load_periods`."""
+        with self._connect() as conn:
+            return dict(conn.execute(
+                "SELECT teacher, count FROM load_totals WHERE spreadsheet_id = ? AND period = ? AND count != 0",
+                (spreadsheet_id, period)
+            ).fetchall())
+
+    def is_month_seeded(self, spreadsheet_id, month):
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT 1 FROM load_seeded WHERE spreadsheet_id = ? AND month = ?", (spreadsheet_id, month)
+            ).fetchone() is not None
+
+    def mark_month_seeded(self, spreadsheet_id, month):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO load_seeded (spreadsheet_id, month, seeded_at) VALUES (?, ?, ?)",
+                (spreadsheet_id, month, time.time())
+            )
+
+
+def _add_missing_columns(conn, table, columns):
+    """Add `columns` ({name: declaration}) that a store created by an older version lacks."""
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    for name, declaration in columns.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {declaration}")
+
+
+def load_periods(date):
+    """Return the (week, month) counter keys a date contributes to."""
+    year, week, _ = date.isocalendar()
+    return f"week:{year}-W{week:02d}", f"month:{date:%Y-%m}"
+
+
+def apply_update(grid, row, col, values):
+    """Write `values` into `grid` at 1-based (row, col), like a Sheets range update."""
+    grid = [list(r) for r in grid]
+    for r_offset, row_values in enumerate(values):
+        r = row - 1 + r_offset
+        while len(grid) <= r:
+            grid.append([])
+        target = grid[r]
+        end = col - 1 + len(row_values)
+        if len(target) < end:
+            target.extend([""] * (end - len(target)))
+        target[col - 1:end] = ["" if v is None else str(v) for v in row_values]
+    return trim_grid(grid)
+
+
+def trim_grid(grid):
+    """Drop trailing empty rows and pad rows to equal width, as get_all_values returns."""
+    while grid and not any(grid[-1]):
+        grid.pop()
+    width = 0
+    for r in grid:
+        for c in range(len(r), 0, -1):
+            if r[c - 1] != "":
+                width = max(width, c)
+                break
+    return [(r + [""] * width)[:width] for r in grid]
+
+
+class OutboxFlusher(threading.Thread):
+    """Background thread that sends queued writes to Sheets, retrying with backoff.
+
+    `is_client_error(error)` tells a rejected request, which will fail the
+    same way again, from a server or connection error; entries are marked
+    dead after MAX_CLIENT_ATTEMPTS or MAX_ATTEMPTS sends respectively.
+    """
+
+    def __init__(self, store, send, idle_interval=1.0, is_client_error=None):
+        super().__init__(daemon=True, name="sheets-outbox")
+        self.store = store
+        self.send = send
+        self.idle_interval = idle_interval
+        self.is_client_error = is_client_error or (lambda error: False)
+        self._wake = threading.Event()
+
+    def notify(self):
+        self._wake.set()
+
+    def run(self):
+        while True:
+            delay = self.flush_once()
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    def flush_once(self):
+        """Send queued writes until the outbox is empty or a send is to be retried. Returns the wait before the next pass."""
+        while True:
+            entry = self.store.next_pending()
+            if entry is None:
+                return self.idle_interval
+            entry_id, spreadsheet_id, clears, updates, attempts = entry
+            try:
+                self.send(spreadsheet_id, clears, updates)
+            except Exception as e:
+                max_attempts = MAX_CLIENT_ATTEMPTS if self.is_client_error(e) else MAX_ATTEMPTS
+                if attempts + 1 >= max_attempts:
+                    self.store.mark_dead(entry_id, e)
+                    continue
+                self.store.mark_failed(entry_id, e)
+                return min(2 ** attempts, MAX_RETRY_DELAY)
+            self.store.mark_sent(entry_id)
@@ -0,0 +1,142 @@
+from constants import MAX_TPOD
+
+# Cost weights for one substitute. Going over the TPOD limit outweighs any
+# domain fallback, as in the greedy search (strict table before relaxed);
+# the domain rank outweighs the teacher's load for the day, which in turn
+# outweighs the load earlier in the week and month.
+OVER_LIMIT_COST = 1000
+DOMAIN_RANK_COST = 100
+ARRANGEMENT_COST = 10
+WEEK_LOAD_COST = 2
+MONTH_LOAD_COST = 0.5
+TPOD_COST = 1
+
+
+def hungarian(cost):
+    """Solve the assignment problem for a rectangular `cost` matrix (rows <= columns).
+
+    Returns the assigned column for each row, minimising the total cost.
+    """
+    n = len(cost)
+    m = len(cost[0]) if n else 0
+    inf = float("inf")
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    p = [0] * (m + 1)
+    way = [0] * (m + 1)
+
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            row = cost[i0 - 1]
+            delta = inf
+            j1 = 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = row[j - 1] - u[i0] - v[j]
+                    if cur < minv[j]:
+                        minv[j] = cur
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    assignment = [-1] * n
+    for j in range(1, m + 1):
+        if p[j]:
+            assignment[p[j] - 1] = j - 1
+    return assignment
+
+
+def substitute_cost(rank, tpod, over_limit, arrangements, week_load=0, month_load=0):
+    """Cost of a free teacher covering one class; lower is better."""
+    return (OVER_LIMIT_COST * over_limit + DOMAIN_RANK_COST * rank
+            + ARRANGEMENT_COST * arrangements + WEEK_LOAD_COST * week_load
+            + MONTH_LOAD_COST * month_load + TPOD_COST * _tpod_value(tpod))
+
+
+def assign_by_matching(slots, slot_index, exclude=(), arrangement_count=None, history=None):
+    """Assign substitutes period by period as a minimum-cost bipartite matching.
+
+    `slots` are (absent teacher, period, class, domains) tuples. Every class
+    of a period is matched at once against the teachers free in that period,
+    so covering as many classes as possible comes first and the cost weights
+    only decide between equally complete assignments. `history` holds
+    {teacher: (week, month)} substitutions so far. Returns the substitute
+    (or None) and the ranked suggestions for each slot, as (teacher, cost)
+    pairs, in `slots` order.
+    """
+    if arrangement_count is None:
+        arrangement_count = {}
+    if history is None:
+        history = {}
+    substitutes = [None] * len(slots)
+    suggestions = [[] for _ in slots]
+
+    by_period = {}
+    for i, slot in enumerate(slots):
+        by_period.setdefault(slot[1], []).append(i)
+
+    for period in sorted(by_period):
+        rows = by_period[period]
+        teachers = []
+        columns = {}
+        row_costs = []
+        for i in rows:
+            costs = {}
+            for teacher, rank, tpod, over_limit in slot_index.ranked_candidates(period, slots[i][3], exclude):
+                costs[teacher] = substitute_cost(
+                    rank, tpod, over_limit, arrangement_count.get(teacher, 0), *history.get(teacher, (0, 0))
+                )
+                if teacher not in columns:
+                    columns[teacher] = len(teachers)
+                    teachers.append(teacher)
+            row_costs.append(costs)
+            suggestions[i] = [(teacher, costs[teacher]) for teacher in sorted(costs, key=costs.get)]
+
+        if not teachers:
+            continue
+
+        # One "uncovered" column per class, priced above any set of real assignments
+        highest = max(c for costs in row_costs for c in costs.values())
+        uncovered = (highest + 1) * (len(rows) + 1)
+        infeasible = uncovered * 2
+        matrix = []
+        for costs in row_costs:
+            line = [infeasible] * len(teachers) + [uncovered] * len(rows)
+            for teacher, c in costs.items():
+                line[columns[teacher]] = c
+            matrix.append(line)
+
+        for i, costs, col in zip(rows, row_costs, hungarian(matrix)):
+            if col < len(teachers) and teachers[col] in costs:
+                substitutes[i] = teachers[col]
+                arrangement_count[teachers[col]] = arrangement_count.get(teachers[col], 0) + 1
+
+    return substitutes, suggestions
+
+
+def _tpod_value(tpod):
+    try:
+        value = float(tpod)
+    except (TypeError, ValueError):
+        return MAX_TPOD
+    return MAX_TPOD if value != value else value
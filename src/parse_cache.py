@@ -0,0 +1,110 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from pathlib import Path
+from parser import parse_timetable
+from perf import instrumented
+from snapshot import SNAPSHOT_DIR, snapshot_path_for, save_snapshot, load_snapshot, prune_snapshots
+from timetable_model import TimetableModel
+
+
+def timetable_cache_key(file_input):
+    """Key a timetable source by path + mtime, or by a hash of uploaded bytes."""
+    if isinstance(file_input, (str, Path)):
+        path = Path(file_input).resolve()
+        return ("path", str(path), path.stat().st_mtime_ns)
+    data = file_input.getvalue()
+    return ("sha256", hashlib.sha256(data).hexdigest())
+
+
+def load_timetable(key, file_input):
+    """Load from the on-disk snapshot for `key`, parsing and writing one if needed."""
+    if key[0] == "path":
+        path = Path(key[1])
+        snapshot_path = snapshot_path_for(path)
+        source = {"size": path.stat().st_size, "mtime_ns": key[2]}
+    else:
+        snapshot_path = SNAPSHOT_DIR / f"{key[1]}.snapshot"
+        source = {"sha256": key[1]}
+
+    timetable_df = load_snapshot(snapshot_path, source)
+    if timetable_df is None:
+        if key[0] == "path":
+            timetable_df = parse_timetable(key[1])
+        else:
+            timetable_df = parse_timetable(BytesIO(file_input.getvalue()))
+        save_snapshot(timetable_df, snapshot_path, source)
+        if key[0] != "path":
+            prune_snapshots(SNAPSHOT_DIR)
+    return timetable_df
+
+
+class ParseCache:
+    """Bounded LRU cache of parsed timetables with hit/miss counters.
+
+    Parsed frames, and the TimetableModel built from each on first use, are
+    shared between callers and must not be modified. Streamlit sessions run
+    on separate threads, so every access holds the cache's lock; a workbook
+    is parsed once even when two sessions miss on it together.
+    """
+
+    def __init__(self, max_entries=4):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._models = {}
+        self._lock = threading.RLock()
+
+    def get(self, file_input):
+        """Return the parsed timetable for `file_input`, parsing only on a miss."""
+        key = timetable_cache_key(file_input)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+            self.misses += 1
+            timetable_df = load_timetable(key, file_input)
+            self._entries[key] = timetable_df
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._models.pop(evicted, None)
+            return timetable_df
+
+    def model(self, file_input):
+        """Return the TimetableModel for `file_input`, building it once per cached timetable."""
+        with self._lock:
+            timetable_df = self.get(file_input)
+            key = timetable_cache_key(file_input)
+            if key not in self._models:
+                self._models[key] = TimetableModel.from_frame(timetable_df)
+            return self._models[key]
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._models.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+TIMETABLE_CACHE = ParseCache()
+
+
+@instrumented("timetable_load", rows=len)
+def get_timetable(file_input):
+    """Parse `file_input` through the process-wide timetable cache."""
+    return TIMETABLE_CACHE.get(file_input)
+
+
+@instrumented("timetable_model")
+def get_timetable_model(file_input):
+    """Integer-coded model of `file_input`'s timetable, cached alongside the parsed frame."""
+    return TIMETABLE_CACHE.model(file_input)
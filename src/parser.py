@@ -1,9 +1,76 @@
+import numpy as np
 import pandas as pd
-from utils import get_teacher_domain
+from utils import teacher_domains
+from perf import instrumented
 
-def parse_timetable(file):
+DAY_NAMES = ["MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY", "SATURDAY"]
+PERIOD_COLUMNS = list(range(1, 9))
+TPOD_COLUMN = 9
+
+
+@instrumented("xlsx_parse", rows=len)
+def parse_timetable(file, vectorized=True):
     """Read and parse timetable Excel file into a structured DataFrame."""
     df = pd.read_excel(file, sheet_name="TEACHER  WISE", header=None)
+    return parse_teacher_wise(df, vectorized=vectorized)
+
+
+def parse_teacher_wise(df, vectorized=True):
+    """Parse the raw `TEACHER  WISE` sheet into one row per (teacher, day, period)."""
+    if vectorized:
+        return _parse_vectorized(df)
+    return _parse_iterrows(df)
+
+
+def _parse_vectorized(df):
+    """Parse with column operations: ffill teacher names, mask day rows, melt periods."""
+    first = df[0]
+    first_cell = first.astype(object).where(first.notna(), "").astype(str).str.strip()
+    first_upper = first_cell.str.upper()
+    is_day = first_upper.isin(DAY_NAMES)
+
+    # Detect teacher name rows and carry each name down to its day rows
+    is_teacher = (
+        (first_cell != "")
+        & ~is_day
+        & ~first_cell.str.isdigit()
+        & ~first_upper.str.contains("TOTAL", regex=False)
+        & ~first_upper.str.contains("TPOD", regex=False)
+    )
+    teacher_col = first_cell.where(is_teacher).ffill()
+    day_rows = is_day & teacher_col.notna()
+
+    n_days = int(day_rows.sum())
+    if n_days == 0:
+        return pd.DataFrame(columns=["Teacher", "Day", "Period", "Class", "TPOD", "Domain"])
+
+    n_periods = len(PERIOD_COLUMNS)
+    teachers = np.repeat(teacher_col[day_rows].to_numpy(dtype=object), n_periods)
+    days = np.repeat(first_cell[day_rows].str.capitalize().to_numpy(dtype=object), n_periods)
+    tpods = np.repeat(np.array(
+        [int(v) if pd.notna(v) else None for v in df.loc[day_rows, TPOD_COLUMN]], dtype=object
+    ), n_periods)
+
+    # Melt periods 1-8 into long form in one reshape (row-major keeps file order)
+    raw_classes = pd.Series(df.loc[day_rows, PERIOD_COLUMNS].to_numpy(dtype=object).ravel())
+    has_class = raw_classes.notna() & raw_classes.astype(bool)
+    classes = np.full(len(raw_classes), None, dtype=object)
+    classes[has_class.to_numpy()] = raw_classes[has_class].astype(str).str.strip().to_numpy(dtype=object)
+
+    parsed = pd.DataFrame({
+        "Teacher": teachers,
+        "Day": days,
+        "Period": np.tile(PERIOD_COLUMNS, n_days),
+        "Class": classes,
+        "TPOD": tpods.tolist(),
+    })
+
+    parsed["Domain"] = teacher_domains(parsed["Teacher"])
+    return parsed
+
+
+def _parse_iterrows(df):
+    """Row-by-row parser, kept as the reference for the vectorized path."""
     parsed_rows = []
     current_teacher = None
 
@@ -12,7 +79,7 @@ def parse_timetable(file):
         # Detect teacher name rows
         if (
             first_cell
-            and first_cell.upper() not in ["MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY", "SATURDAY"]
+            and first_cell.upper() not in DAY_NAMES
             and not first_cell.isdigit()
             and "TOTAL" not in first_cell.upper()
             and "TPOD" not in first_cell.upper()
@@ -21,10 +88,10 @@ def parse_timetable(file):
             continue
 
         # Detect timetable rows for days
-        if first_cell.upper() in ["MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY", "SATURDAY"] and current_teacher:
+        if first_cell.upper() in DAY_NAMES and current_teacher:
             day = first_cell.capitalize()
-            tpod_val = row[9] if pd.notna(row[9]) else None
-            for period_num in range(1, 9):
+            tpod_val = row[TPOD_COLUMN] if pd.notna(row[TPOD_COLUMN]) else None
+            for period_num in PERIOD_COLUMNS:
                 class_val = row[period_num] if pd.notna(row[period_num]) else None
                 parsed_rows.append({
                     "Teacher": current_teacher,
@@ -35,5 +102,5 @@ def parse_timetable(file):
                 })
 
     df = pd.DataFrame(parsed_rows)
-    df["Domain"] = df["Teacher"].apply(get_teacher_domain)
-    return df
\ No newline at end of file
+    df["Domain"] = teacher_domains(df["Teacher"])
+    return df
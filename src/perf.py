@@ -0,0 +1,95 @@
+"""Per-stage timing for the arrangement pipeline.
+
+Stages record wall time, call count and rows processed. Nested stages are
+inclusive (a stage's time contains its children). Totals are kept per
+process. The "run" view lives in a context variable that the app resets at
+the start of every rerun; each session's script runs in its own thread, so
+other sessions and writes finishing in the background show up in the
+totals only.
+"""
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from types import SimpleNamespace
+
+_lock = threading.Lock()
+_run = contextvars.ContextVar("perf_run", default=None)
+_total = {}
+
+
+def record(stage, seconds, rows=None):
+    """Add one call of `stage` to the current run (if one was started here) and the process totals."""
+    run = _run.get()
+    with _lock:
+        for stats in (_total,) if run is None else (run, _total):
+            entry = stats.setdefault(stage, {"calls": 0, "seconds": 0.0, "rows": 0})
+            entry["calls"] += 1
+            entry["seconds"] += seconds
+            entry["rows"] += rows or 0
+
+
+@contextmanager
+def stage(name, rows=None):
+    """Time a block as `name`. Set `.rows` on the yielded object once the row count is known."""
+    timing = SimpleNamespace(rows=rows)
+    start = time.perf_counter()
+    try:
+        yield timing
+    finally:
+        record(name, time.perf_counter() - start, timing.rows)
+
+
+def instrumented(name, rows=None):
+    """Decorator form of `stage`; `rows` maps the function's result to a row count."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name) as timing:
+                result = fn(*args, **kwargs)
+                if rows is not None:
+                    timing.rows = rows(result)
+                return result
+        return wrapper
+    return decorate
+
+
+def reset_run():
+    """Start a new "run" view for the calling thread."""
+    _run.set({})
+
+
+def report(scope="run"):
+    """Return {stage: {calls, seconds, rows}} for this run or the whole process, slowest first."""
+    with _lock:
+        stats = (_run.get() or {}) if scope == "run" else _total
+        items = sorted(stats.items(), key=lambda item: -item[1]["seconds"])
+        return {name: {**entry, "seconds": round(entry["seconds"], 5)} for name, entry in items}
+
+
+def report_json(**extra):
+    """Both scopes as a JSON document, with any `extra` fields added at the top level."""
+    return json.dumps({**extra, "run": report("run"), "total": report("total")}, indent=2, default=str)
+
+
+# -----------------------------
+# Profiler capture
+# -----------------------------
+def start_profile():
+    """Start a cProfile capture of the calling thread."""
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def stop_profile(profiler, limit=40):
+    """Stop `profiler` and return its top `limit` functions by cumulative time as text."""
+    import io
+    import pstats
+    profiler.disable()
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
@@ -1,77 +1,348 @@
+import json
+import weakref
 import pandas as pd
 from datetime import datetime
-from gspread_dataframe import set_with_dataframe, get_as_dataframe
-from gsheet import save_df_to_gsheet, load_df_from_gsheet, get_or_create_worksheet
+from gsheet import save_df_to_gsheet, load_df_from_gsheet, load_parsed_df_from_gsheet, worksheet_ref, df_to_values, write_batch, read_worksheet_values, read_worksheet_blocks, grid_diff, update_changed_cells, mirrored_values, MIRROR_MAX_AGE
 from io import StringIO
+from pandas.io.parsers import TextParser
+from load_counters import record_day_loads
+from perf import instrumented
+from utils import parse_log_date
 
 # -----------------------------
 # Weekly Log Persistence
 # -----------------------------
-def persist_weekly_log(df, spreadsheet_id):
-    """Save weekly arrangement to WeeklyLog and mirror into monthly log."""
-    ws = get_or_create_worksheet(sheet_id=spreadsheet_id, worksheet_name="WeeklyLog")
-    save_df_to_gsheet(df, ws)
-    append_to_monthly_log(df, spreadsheet_id)
+def persist_weekly_log(df, spreadsheet_id, batch=None):
+    """Save weekly arrangement to WeeklyLog (changed cells only); day blocks of the monthly log are written by the callers."""
+    ws = worksheet_ref(sheet_id=spreadsheet_id, worksheet_name="WeeklyLog")
+    save_df_to_gsheet(df, ws, batch=batch, diff=True)
+
+@instrumented("persist_arrangement_logs")
+def persist_arrangement_logs(weekly_log_df, arrangement_df, spreadsheet_id, batch=None):
+    """Write WeeklyLog and today's block of the monthly log in one batch, and update the load counters."""
+    with write_batch(spreadsheet_id, batch) as batch:
+        persist_weekly_log(weekly_log_df, spreadsheet_id, batch=batch)
+        append_to_monthly_log(arrangement_df, spreadsheet_id, batch=batch)
+    record_day_loads(spreadsheet_id, datetime.today(), arrangement_df)
+
+@instrumented("persist_plan_logs")
+def persist_plan_logs(weekly_log_df, day_plans, spreadsheet_id, batch=None):
+    """Write WeeklyLog and one monthly log block per planned (date, arrangement_df) in one batch.
+
+    The load counters of every planned day are updated as well.
+    """
+    with write_batch(spreadsheet_id, batch) as batch:
+        if weekly_log_df is not None and not weekly_log_df.empty:
+            persist_weekly_log(weekly_log_df, spreadsheet_id, batch=batch)
+        for date, arrangement_df in day_plans:
+            append_to_monthly_log(arrangement_df, spreadsheet_id, batch=batch, date=date)
+    for date, arrangement_df in day_plans:
+        record_day_loads(spreadsheet_id, date, arrangement_df)
 
 def load_weekly_log(spreadsheet_id):
-    ws = get_or_create_worksheet(sheet_id=spreadsheet_id, worksheet_name="WeeklyLog")
-    return load_df_from_gsheet(ws)
+    ws = worksheet_ref(sheet_id=spreadsheet_id, worksheet_name="WeeklyLog")
+    df = load_df_from_gsheet(ws)
+    # Diffed saves blank the rows a shorter log no longer uses
+    return df[(df != "").any(axis=1)].reset_index(drop=True) if not df.empty else df
 
 # -----------------------------
 # Monthly Log Persistence
 # -----------------------------
-def append_to_monthly_log(timetable_df, spreadsheet_id):
-    """Append or update the current arrangement in {MonthName}Log."""
-    today = datetime.today()
+@instrumented("monthly_log_write")
+def append_to_monthly_log(timetable_df, spreadsheet_id, batch=None, incremental=True, date=None):
+    """Append or update the current arrangement in {MonthName}Log.
+
+    `date` defaults to today. In incremental mode only that date's row block
+    is written, using the row index kept in the LogIndex tab. The whole sheet
+    is rewritten (and the index rebuilt) when no index exists yet or the
+    columns changed.
+    """
+    today = date or datetime.today()
     month_name = today.strftime("%B")
     month_sheet_name = f"{month_name}Log"
-
-    ws = get_or_create_worksheet(sheet_id=spreadsheet_id, worksheet_name=month_sheet_name)
-    month_df = load_df_from_gsheet(ws)
-
-    # Remove today's entry if exists (overwrite scenario)
     today_str = today.strftime("%A, %d %B %Y")
-    if not month_df.empty and 'Date' in month_df.columns:
-        month_df = month_df[month_df['Date'] != today_str]
+
+    ws = worksheet_ref(sheet_id=spreadsheet_id, worksheet_name=month_sheet_name)
 
     # Add Date and Day columns
     new_df = timetable_df.copy()
     new_df['Date'] = today_str
     new_df['Day'] = today.strftime("%A")
 
-    # Append and save
-    month_df = pd.concat([month_df, new_df], ignore_index=True)
-    save_df_to_gsheet(month_df, ws)
+    with write_batch(spreadsheet_id, batch) as batch:
+        if incremental and _write_log_block(ws, new_df, today_str, spreadsheet_id, batch):
+            return
+
+        month_df = load_df_from_gsheet(ws)
+
+        # Remove today's entry if exists (overwrite scenario)
+        if not month_df.empty and 'Date' in month_df.columns:
+            month_df = month_df[(month_df != "").any(axis=1)]
+            month_df = month_df[month_df['Date'] != today_str]
+
+        # Append and save, keeping each date's rows together
+        month_df = pd.concat([month_df, new_df], ignore_index=True)
+        date_codes, _ = pd.factorize(month_df['Date'])
+        month_df = month_df.iloc[date_codes.argsort(kind="stable")].reset_index(drop=True)
+        save_df_to_gsheet(month_df, ws, batch=batch)
+        _set_log_index_entry(spreadsheet_id, ws.title, _build_log_index_entry(month_df), batch)
+
+
+# -----------------------------
+# Monthly Log Index
+# -----------------------------
+# The LogIndex tab holds one JSON document in A1:
+#   {"<Month>Log": {"header": [...], "next_row": n, "dates": {date: [first_row, last_row]}}}
+# Row numbers are 1-based sheet rows; row 1 is the header.
+# _log_index_cache only takes an index once its write has left the batch;
+# until then the batch's own copy is kept in _batch_log_index.
+LOG_INDEX_SHEET = "LogIndex"
+_log_index_cache = {}
+_batch_log_index = weakref.WeakKeyDictionary()
+
+def load_log_index(spreadsheet_id, batch=None):
+    """Return the date -> row-range index of all monthly logs, as `batch` leaves it if given. Do not modify."""
+    if batch is not None and batch in _batch_log_index:
+        return _batch_log_index[batch]
+    if spreadsheet_id not in _log_index_cache:
+        ws = worksheet_ref(sheet_id=spreadsheet_id, worksheet_name=LOG_INDEX_SHEET, hidden=True)
+        values = read_worksheet_values(ws)
+        raw = values[0][0] if values else None
+        try:
+            _log_index_cache[spreadsheet_id] = json.loads(raw) if raw else {}
+        except ValueError:
+            _log_index_cache[spreadsheet_id] = {}
+    return _log_index_cache[spreadsheet_id]
+
+def _set_log_index_entry(spreadsheet_id, sheet_name, entry, batch):
+    """Queue `entry` in the LogIndex tab; the in-process index follows once the batch is flushed."""
+    log_index = load_log_index(spreadsheet_id, batch)
+    if log_index.get(sheet_name) == entry:
+        return
+    log_index = {**log_index, sheet_name: entry}
+    _batch_log_index[batch] = log_index
+    ws = worksheet_ref(sheet_id=spreadsheet_id, worksheet_name=LOG_INDEX_SHEET, hidden=True)
+    batch.update(ws, [[json.dumps(log_index)]])
+    batch.after_flush(lambda: _log_index_cache.__setitem__(spreadsheet_id, log_index))
+
+def _build_log_index_entry(month_df):
+    dates = {}
+    for row_num, date in enumerate(month_df['Date'], start=2):
+        first, _ = dates.get(date, (row_num, row_num))
+        dates[date] = [first, row_num]
+    return {"header": month_df.columns.tolist(), "next_row": len(month_df) + 2, "dates": dates}
+
+def _grid_log_index_entry(grid):
+    """Index a mirrored {Month}Log grid; None if it has no Date column or a date's rows are split."""
+    header = list(grid[0]) if grid else []
+    while header and not header[-1]:
+        header.pop()
+    if "Date" not in header:
+        return None
+    date_col = header.index("Date")
+    dates = {}
+    previous = None
+    for row_num, row in enumerate(grid[1:], start=2):
+        if not any(row):
+            previous = None
+            continue
+        date = row[date_col]
+        if date != previous and date in dates:
+            return None
+        dates[date] = [dates[date][0] if date in dates else row_num, row_num]
+        previous = date
+    return {"header": header, "next_row": len(grid) + 1, "dates": dates}
+
+def _write_log_block(ws, new_df, date_str, spreadsheet_id, batch):
+    """Overwrite or append the row block for `date_str`. Returns False if a full rewrite is needed.
+
+    When the locally mirrored log disagrees with its index entry (a write
+    that never reached Sheets, an edit made there), the entry is rebuilt
+    from the mirror first.
+    """
+    entry = load_log_index(spreadsheet_id, batch).get(ws.title)
+    if entry and not batch.touches(ws):
+        mirrored = mirrored_values(ws)
+        if mirrored is not None and (
+            len(mirrored) != entry["next_row"] - 1 or mirrored[0][:len(entry["header"])] != entry["header"]
+        ):
+            entry = _grid_log_index_entry(mirrored)
+    if not entry or any(col not in entry["header"] for col in new_df.columns):
+        return False
+
+    header = entry["header"]
+    rows = df_to_values(new_df.reindex(columns=header))[1:]
+    dates = dict(entry["dates"])
+    next_row = entry["next_row"]
+    start, end = dates.pop(date_str, (next_row, next_row - 1))
+    is_last_block = end == next_row - 1
+
+    if not is_last_block and len(rows) > end - start + 1:
+        # An older block grew; it cannot be extended in place
+        return False
+
+    # Blank out rows the new block no longer covers
+    stale_rows = (end - start + 1) - len(rows)
+    block = rows + [[""] * len(header)] * max(stale_rows, 0)
+    if block and not update_changed_cells(ws, block, batch, row=start):
+        batch.update(ws, block, row=start, col=1)
+    if rows:
+        dates[date_str] = [start, start + len(rows) - 1]
+    if is_last_block:
+        next_row = start + len(rows)
+
+    _set_log_index_entry(spreadsheet_id, ws.title, {"header": header, "next_row": next_row, "dates": dates}, batch)
+    return True
+
+def reset_log_index(spreadsheet_id):
+    """Forget the in-process LogIndex so the next read goes through the local mirror again."""
+    _log_index_cache.pop(spreadsheet_id, None)
+
+
+# -----------------------------
+# Monthly Log Reads
+# -----------------------------
+def load_month_log(spreadsheet_id, month_name):
+    ws = worksheet_ref(sheet_id=spreadsheet_id, worksheet_name=f"{month_name}Log")
+    df = load_df_from_gsheet(ws, max_age=_log_max_age(ws.title))
+    # A day's block that shrank leaves blanked rows behind it
+    return df[(df != "").any(axis=1)].reset_index(drop=True) if not df.empty else df
+
+def month_log_dates(spreadsheet_id, month_name):
+    """Return the dates in {month_name}Log, oldest first.
+
+    Comes from the LogIndex without reading the log; months logged before the
+    index existed are read whole.
+    """
+    entry = load_log_index(spreadsheet_id).get(f"{month_name}Log")
+    if entry:
+        dates = list(entry["dates"])
+    else:
+        month_df = load_month_log(spreadsheet_id, month_name)
+        dates = month_df["Date"].unique().tolist() if "Date" in month_df.columns else []
+    return sorted(dates, key=_log_date_key)
+
+def load_month_log_days(spreadsheet_id, month_name, dates):
+    """Return {date: arrangement rows} for `dates` of {month_name}Log, reading only their row blocks."""
+    if not dates:
+        return {}
+    entry = load_log_index(spreadsheet_id).get(f"{month_name}Log")
+    if not entry:
+        month_df = load_month_log(spreadsheet_id, month_name)
+        return {
+            date: month_df[month_df["Date"] == date].drop(columns=["Date", "Day"], errors="ignore").reset_index(drop=True)
+            for date in dates
+        }
+
+    header = entry["header"]
+    ws = worksheet_ref(sheet_id=spreadsheet_id, worksheet_name=f"{month_name}Log")
+    blocks = read_worksheet_blocks(ws, [tuple(entry["dates"][date]) for date in dates], max_age=_log_max_age(ws.title))
+    days = {}
+    for date in dates:
+        rows = [(row + [""] * len(header))[:len(header)] for row in blocks[tuple(entry["dates"][date])]]
+        days[date] = pd.DataFrame(rows, columns=header).drop(columns=["Date", "Day"], errors="ignore")
+    return days
+
+def closed_month_log_titles(today=None):
+    """Return the {Month}Log titles of this year's finished months; their contents no longer change."""
+    today = today or datetime.today()
+    return [f"{datetime(today.year, month, 1):%B}Log" for month in range(1, today.month)]
+
+def _log_max_age(title):
+    """Closed months' logs are never re-fetched; others go stale like any mirrored sheet."""
+    return None if title in closed_month_log_titles() else MIRROR_MAX_AGE
+
+def _log_date_key(date_str):
+    log_date = parse_log_date(date_str)
+    return (0, log_date) if log_date else (1, str(date_str))
+
 
 
 # -----------------------------
 # Session State Persistence
 # -----------------------------
-def save_state_to_sheet(date_str, day_mode, absent_teachers, reasons_dict, timetable_df, worksheet, custom_periods=None, suggestions_df=None):
-    """Save current session (daily arrangement + suggestions_df) to PersistentState sheet."""
-    state_df = timetable_df.copy()
-    state_df['__meta__date'] = date_str
-    state_df['__meta__day_mode'] = day_mode
-    state_df['__meta__absent_teachers'] = ','.join(absent_teachers)
-    state_df['__meta__reasons'] = '|'.join([f"{k}:{v}" for k, v in reasons_dict.items()])
-    state_df['__meta__custom_periods'] = ','.join(custom_periods) if custom_periods else ""
-
-    # Clear old sheet
-    worksheet.clear()
-    set_with_dataframe(worksheet, state_df)
-
-    # Save suggestions_df as JSON in S1
-    if suggestions_df is not None:
-        if suggestions_df.empty:
-            # Ensure empty DataFrame has the expected columns
-            suggestions_df = pd.DataFrame(columns=["Absent Teacher", "Period", "Class", "Suggested Teachers"])
-        worksheet.update("S1", [[suggestions_df.to_json(orient="split")]])
+# Layout (version 2):
+#   A1     JSON metadata record (date, day mode, absences and their types, reasons, custom periods)
+#   B1     suggestions_df as compact JSON {"columns": [...], "data": [...]}
+#   row 2  arrangement header, rows 3+ arrangement rows
+# Saves only rewrite the cells that differ from the locally mirrored sheet.
+STATE_VERSION = 2
+SUGGESTION_COLUMNS = ["Absent Teacher", "Period", "Class", "Suggested Teachers"]
+
+@instrumented("state_save")
+def save_state_to_sheet(date_str, day_mode, absent_teachers, reasons_dict, timetable_df, worksheet, custom_periods=None, suggestions_df=None, batch=None, diff=True, absence_types=None):
+    """Save current session (daily arrangement + suggestions_df) to PersistentState sheet.
 
+    `absence_types` is the {teacher: absence type} the arrangement was made for.
+    """
+    meta = {
+        "version": STATE_VERSION,
+        "date": date_str,
+        "day_mode": day_mode,
+        "absent_teachers": list(absent_teachers),
+        "absence_types": dict(absence_types) if absence_types else {},
+        "reasons": dict(reasons_dict),
+        "custom_periods": list(custom_periods) if custom_periods else [],
+    }
+    if suggestions_df is None or suggestions_df.empty:
+        # Ensure empty DataFrame has the expected columns
+        suggestions_df = pd.DataFrame(columns=SUGGESTION_COLUMNS)
+    suggestions = {"columns": suggestions_df.columns.tolist(), "data": df_to_values(suggestions_df)[1:]}
+
+    grid = [[_compact_json(meta), _compact_json(suggestions)]] + df_to_values(timetable_df)
+
+    with write_batch(worksheet.spreadsheet.id, batch) as batch:
+        old_grid = read_worksheet_values(worksheet) if diff else None
+        if old_grid and _state_version(old_grid) == STATE_VERSION:
+            for row, col, values in grid_diff(old_grid, grid):
+                batch.update(worksheet, values, row=row, col=col)
+        else:
+            batch.replace(worksheet, grid)
+
+@instrumented("state_read")
 def load_state_from_sheet(worksheet):
-    """Load previous session data (including suggestions_df) from PersistentState sheet."""
-    df = get_as_dataframe(worksheet).dropna(how="all")
+    """Load previous session data (including suggestions_df) from PersistentState sheet.
+
+    Returns (date, day mode, absent teachers, reasons, custom periods,
+    arrangement df, suggestions df, absence types); absence types are {} for
+    states saved without them.
+    """
+    grid = read_worksheet_values(worksheet)
+    if _state_version(grid) != STATE_VERSION:
+        return _load_legacy_state(worksheet)
+
+    meta = json.loads(grid[0][0])
+    if len(grid) > 2:
+        df = TextParser(grid[1:], header=0).read().dropna(how="all")
+    else:
+        df = pd.DataFrame(columns=grid[1]) if len(grid) > 1 else pd.DataFrame()
+
+    suggestions = json.loads(grid[0][1]) if len(grid[0]) > 1 and grid[0][1] else {"columns": SUGGESTION_COLUMNS, "data": []}
+    suggestions_df = pd.DataFrame(suggestions["data"], columns=suggestions["columns"])
+    for col in SUGGESTION_COLUMNS:
+        if col not in suggestions_df.columns:
+            suggestions_df[col] = pd.NA
+
+    return (meta["date"], meta["day_mode"], meta["absent_teachers"], meta["reasons"],
+            meta["custom_periods"], df, suggestions_df, meta.get("absence_types", {}))
+
+def _compact_json(value):
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+def _state_version(grid):
+    """Return the state layout version of a PersistentState grid (1 = legacy meta columns)."""
+    if not grid or not grid[0] or not grid[0][0].startswith("{"):
+        return 1
+    try:
+        return json.loads(grid[0][0]).get("version", 1)
+    except ValueError:
+        return 1
+
+def _load_legacy_state(worksheet):
+    """Read the old layout: __meta__* columns repeated on every row, suggestions JSON in S1."""
+    df = load_parsed_df_from_gsheet(worksheet)
     if df.empty:
-        return None, None, [], {}, [], pd.DataFrame(), pd.DataFrame(columns=["Absent Teacher", "Period", "Class", "Suggested Teachers"])
+        return None, None, [], {}, [], pd.DataFrame(), pd.DataFrame(columns=["Absent Teacher", "Period", "Class", "Suggested Teachers"]), {}
 
     # Restore metadata
     date_str = df['__meta__date'].iloc[0] if '__meta__date' in df.columns else None
@@ -90,12 +361,14 @@ def load_state_from_sheet(worksheet):
         except Exception:
             custom_periods = []
 
-    # Drop metadata columns
+    # Drop metadata columns (and the suggestions JSON, which was read as a column header)
     df = df.drop(columns=['__meta__date', '__meta__day_mode', '__meta__absent_teachers',
                           '__meta__reasons', '__meta__custom_periods'], errors='ignore')
+    df = df.loc[:, [c for c in df.columns if not str(c).startswith('{')]]
 
     # Load suggestions_df back from S1
-    cell_val = worksheet.acell("S1").value
+    header = read_worksheet_values(worksheet)[0]
+    cell_val = header[18] if len(header) > 18 else None
     if cell_val:
         suggestions_df = pd.read_json(StringIO(cell_val), orient="split")
     else:
@@ -106,4 +379,4 @@ def load_state_from_sheet(worksheet):
         if col not in suggestions_df.columns:
             suggestions_df[col] = pd.NA
 
-    return date_str, day_mode, absent_teachers, reasons_dict, custom_periods, df, suggestions_df
\ No newline at end of file
+    return date_str, day_mode, absent_teachers, reasons_dict, custom_periods, df, suggestions_df, {}
\ No newline at end of file
@@ -0,0 +1,92 @@
+import os
+import pandas as pd
+from datetime import timedelta
+from arranger import solve_slots, build_arrangement_table
+from background import get_process_pool
+from slot_index import FreeSlotIndex
+from timetable_model import TimetableModel
+
+# Set in each pool worker by _init_worker so the model is sent once per process
+_worker_model = None
+
+
+def expand_leave(leave_rows, start, end):
+    """Turn leave entries into {date: (absent_dict, reasons_dict)} for each school day in range.
+
+    Each entry is a dict with "Teacher", "From", "To", "Absence Type" and
+    "Reason". Sundays and days outside [start, end] are skipped.
+    """
+    days = {}
+    for entry in leave_rows:
+        teacher = entry.get("Teacher")
+        if pd.isna(teacher) or not teacher or pd.isna(entry.get("From")):
+            continue
+        leave_to = entry["From"] if pd.isna(entry.get("To")) else entry["To"]
+        first = max(pd.Timestamp(entry["From"]).date(), start)
+        last = min(pd.Timestamp(leave_to).date(), end)
+        day = first
+        while day <= last:
+            if day.strftime("%A") != "Sunday":
+                absent_dict, reasons_dict = days.setdefault(day, ({}, {}))
+                absent_type = entry.get("Absence Type")
+                reason = entry.get("Reason")
+                absent_dict[teacher] = "Full" if pd.isna(absent_type) or not absent_type else absent_type
+                reasons_dict[teacher] = "" if pd.isna(reason) else reason
+            day += timedelta(days=1)
+    return dict(sorted(days.items()))
+
+
+def prepare_day(model, day, absent_dict, selected_periods):
+    """Build the free-slot index and the classes to cover for one day."""
+    return FreeSlotIndex.from_model(model, day), model.collect_slots(absent_dict, day, selected_periods)
+
+
+def _init_worker(model):
+    global _worker_model
+    _worker_model = model
+
+
+def _prepare_in_worker(day, absent_dict, selected_periods):
+    return prepare_day(_worker_model, day, absent_dict, selected_periods)
+
+
+def plan_days(day_absences, timetable_df, selected_periods, solver="greedy", processes=1, history=None, model=None):
+    """Solve several days in one pass with one shared load-balancing state.
+
+    `day_absences` maps a date to (absent_dict, reasons_dict). Preparing each
+    day (index and slots) is independent; it runs in-process by default, or
+    across `processes` pool workers (None: one per CPU) that keep the model
+    between calls. Substitutes are then assigned day by day in date order so
+    that `arrangement_count` carries over and the load is spread over the range.
+    `history` ({teacher: (week, month)} before the range) breaks ties.
+    `model` is the TimetableModel of `timetable_df`, built here if not given.
+    Returns ([{"date", "day", "arrangement", "suggestions"}, ...], arrangement_count).
+    """
+    if model is None:
+        model = TimetableModel.from_frame(timetable_df)
+    dates = sorted(day_absences)
+    jobs = [(date.strftime("%A"), day_absences[date][0], selected_periods) for date in dates]
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if processes > 1 and len(jobs) > 1:
+        pool = get_process_pool("planner", processes, _init_worker, (model,))
+        prepared = list(pool.map(_prepare_in_worker, *zip(*jobs)))
+    else:
+        prepared = [prepare_day(model, *job) for job in jobs]
+
+    arrangement_count = {}
+    plans = []
+    for date, (slot_index, slots) in zip(dates, prepared):
+        absent_dict, reasons_dict = day_absences[date]
+        substitutes, suggestions = solve_slots(solver, slots, slot_index, absent_dict, arrangement_count, history)
+        arrangement_df, suggestion_index = build_arrangement_table(
+            slots, substitutes, suggestions, selected_periods, reasons_dict
+        )
+        plans.append({
+            "date": date,
+            "day": date.strftime("%A"),
+            "arrangement": arrangement_df,
+            "suggestions": suggestion_index,
+        })
+    return plans, arrangement_count
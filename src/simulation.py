@@ -0,0 +1,150 @@
+import os
+import random
+from itertools import combinations, islice
+from math import comb
+import numpy as np
+import pandas as pd
+from arranger import solve_slots
+from background import get_process_pool
+from slot_index import FreeSlotIndex
+from perf import instrumented
+
+SCENARIO_MODES = ["exhaustive", "sample"]
+CHUNK_SIZE = 250
+# Scenarios each pool worker needs before starting workers pays off
+SCENARIOS_PER_PROCESS = 5000
+
+# Set in each pool worker by _init_worker so the model is sent once per process
+_worker_model = None
+
+
+def absence_pool(model, domains=None):
+    """Teachers that scenarios draw from: all of them, or those in `domains`, in timetable order."""
+    if not domains:
+        return model.teachers.tolist()
+    mask = np.zeros(len(model.teachers), dtype=bool)
+    for domain in domains:
+        mask |= model.domain_mask(domain)
+    return model.teachers[mask].tolist()
+
+
+def scenario_count(pool_size, k, mode, samples):
+    """Number of scenarios `make_scenarios` returns for these settings."""
+    return comb(pool_size, k) if mode == "exhaustive" else samples
+
+
+def make_scenarios(pool, k, mode="sample", samples=1000, seed=None, limit=None):
+    """Absent-teacher tuples of size `k` drawn from `pool`.
+
+    "exhaustive" lists every combination (the first `limit` if given);
+    "sample" draws `samples` random combinations, repeats allowed.
+    """
+    k = min(k, len(pool))
+    if mode == "exhaustive":
+        return list(islice(combinations(pool, k), limit))
+    rng = random.Random(seed)
+    return [tuple(rng.sample(pool, k)) for _ in range(samples)]
+
+
+def run_scenarios(model, day, scenarios, selected_periods, absence_type="Full", solver="greedy", seed=None):
+    """Solve each scenario against one shared free-slot index; nothing is saved.
+
+    Returns an int32 array [scenario, domain, period - 1, 2] holding the slots
+    to cover and how many were left without a substitute, by the absent
+    teacher's domain (index into `model.domain_names`). `seed` seeds the
+    greedy solver's tie-breaking for these scenarios.
+    """
+    rng = random.Random(seed)
+    slot_index = FreeSlotIndex.from_model(model, day)
+    counts = np.zeros((len(scenarios), len(model.domain_names), model.n_periods, 2), dtype=np.int32)
+    for i, absent in enumerate(scenarios):
+        absent_dict = dict.fromkeys(absent, absence_type)
+        slots = model.collect_slots(absent_dict, day, selected_periods)
+        substitutes, _ = solve_slots(solver, slots, slot_index, absent_dict, rng=rng)
+        for (teacher, period, _, _), substitute in zip(slots, substitutes):
+            cell = counts[i, model.domain[model.teacher_ids[teacher]], period - 1]
+            cell[0] += 1
+            if substitute is None:
+                cell[1] += 1
+    return counts
+
+
+def _init_worker(model):
+    global _worker_model
+    _worker_model = model
+
+
+def _run_chunk(day, scenarios, selected_periods, absence_type, solver, seed):
+    return run_scenarios(_worker_model, day, scenarios, selected_periods, absence_type, solver, seed)
+
+
+@instrumented("simulate", rows=len)
+def simulate(model, day, scenarios, selected_periods, absence_type="Full", solver="greedy", processes=None, seed=None):
+    """Run `scenarios` in chunks of CHUNK_SIZE and return the stacked `run_scenarios` counts.
+
+    Each chunk gets its own tie-breaking seed, drawn from `seed`, so results
+    do not depend on where chunks run. By default a process pool is used
+    only with SCENARIOS_PER_PROCESS scenarios per CPU; its workers receive
+    the TimetableModel once and are kept for later runs. Results keep the
+    order of `scenarios`.
+    """
+    chunks = [scenarios[i:i + CHUNK_SIZE] for i in range(0, len(scenarios), CHUNK_SIZE)]
+    if not chunks:
+        return np.zeros((0, len(model.domain_names), model.n_periods, 2), dtype=np.int32)
+    seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(len(chunks))]
+    if processes is None:
+        processes = min(os.cpu_count() or 1, len(scenarios) // SCENARIOS_PER_PROCESS)
+    if processes > 1 and len(chunks) > 1:
+        pool = get_process_pool("simulation", processes, _init_worker, (model,))
+        results = list(pool.map(
+            _run_chunk, *zip(*[(day, chunk, selected_periods, absence_type, solver, s) for chunk, s in zip(chunks, seeds)])
+        ))
+    else:
+        results = [
+            run_scenarios(model, day, chunk, selected_periods, absence_type, solver, s) for chunk, s in zip(chunks, seeds)
+        ]
+    return np.concatenate(results)
+
+
+def coverage_summary(model, counts):
+    """Per (domain, period) distribution of uncovered slots over all scenarios.
+
+    Rows with no slots in any scenario are left out.
+    """
+    slots, uncovered = counts[..., 0], counts[..., 1]
+    rows = []
+    for d, domain in enumerate(model.domain_names):
+        for p in range(model.n_periods):
+            if not slots[:, d, p].any():
+                continue
+            missed = uncovered[:, d, p]
+            rows.append({
+                "Domain": domain,
+                "Period": p + 1,
+                "Avg Slots": slots[:, d, p].mean(),
+                "Avg Uncovered": missed.mean(),
+                "P(Any Uncovered)": (missed > 0).mean(),
+                "P95 Uncovered": np.percentile(missed, 95),
+                "Max Uncovered": int(missed.max()),
+            })
+    return pd.DataFrame(rows, columns=[
+        "Domain", "Period", "Avg Slots", "Avg Uncovered", "P(Any Uncovered)", "P95 Uncovered", "Max Uncovered",
+    ])
+
+
+def scenario_coverage(counts):
+    """Share of slots covered in each scenario (1.0 when a scenario has nothing to cover)."""
+    slots = counts[..., 0].sum(axis=(1, 2))
+    uncovered = counts[..., 1].sum(axis=(1, 2))
+    return pd.Series(np.where(slots > 0, 1 - uncovered / np.maximum(slots, 1), 1.0), name="Coverage")
+
+
+def worst_scenarios(scenarios, counts, n=10):
+    """The `n` scenarios with the most uncovered slots."""
+    uncovered = counts[..., 1].sum(axis=(1, 2))
+    order = np.argsort(-uncovered, kind="stable")[:n]
+    return pd.DataFrame({
+        "Absent Teachers": [", ".join(scenarios[i]) for i in order],
+        "Slots": counts[order, ..., 0].sum(axis=(1, 2)),
+        "Uncovered": uncovered[order],
+    })
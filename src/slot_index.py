@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+from constants import FREE_CLASS_LABELS, MAX_TPOD
+
+
+class FreeSlotIndex:
+    """Free teachers of one timetable day, keyed by (period, domain).
+
+    Each key maps to a tuple of (teacher, tpod) pairs in timetable order. The
+    strict table only holds teachers under the TPOD limit; the relaxed table
+    holds every free teacher and is used as a fallback, as before.
+    """
+
+    def __init__(self, day, strict, relaxed):
+        self.day = day
+        self.strict = strict
+        self.relaxed = relaxed
+
+    @classmethod
+    def build(cls, timetable_df, day):
+        """Build the index for `day` with a single pass over the timetable."""
+        day_df = timetable_df[timetable_df["Day"].str.lower() == day.lower()]
+        free_df = day_df[day_df["Class"].isna() | day_df["Class"].isin(FREE_CLASS_LABELS)]
+        under_limit = pd.to_numeric(free_df["TPOD"], errors="coerce") < MAX_TPOD
+
+        return cls(day, _group_free(free_df[under_limit]), _group_free(free_df))
+
+    @classmethod
+    def from_model(cls, model, day):
+        """Build the index for `day` from a TimetableModel with boolean slices instead of row filters."""
+        d = model.day_id(day)
+        if d is None:
+            return cls(day, {}, {})
+        tpods = [None if tpod != tpod else tpod for tpod in model.tpod[:, d].tolist()]
+        strict, relaxed = {}, {}
+        for period in range(1, model.n_periods + 1):
+            free = model.free_mask(day, period)
+            under_limit = free & (model.tpod[:, d] < MAX_TPOD)
+            for domain in model.domain_names:
+                in_domain = model.domain_mask(domain)
+                for table, mask in ((relaxed, free & in_domain), (strict, under_limit & in_domain)):
+                    ids = np.flatnonzero(mask)
+                    if ids.size:
+                        table[(period, domain)] = tuple((model.teachers[i], tpods[i]) for i in ids)
+        return cls(day, strict, relaxed)
+
+    def candidates(self, period, domains, exclude=()):
+        """Return free teachers of the first domain in `domains` that has any.
+
+        Mirrors the old mask-based search: every domain is tried against the
+        strict table first, then against the relaxed one.
+        """
+        for table in (self.strict, self.relaxed):
+            for domain in domains:
+                teachers = [t for t, _ in table.get((period, domain), ()) if t not in exclude]
+                if teachers:
+                    return teachers
+        return []
+
+    def ranked_candidates(self, period, domains, exclude=()):
+        """Return (teacher, domain rank, tpod, over_limit) for every free teacher in `domains`."""
+        strict = {t for domain in domains for t, _ in self.strict.get((period, domain), ())}
+        ranked = []
+        for rank, domain in enumerate(domains):
+            for teacher, tpod in self.relaxed.get((period, domain), ()):
+                if teacher not in exclude:
+                    ranked.append((teacher, rank, tpod, teacher not in strict))
+        return ranked
+
+
+def _group_free(free_df):
+    """Group free rows into {(period, domain): ((teacher, tpod), ...)}."""
+    slots = {}
+    seen = set()
+    for teacher, period, domain, tpod in zip(free_df["Teacher"], free_df["Period"], free_df["Domain"], free_df["TPOD"]):
+        key = (int(period), domain)
+        if (key, teacher) in seen:
+            continue
+        seen.add((key, teacher))
+        slots.setdefault(key, []).append((teacher, tpod))
+    return {key: tuple(pairs) for key, pairs in slots.items()}
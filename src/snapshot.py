@@ -0,0 +1,158 @@
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_VERSION = 2
+SNAPSHOT_DIR = Path(__file__).resolve().parent.parent / ".cache" / "snapshots"
+# Snapshots of uploaded workbooks kept in SNAPSHOT_DIR, most recently written first
+MAX_CACHED_SNAPSHOTS = 8
+
+# Column name -> code dtype. String columns are stored as codes into a
+# dictionary kept in meta.json; -1 marks a missing value.
+CODED_COLUMNS = {"Teacher": np.int32, "Day": np.int8, "Class": np.int32, "Domain": np.int8}
+INT_COLUMNS = {"Period": np.int8, "TPOD": np.int16}
+COLUMN_ORDER = ["Teacher", "Day", "Period", "Class", "TPOD", "Domain"]
+
+
+def snapshot_path_for(workbook_path):
+    """Side-car snapshot directory for a workbook on disk."""
+    return Path(str(workbook_path) + ".snapshot")
+
+
+def _column_file(col, generation):
+    return f"{col}.{generation}.npy"
+
+
+def save_snapshot(timetable_df, path, source=None):
+    """Write a parsed timetable as memory-mappable columns under `path`.
+
+    Column files are named for this write's generation; meta.json, which
+    names the generation, is swapped in last with os.replace, so a
+    concurrent load sees the old snapshot or the new one, never none. Files
+    of older generations are removed afterwards. `source` identifies what
+    the snapshot was built from (mtime, size or a content hash) and is
+    checked again on load. Returns False if the snapshot could not be written.
+    """
+    path = Path(path)
+    generation = uuid.uuid4().hex[:12]
+    meta = {
+        "version": SNAPSHOT_VERSION, "source": source, "rows": len(timetable_df), "generation": generation,
+        "dictionaries": {},
+    }
+    written = []
+    try:
+        path.mkdir(parents=True, exist_ok=True)
+        for col, dtype in CODED_COLUMNS.items():
+            codes, uniques = pd.factorize(timetable_df[col], use_na_sentinel=True)
+            written.append(path / _column_file(col, generation))
+            np.save(written[-1], codes.astype(dtype))
+            meta["dictionaries"][col] = [str(u) for u in uniques]
+        for col, dtype in INT_COLUMNS.items():
+            values = pd.to_numeric(timetable_df[col], errors="coerce")
+            written.append(path / _column_file(col, generation))
+            np.save(written[-1], values.fillna(-1).to_numpy().astype(dtype))
+        fd, tmp_meta = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=path)
+        written.append(Path(tmp_meta))
+        with os.fdopen(fd, "w") as f:
+            f.write(json.dumps(meta))
+        os.replace(tmp_meta, path / "meta.json")
+    except OSError:
+        for file in written:
+            file.unlink(missing_ok=True)
+        return False
+
+    current = {"meta.json"} | {_column_file(col, generation) for col in COLUMN_ORDER}
+    for entry in path.iterdir():
+        if entry.name not in current:
+            _remove(entry)
+    return True
+
+
+def prune_snapshots(directory=SNAPSHOT_DIR, keep=MAX_CACHED_SNAPSHOTS):
+    """Delete all but the `keep` most recently written snapshots in `directory`, and stray temp files."""
+    directory = Path(directory)
+    try:
+        entries = list(directory.iterdir())
+    except OSError:
+        return
+    snapshots = []
+    for entry in entries:
+        if entry.name.startswith(".tmp-"):
+            # Left by a write that was interrupted
+            _remove(entry)
+        elif entry.suffix == ".snapshot":
+            try:
+                snapshots.append(((entry / "meta.json").stat().st_mtime, entry))
+            except OSError:
+                snapshots.append((0, entry))
+    for _, entry in sorted(snapshots, key=lambda item: item[0], reverse=True)[keep:]:
+        _remove(entry)
+
+
+def _remove(entry):
+    try:
+        if entry.is_dir():
+            shutil.rmtree(entry)
+        else:
+            entry.unlink()
+    except OSError:
+        pass
+
+
+def load_snapshot(path, source=None, categorical=False):
+    """Load a snapshot written by `save_snapshot`, or None if missing or stale.
+
+    By default the columns are decoded to the same values `parse_timetable`
+    returns. With `categorical=True` string columns stay as categoricals
+    over the memory-mapped codes.
+    """
+    path = Path(path)
+    try:
+        meta = json.loads((path / "meta.json").read_text())
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != SNAPSHOT_VERSION or meta.get("source") != source:
+        return None
+
+    try:
+        arrays = {col: np.load(path / _column_file(col, meta["generation"]), mmap_mode="r") for col in COLUMN_ORDER}
+    except (OSError, ValueError):
+        # Replaced by a newer write between reading meta.json and the columns
+        return None
+
+    columns = {}
+    for col in CODED_COLUMNS:
+        codes = arrays[col]
+        dictionary = meta["dictionaries"][col]
+        if categorical:
+            columns[col] = pd.Categorical.from_codes(codes, categories=dictionary)
+        else:
+            lookup = np.array(dictionary + [None], dtype=object)
+            columns[col] = lookup[codes]
+    for col in INT_COLUMNS:
+        values = arrays[col]
+        missing = values < 0
+        # Match the dtypes the parser infers when TPOD is partly or fully blank
+        if missing.all():
+            columns[col] = np.full(len(values), None, dtype=object)
+        elif missing.any():
+            columns[col] = np.where(missing, np.nan, values).astype(np.float64)
+        else:
+            columns[col] = np.asarray(values, dtype=np.int64)
+
+    return pd.DataFrame({col: columns[col] for col in COLUMN_ORDER})
+
+
+def open_snapshot(path, categorical=False):
+    """Load a snapshot directory without checking which workbook it was made from."""
+    try:
+        meta = json.loads((Path(path) / "meta.json").read_text())
+    except (OSError, ValueError):
+        return None
+    return load_snapshot(path, meta.get("source"), categorical=categorical)
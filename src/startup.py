@@ -0,0 +1,24 @@
+import time
+from contextlib import contextmanager
+
+PROCESS_START = time.perf_counter()
+_stages = {}
+
+
+def record_stage(stage, seconds):
+    """Keep the first timing of `stage` in this process; later ones are reruns, not start-up."""
+    _stages.setdefault(stage, seconds)
+
+
+@contextmanager
+def timed(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+def startup_report():
+    """Return {stage: seconds} recorded since the process started, in recording order."""
+    return dict(_stages)
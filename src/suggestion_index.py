@@ -0,0 +1,73 @@
+import pandas as pd
+
+SUGGESTION_COLUMNS = ["Absent Teacher", "Period", "Class", "Suggested Teachers"]
+SAVED_SUGGESTIONS = 5
+
+
+class SuggestionIndex:
+    """Ranked substitutes for each class of one day, keyed by (absent teacher, period).
+
+    Each key maps to (class, ((teacher, score), ...)), best candidate first.
+    Scores are what the solver ranked by, lower first: the (today, week,
+    month) substitution counts for greedy, the assignment cost for matching,
+    and None for an index rebuilt from a saved suggestions table.
+    """
+
+    def __init__(self, entries=None):
+        self.entries = entries if entries is not None else {}
+        self._periods = {}
+        for teacher, period in self.entries:
+            self._periods.setdefault(teacher, []).append(period)
+
+    @classmethod
+    def from_slots(cls, slots, suggestions):
+        """Build from solver output: `slots` tuples and one ranked [(teacher, score)] list per slot."""
+        return cls({
+            (absent_teacher, period): (target_class, tuple(ranked))
+            for (absent_teacher, period, target_class, _), ranked in zip(slots, suggestions)
+        })
+
+    @classmethod
+    def from_frame(cls, suggestions_df):
+        """Rebuild from a saved suggestions table; it only holds the first names, without scores."""
+        entries = {}
+        if suggestions_df is None or suggestions_df.empty:
+            return cls(entries)
+        for teacher, period, target_class, text in suggestions_df[SUGGESTION_COLUMNS].itertuples(index=False):
+            if pd.isna(teacher) or pd.isna(period):
+                continue
+            names = str(text).split(", ") if pd.notna(text) and str(text) else []
+            entries[(teacher, int(period))] = (
+                None if pd.isna(target_class) else target_class, tuple((name, None) for name in names)
+            )
+        return cls(entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, absent_teacher, period):
+        """Return (class, ranked candidates) for a slot, or None if it has no class to cover."""
+        return self.entries.get((absent_teacher, period))
+
+    def class_of(self, absent_teacher, period):
+        entry = self.entries.get((absent_teacher, period))
+        return entry[0] if entry else None
+
+    def candidates(self, absent_teacher, period):
+        """Every ranked substitute name for a slot, best first."""
+        entry = self.entries.get((absent_teacher, period))
+        return [teacher for teacher, _ in entry[1]] if entry else []
+
+    def periods(self, absent_teacher):
+        """Periods with a class to cover for `absent_teacher`, in slot order."""
+        return self._periods.get(absent_teacher, [])
+
+    def to_frame(self, limit=SAVED_SUGGESTIONS):
+        """The flat suggestions table that is saved and exported: the first `limit` names, comma-joined."""
+        return pd.DataFrame([
+            (absent_teacher, period, target_class, ", ".join(teacher for teacher, _ in ranked[:limit]))
+            for (absent_teacher, period), (target_class, ranked) in self.entries.items()
+        ], columns=SUGGESTION_COLUMNS)
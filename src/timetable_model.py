@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+from constants import FREE_CLASS_LABELS, MAX_TPOD, DOMAIN_PRIORITY
+from utils import extract_class_level
+
+# Occupancy sentinels; class codes are >= 0
+FREE = -1       # no class
+ACTIVITY = -2   # CCA, library, sports: free to take a substitution
+MISSING = -3    # no timetable row for this (teacher, day, period)
+
+
+class TimetableModel:
+    """Integer-coded timetable for fast "who is free" queries.
+
+    Teachers, days and classes get integer ids in order of first appearance.
+    `occupancy[teacher, day, period - 1]` holds the class id taught then, or
+    FREE / ACTIVITY / MISSING. Per teacher, `domain` holds an index into
+    `domain_names`; `tpod[teacher, day]` is the day's TPOD (NaN if unset).
+    Build once per parsed timetable with `from_frame` and share it; it is
+    not meant to be modified.
+    """
+
+    def __init__(self, teachers, day_names, classes, occupancy, domain, domain_names, tpod):
+        self.teachers = teachers
+        self.day_names = day_names
+        self.classes = classes
+        self.occupancy = occupancy
+        self.domain = domain
+        self.domain_names = domain_names
+        self.tpod = tpod
+        self.teacher_ids = {t: i for i, t in enumerate(teachers)}
+        self.day_ids = {d.lower(): i for i, d in enumerate(day_names)}
+        self.class_levels = np.array([extract_class_level(c) or 0 for c in classes], dtype=np.int8)
+
+    @classmethod
+    def from_frame(cls, timetable_df):
+        """Build the model from the long-form frame `parse_timetable` returns."""
+        teacher_codes, teachers = pd.factorize(timetable_df["Teacher"])
+        day_codes, day_names = pd.factorize(timetable_df["Day"])
+        period_idx = timetable_df["Period"].to_numpy(dtype=np.int64) - 1
+
+        class_text = timetable_df["Class"].astype("string").str.strip()
+        is_free = class_text.isna() | (class_text == "")
+        is_activity = ~is_free & class_text.isin(FREE_CLASS_LABELS)
+        taught = ~is_free & ~is_activity
+        class_codes = np.full(len(timetable_df), FREE, dtype=np.int32)
+        taught_codes, classes = pd.factorize(timetable_df["Class"][taught.to_numpy()])
+        class_codes[taught.to_numpy()] = taught_codes
+        class_codes[is_activity.to_numpy()] = ACTIVITY
+
+        occupancy = np.full((len(teachers), len(day_names), int(period_idx.max()) + 1), MISSING, dtype=np.int32)
+        occupancy[teacher_codes, day_codes, period_idx] = class_codes
+
+        tpod = np.full((len(teachers), len(day_names)), np.nan)
+        tpod[teacher_codes, day_codes] = pd.to_numeric(timetable_df["TPOD"], errors="coerce").to_numpy(dtype=float)
+
+        domain_codes, domain_names = pd.factorize(timetable_df["Domain"])
+        domain = np.full(len(teachers), -1, dtype=np.int8)
+        domain[teacher_codes] = domain_codes
+
+        return cls(
+            np.asarray(teachers, dtype=object), [str(d) for d in day_names], np.asarray(classes, dtype=object),
+            occupancy, domain, [str(d) for d in domain_names], tpod,
+        )
+
+    @property
+    def n_periods(self):
+        return self.occupancy.shape[2]
+
+    def day_id(self, day):
+        """Integer id of `day` (case-insensitive), or None if the timetable has no such day."""
+        return self.day_ids.get(day.lower())
+
+    def domain_mask(self, domain):
+        """Boolean vector over teachers: True where the teacher is in `domain`."""
+        if domain not in self.domain_names:
+            return np.zeros(len(self.teachers), dtype=bool)
+        return self.domain == self.domain_names.index(domain)
+
+    def free_mask(self, day, period, domain=None, under_limit=False):
+        """Boolean vector over teachers free in `period` of `day`, optionally in `domain` and under MAX_TPOD."""
+        d = self.day_id(day)
+        if d is None or not 1 <= period <= self.n_periods:
+            return np.zeros(len(self.teachers), dtype=bool)
+        slot = self.occupancy[:, d, period - 1]
+        mask = (slot == FREE) | (slot == ACTIVITY)
+        if domain is not None:
+            mask &= self.domain_mask(domain)
+        if under_limit:
+            mask &= self.tpod[:, d] < MAX_TPOD
+        return mask
+
+    def collect_slots(self, absent_dict, day, selected_periods):
+        """Same result as arranger.collect_slots, read from the occupancy array."""
+        d = self.day_id(day)
+        if d is None:
+            return []
+        periods = sorted({p for p in selected_periods if 1 <= p <= self.n_periods})
+        halves = {"1st half": range(1, 5), "2nd half": range(5, 9)}
+        slots = []
+        for absent_teacher, absence_type in absent_dict.items():
+            t = self.teacher_ids.get(absent_teacher)
+            if t is None:
+                continue
+            row = self.occupancy[t, d]
+            half = halves.get(absence_type)
+            for period in periods:
+                code = row[period - 1]
+                if code < 0 or (half is not None and period not in half):
+                    continue
+                level = self.class_levels[code]
+                if not level:
+                    continue
+                target_domain = "Primary" if level <= 5 else "Secondary" if level <= 10 else "Senior Secondary"
+                slots.append((absent_teacher, period, self.classes[code], DOMAIN_PRIORITY[target_domain]))
+        return slots
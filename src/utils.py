@@ -1,50 +1,93 @@
+import re
+from functools import lru_cache
+import numpy as np
+import pandas as pd
 from constants import MISC_KEYWORDS
 from datetime import datetime, timedelta
 
+LOG_DATE_FORMAT = "%A, %d %B %Y"
+ROMAN_LEVELS = {
+    "I": 1, "II": 2, "III": 3, "IV": 4, "V": 5,
+    "VI": 6, "VII": 7, "VIII": 8, "IX": 9, "X": 10,
+    "XI": 11, "XII": 12
+}
+# Checked in order; the first pattern found in the upper-cased name wins
+DOMAIN_PATTERNS = [
+    ("Misc", re.compile("|".join(re.escape(k) for k in MISC_KEYWORDS))),
+    ("Principal", re.compile("PRINCIPAL")),
+    ("PGT", re.compile("PGT")),
+    ("TGT", re.compile("TGT")),
+    ("PRT", re.compile("PRT")),
+]
+
+@lru_cache(maxsize=4096)
 def get_teacher_domain(name):
     """Classify teacher by domain based on name keywords."""
     name_upper = name.upper()
-    if any(k in name_upper for k in MISC_KEYWORDS):
-        return "Misc"
-    elif "PRINCIPAL" in name_upper:
-        return "Principal"
-    elif "PGT" in name_upper:
-        return "PGT"
-    elif "TGT" in name_upper:
-        return "TGT"
-    elif "PRT" in name_upper:
-        return "PRT"
+    for domain, pattern in DOMAIN_PATTERNS:
+        if pattern.search(name_upper):
+            return domain
     return "Unknown"
 
+def teacher_domains(names):
+    """Series version of get_teacher_domain, classifying each distinct name once."""
+    codes, uniques = pd.factorize(names)
+    upper = pd.Series(uniques, dtype="string").str.upper()
+    conditions = [upper.str.contains(pattern, regex=True).to_numpy(dtype=bool) for _, pattern in DOMAIN_PATTERNS]
+    labels = np.select(conditions, [domain for domain, _ in DOMAIN_PATTERNS], "Unknown").astype(object)
+    # Missing names have code -1, which picks the trailing None (also when every name is missing)
+    labels = np.append(labels, None)
+    return pd.Series(labels[codes], index=names.index, name="Domain")
+
+@lru_cache(maxsize=1024)
 def extract_class_level(class_str):
     """Extract numeric level from class name."""
-    roman_map = {
-        "I": 1, "II": 2, "III": 3, "IV": 4, "V": 5,
-        "VI": 6, "VII": 7, "VIII": 8, "IX": 9, "X": 10,
-        "XI": 11, "XII": 12
-    }
     if not class_str or not isinstance(class_str, str):
         return None
-    first_part = class_str.upper().strip().split()[0]
-    return roman_map.get(first_part, None)
+    parts = class_str.upper().split()
+    return ROMAN_LEVELS.get(parts[0]) if parts else None
+
+def class_levels(classes):
+    """Series version of extract_class_level; missing or unknown levels are <NA>."""
+    codes, uniques = pd.factorize(classes)
+    levels = pd.array([extract_class_level(c) for c in uniques] + [None], dtype="Int64")
+    return pd.Series(levels[codes], index=classes.index, name="Level")
+
+@lru_cache(maxsize=2048)
+def parse_log_date(date_str):
+    """Parse a "Monday, 06 October 2026" log date; None if it does not match."""
+    try:
+        return datetime.strptime(str(date_str).strip(), LOG_DATE_FORMAT).date()
+    except ValueError:
+        return None
+
+def log_dates(date_strs):
+    """Series version of parse_log_date, as datetime64 with NaT for unparseable strings."""
+    return pd.to_datetime(date_strs.astype("string").str.strip(), format=LOG_DATE_FORMAT, errors="coerce")
 
 def is_same_week(date_str):
     """Check if a given date string is in the current week."""
-    try:
-        log_date = datetime.strptime(date_str, "%A, %d %B %Y").date()
-        today = datetime.today().date()
-        return log_date.isocalendar()[1] == today.isocalendar()[1] and log_date.year == today.year
-    except Exception:
+    log_date = parse_log_date(date_str)
+    if log_date is None:
         return False
-    
+    today = datetime.today().date()
+    return log_date.isocalendar()[1] == today.isocalendar()[1] and log_date.year == today.year
+
+def in_week(date_strs, weeks_ago=0):
+    """Series version of is_same_week: True where a log date falls in this week, or `weeks_ago` weeks before."""
+    today = datetime.today().date()
+    start = pd.Timestamp(today - timedelta(days=today.weekday() + 7 * weeks_ago))
+    dates = log_dates(date_strs)
+    return (dates >= start) & (dates < start + pd.Timedelta(days=7))
+
 def get_current_week_dates():
     """Return list of dates (Mon-Sat) for current week."""
     today = datetime.today()
     start = today - timedelta(days=today.weekday())  # Monday
-    return [(start + timedelta(days=i)).strftime("%A, %d %B %Y") for i in range(6)]  # Mon-Sat
+    return [(start + timedelta(days=i)).strftime(LOG_DATE_FORMAT) for i in range(6)]  # Mon-Sat
 
 def get_last_week_dates():
     """Return list of dates (Mon-Sat) for last week."""
     today = datetime.today().date()
     start = today - timedelta(days=today.weekday() + 7)
-    return [(start + timedelta(days=i)).strftime("%A, %d %B %Y") for i in range(6)]  # Mon-Sat
\ No newline at end of file
+    return [(start + timedelta(days=i)).strftime(LOG_DATE_FORMAT) for i in range(6)]  # Mon-Sat
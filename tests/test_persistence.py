@@ -0,0 +1,35 @@
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+import synthetic  # noqa: F401  (puts src/ on sys.path)
+from fake_sheets import install_fake_backend
+from persistence import append_to_monthly_log, load_month_log, month_log_dates
+
+SPREADSHEET_ID = "test"
+
+
+def arrangement(n_absent):
+    return pd.DataFrame([
+        {"Absent Teacher": f"Teacher {i:03d} (TGT)", "Reason": "Leave", "Period 1": f"Teacher {100 + i:03d} (VI A)"}
+        for i in range(n_absent)
+    ])
+
+
+def test_load_month_log_skips_rows_left_by_a_shrunk_block(tmp_path):
+    _, store, flusher = install_fake_backend(tmp_path / "store.sqlite3")
+    append_to_monthly_log(arrangement(3), SPREADSHEET_ID, date=datetime(2026, 10, 1))
+    append_to_monthly_log(arrangement(2), SPREADSHEET_ID, date=datetime(2026, 10, 2))
+    append_to_monthly_log(arrangement(1), SPREADSHEET_ID, date=datetime(2026, 10, 1))
+    flusher.flush_once()
+    # Read the sheet as written, not the local mirror
+    store.forget()
+
+    month_df = load_month_log(SPREADSHEET_ID, "October")
+    assert len(month_df) == 3
+    assert (month_df != "").any(axis=1).all()
+    assert month_df["Date"].tolist() == ["Thursday, 01 October 2026"] + ["Friday, 02 October 2026"] * 2
+    assert month_log_dates(SPREADSHEET_ID, "October") == ["Thursday, 01 October 2026", "Friday, 02 October 2026"]